@@ -1,91 +1,162 @@
 import logging
 import threading
 import time
+from datetime import datetime
+from typing import Optional
 
 from .config import (
+    CHECK_INTERVAL_AUCTION_SEC,
+    CHECK_INTERVAL_IDLE_SEC,
     CHECK_INTERVAL_SEC,
+    CHECK_INTERVAL_TRADING_SEC,
+    CHECK_SCHEDULE,
     INDEX_CODES,
-    PRICE_BAND_PCT,
     SAMPLE_PRICES,
     TELEGRAM_BOT_TOKEN,
     TELEGRAM_CHAT_ID,
+    TRACE_SLOW_CHECK_SEC,
+    UTC7,
+    WS_FEED_ENABLED,
 )
+from . import coordination, metrics, session_schedule, stream, telegram_queue, tracing, ws_feed
+from .alert_engine import evaluate, format_number, upgrade_last_alerted
 from .fetcher import fetch_prices_dict
 from .store import (
     append_observer_price_change,
     load_last_alerted,
-    load_observers,
-    save_last_alerted,
+    load_rule_index,
+    update_last_alerted,
 )
-from .telegram_send import send_telegram
 
 logger = logging.getLogger(__name__)
 
+CHECK_SECONDS = metrics.histogram("stockbot_check_seconds", "Duration of one background alert check.")
+CHECK_OVERRUNS = metrics.counter("stockbot_check_overruns_total", "Checks that took longer than their scheduled interval.")
+CHECK_OVERRUN_SECONDS = metrics.counter(
+    "stockbot_check_overrun_seconds_total", "Time by which checks exceeded their scheduled interval."
+)
+ALERTS_FIRED = metrics.counter("stockbot_alerts_fired_total", "Alerts queued for delivery.")
+ALERTS_DELIVERED = metrics.counter("stockbot_alerts_delivered_total", "Queued alerts by final outcome.", ("outcome",))
+
 _last_seen_prices: dict[str, float] = {}
+_last_alerted_lock = threading.RLock()  # re-entered when enqueue delivers inline
 
 
-def run_check() -> None:
-    global _last_seen_prices
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        return
-    observers = load_observers()
-    if not observers:
+def _on_alert_result(message: telegram_queue.Message, ok: bool) -> None:
+    ALERTS_DELIVERED.inc("sent" if ok else "failed")
+    if not ok:
+        logger.warning("Alert not delivered, will fire again on the next check: %s", message.text)
         return
+    with _last_alerted_lock:
+        update_last_alerted({message.key: float(message.payload["target"])}, [])
+    logger.info("Alert sent: %s", message.text)
+
+
+telegram_queue.register_handler("alert", _on_alert_result)
+
+
+def run_check() -> Optional[dict[str, list[str]]]:
+    """Check this worker's symbols. Returns {"checked": [...], "skipped": [...]}, skipped being other workers' share."""
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        return None
+    with tracing.trace("check", TRACE_SLOW_CHECK_SEC):
+        return _run_check()
+
+
+def _run_check() -> dict[str, list[str]]:
+    index = load_rule_index()
+    if not len(index):
+        return {"checked": [], "skipped": []}
     index_set = set(INDEX_CODES)
-    stock_symbols = [s for s in observers if s not in index_set]
+    all_stocks = [s for s in index.symbols() if s not in index_set]
+    # With several workers each one fetches and alerts on its own share of the symbols.
+    # Indices are never priced here, so they are neither checked nor skipped.
+    stock_symbols = [s for s in all_stocks if coordination.owns(s)]
+    owned = set(stock_symbols)
+    result = {"checked": stock_symbols, "skipped": [s for s in all_stocks if s not in owned]}
+    if WS_FEED_ENABLED and not SAMPLE_PRICES:
+        ws_feed.set_symbols(stock_symbols)
+    if not stock_symbols:
+        return result
     prices = fetch_prices_dict(stock_symbols, INDEX_CODES)
+    tracing.current().set(rules=len(index), symbols=len(stock_symbols), priced=len(prices))
     if not prices:
-        return
-    last_alerted = load_last_alerted()
-    if SAMPLE_PRICES:
-        for sym, p in prices.items():
-            if _last_seen_prices.get(sym) != p:
-                last_alerted.pop(sym, None)
-                _last_seen_prices[sym] = p
-    updated = False
-    for symbol, target_str in list(observers.items()):
-        symbol = symbol.strip().upper()
-        if not target_str or symbol not in prices:
-            continue
-        try:
-            target = float(str(target_str).replace(",", "").strip())
-        except ValueError:
-            continue
-        current = prices.get(symbol)
-        if current is None:
-            continue
-        low = target * (1 - PRICE_BAND_PCT)
-        high = target * (1 + PRICE_BAND_PCT)
-        inside_band = low < current < high
-        if not inside_band:
-            if last_alerted.get(symbol) == target:
-                last_alerted.pop(symbol, None)
-                updated = True
-            continue
-        if last_alerted.get(symbol) == target:
-            continue
-        msg = f"🔔 Price alert: {symbol} = {current:,.0f} (within 0.1% of target {target:,.0f})"
-        append_observer_price_change(symbol, target, current)
-        if send_telegram(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, msg):
-            last_alerted[symbol] = target
-            updated = True
-            logger.info("Alert sent: %s", msg)
-    if updated:
-        save_last_alerted(last_alerted)
+        return result
+    with _last_alerted_lock:
+        with tracing.span("evaluate") as sp:
+            last_alerted = load_last_alerted()
+            before = dict(last_alerted)
+            upgrade_last_alerted(last_alerted)
+            if SAMPLE_PRICES:
+                for sym, p in prices.items():
+                    if _last_seen_prices.get(sym) != p:
+                        for rule in index.rules_for(sym):
+                            last_alerted.pop(rule.key, None)
+                        _last_seen_prices[sym] = p
+            fired, rearmed = evaluate(index, prices, last_alerted)
+            for key in rearmed:
+                last_alerted.pop(key, None)
+            # Write only the keys this check changed; other workers own the rest.
+            changed = {k: v for k, v in last_alerted.items() if before.get(k) != v}
+            removed = [k for k in before if k not in last_alerted]
+            if changed or removed:
+                update_last_alerted(changed, removed)
+            sp.set(fired=len(fired), rearmed=len(rearmed))
+        # Enqueue before releasing the lock. _on_alert_result takes it too, so a send that
+        # finishes now cannot record last_alerted and drop its pending key in between.
+        for rule, current in fired:
+            if not coordination.owns(rule.symbol):
+                # Handed to another worker while this check was running; it will alert instead.
+                continue
+            msg = (
+                f"🔔 Price alert: {rule.symbol} = {current:,.0f} "
+                f"(within {format_number(rule.band_pct * 100)}% of target {rule.target:,.0f})"
+            )
+            if telegram_queue.enqueue("alert", msg, key=rule.key, payload={"target": rule.target}):
+                ALERTS_FIRED.inc()
+                append_observer_price_change(rule.symbol, rule.target, current)
+                stream.publish(
+                    "alert",
+                    {"symbol": rule.symbol, "target": rule.target, "price": current, "key": rule.key, "text": msg},
+                    symbol=rule.symbol,
+                )
+    return result
 
 
 def start_background_checker() -> None:
     def loop():
+        interval = session_schedule.next_slot().interval
         while True:
+            started = time.monotonic()
             try:
                 run_check()
             except Exception as e:
                 logger.exception("Checker error: %s", e)
-            time.sleep(CHECK_INTERVAL_SEC)
+            elapsed = time.monotonic() - started
+            CHECK_SECONDS.observe(elapsed)
+            if interval and elapsed > interval:
+                CHECK_OVERRUNS.inc()
+                CHECK_OVERRUN_SECONDS.inc(amount=elapsed - interval)
+            slot = session_schedule.next_slot()
+            if slot.at - time.time() >= 300:
+                logger.info(
+                    "No trading until %s; next check then (%s)",
+                    datetime.fromtimestamp(slot.at, UTC7).strftime("%Y-%m-%d %H:%M"),
+                    slot.phase,
+                )
+            session_schedule.sleep_until(slot.at)
+            interval = slot.interval
 
-    t = threading.Thread(target=loop, daemon=True)
+    coordination.start()
+    telegram_queue.start()
+    t = threading.Thread(target=loop, daemon=True, name="alert-checker")
     t.start()
-    if CHECK_INTERVAL_SEC >= 60:
-        logger.info("Background checker started (every %s min)", CHECK_INTERVAL_SEC // 60)
-    else:
+    if CHECK_SCHEDULE == "fixed" or SAMPLE_PRICES:
         logger.info("Background checker started (every %s sec)", CHECK_INTERVAL_SEC)
+    else:
+        logger.info(
+            "Background checker started (HOSE/HNX sessions: every %g sec in continuous trading, %g sec in auctions, %s outside)",
+            CHECK_INTERVAL_TRADING_SEC,
+            CHECK_INTERVAL_AUCTION_SEC,
+            f"every {CHECK_INTERVAL_IDLE_SEC:g} sec" if CHECK_INTERVAL_IDLE_SEC > 0 else "paused",
+        )
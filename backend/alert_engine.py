@@ -0,0 +1,151 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .config import PRICE_BAND_PCT
+
+LEVEL_SEPARATORS = re.compile(r"[;|\n]")
+
+
+@dataclass(frozen=True, slots=True)
+class Rule:
+    symbol: str
+    target: float
+    band_pct: float
+    key: str
+
+    def contains(self, price: float) -> bool:
+        return self.target * (1 - self.band_pct) < price < self.target * (1 + self.band_pct)
+
+
+def format_number(value: float) -> str:
+    return f"{value:f}".rstrip("0").rstrip(".")
+
+
+def rule_key(symbol: str, target: float) -> str:
+    return f"{symbol}@{format_number(target)}"
+
+
+def _parse_number(text: str) -> Optional[float]:
+    s = text.replace(",", "").strip()
+    if not s:
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def parse_rules(symbol: str, target_str, default_band: float = PRICE_BAND_PCT) -> list[Rule]:
+    symbol = str(symbol).strip().upper()
+    if not symbol or target_str is None:
+        return []
+    rules = {}
+    for level in LEVEL_SEPARATORS.split(str(target_str)):
+        price_part, _, band_part = level.partition("@")
+        target = _parse_number(price_part)
+        if target is None or target <= 0:
+            continue
+        band = default_band
+        if band_part.strip():
+            raw = band_part.strip()
+            value = _parse_number(raw.rstrip("%"))
+            if value is None or value <= 0:
+                continue
+            band = value / 100 if raw.endswith("%") else value
+        if band >= 1:
+            continue
+        key = rule_key(symbol, target)
+        rules[key] = Rule(symbol, target, band, key)
+    return list(rules.values())
+
+
+class RuleIndex:
+    __slots__ = ("_symbols", "by_key")
+
+    def __init__(self, rules: Iterable[Rule] = ()) -> None:
+        by_symbol: dict[str, list[Rule]] = {}
+        self.by_key: dict[str, Rule] = {}
+        for rule in rules:
+            by_symbol.setdefault(rule.symbol, []).append(rule)
+            self.by_key[rule.key] = rule
+        self._symbols: dict[str, tuple[array, list[Rule], float]] = {}
+        for symbol, symbol_rules in by_symbol.items():
+            symbol_rules.sort(key=lambda r: r.target)
+            targets = array("d", (r.target for r in symbol_rules))
+            self._symbols[symbol] = (targets, symbol_rules, max(r.band_pct for r in symbol_rules))
+
+    @classmethod
+    def from_observers(cls, observers: dict[str, str], default_band: float = PRICE_BAND_PCT) -> "RuleIndex":
+        rules = []
+        for symbol, target_str in observers.items():
+            rules.extend(parse_rules(symbol, target_str, default_band))
+        return cls(rules)
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def symbols(self) -> list[str]:
+        return list(self._symbols)
+
+    def rules_for(self, symbol: str) -> list[Rule]:
+        entry = self._symbols.get(symbol)
+        return list(entry[1]) if entry else []
+
+    def matching(self, symbol: str, price: float) -> list[Rule]:
+        entry = self._symbols.get(symbol)
+        if entry is None or price <= 0:
+            return []
+        targets, rules, max_band = entry
+        lo = bisect_left(targets, price / (1 + max_band))
+        hi = bisect_right(targets, price / (1 - max_band))
+        return [r for r in rules[lo:hi] if r.contains(price)]
+
+
+def upgrade_last_alerted(last_alerted: dict[str, float]) -> bool:
+    legacy = [k for k in last_alerted if "@" not in k]
+    for symbol in legacy:
+        target = last_alerted.pop(symbol)
+        last_alerted[rule_key(symbol, target)] = target
+    return bool(legacy)
+
+
+def _rearms(rule: Optional[Rule], price: Optional[float], last_alerted: dict[str, float]) -> bool:
+    return rule is not None and price is not None and last_alerted.get(rule.key) == rule.target and not rule.contains(price)
+
+
+def evaluate(
+    index: RuleIndex,
+    prices: dict[str, float],
+    last_alerted: dict[str, float],
+) -> tuple[list[tuple[Rule, float]], list[str]]:
+    rearmed = []
+    for key in last_alerted:
+        rule = index.by_key.get(key)
+        if rule is not None and _rearms(rule, prices.get(rule.symbol), last_alerted):
+            rearmed.append(key)
+    fired = []
+    for symbol, price in prices.items():
+        for rule in index.matching(symbol, price):
+            if last_alerted.get(rule.key) != rule.target:
+                fired.append((rule, price))
+    return fired, rearmed
+
+
+def evaluate_symbol(
+    index: RuleIndex,
+    symbol: str,
+    price: float,
+    last_alerted: dict[str, float],
+    alerted_keys: Iterable[str],
+) -> tuple[list[Rule], list[str]]:
+    """evaluate() for a single price update.
+
+    `alerted_keys` are this symbol's keys in last_alerted; callers that feed one
+    tick at a time track them so re-arm checks don't scan every rule.
+    """
+    rearmed = [k for k in alerted_keys if _rearms(index.by_key.get(k), price, last_alerted)]
+    fired = [r for r in index.matching(symbol, price) if last_alerted.get(r.key) != r.target]
+    return fired, rearmed
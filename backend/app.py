@@ -14,26 +14,40 @@ from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 
 from .config import (
     FLASK_HOST,
     FLASK_PORT,
     INDEX_CODES,
+    PROFILER_ENABLED,
     SYMBOLS,
     TELEGRAM_BOT_TOKEN,
     TELEGRAM_CHAT_ID,
+    TICK_ARCHIVE_ENABLED,
+    TRACE_SLOW_REQUEST_SEC,
+    UTC7,
 )
-from .fetcher import fetch_prices, fetch_prices_dict
+from . import coordination, http_cache, metrics, profiler, quote_cache, session_schedule, stream, telegram_queue, tick_archive, tick_store, tracing
+from .fetcher import fetch_prices_dict, fetch_quotes, get_quotes, source_status
+from .alert_engine import parse_rules
+from .pagination import parse_limit, parse_time
+from .quotes import format_quotes
 from .store import (
     append_history,
-    get_history_filtered,
-    get_observer_price_change_filtered,
+    events_version,
+    init_storage,
     load_observers,
+    load_rule_index,
+    observers_version,
+    query_events,
     save_observers,
 )
 from .telegram_send import send_telegram
 
+init_storage()
+stream.start_relay()
+
 run_check = None
 try:
     from .alert_checker import run_check as _run_check, start_background_checker
@@ -46,12 +60,30 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
+# Long-lived by design, so never reported as slow.
+_UNTRACED_PATHS = {"/api/stream", "/api/debug/profile", "/metrics"}
+
+
+@app.before_request
+def start_trace():
+    if request.path not in _UNTRACED_PATHS:
+        g.trace = tracing.start(f"{request.method} {request.path}", TRACE_SLOW_REQUEST_SEC)
+
+
+@app.teardown_request
+def finish_trace(exc):
+    root = g.pop("trace", None)
+    if root is not None:
+        tracing.finish(root)
+
+
 @app.after_request
 def cors(resp):
     resp.headers["Access-Control-Allow-Origin"] = "*"
     resp.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    resp.headers["Access-Control-Allow-Headers"] = "Content-Type"
-    return resp
+    resp.headers["Access-Control-Allow-Headers"] = "Content-Type, If-None-Match, If-Modified-Since"
+    resp.headers["Access-Control-Expose-Headers"] = "ETag, Last-Modified"
+    return http_cache.compress(resp)
 
 
 def get_symbol_list() -> list[str]:
@@ -71,18 +103,29 @@ def index():
             "/api/observer-price-change",
             "/api/price",
             "/api/check",
+            "/api/quote-cache",
+            "/api/sources",
+            "/api/telegram-queue",
+            "/api/stream",
+            "/api/ticks",
+            "/metrics",
+            "/api/traces/slow",
+            "/api/debug/profile",
+            "/api/schedule",
+            "/api/checker/members",
+            "/api/stream/stats",
         ],
     })
 
 
 @app.route("/api/symbols")
 def api_symbols():
-    return jsonify({"symbols": get_symbol_list()})
+    return http_cache.cached("symbols", observers_version(), lambda: jsonify({"symbols": get_symbol_list()}))
 
 
 @app.route("/api/observers", methods=["GET"])
 def api_get_observers():
-    return jsonify(load_observers())
+    return http_cache.cached("observers", observers_version(), lambda: jsonify(load_observers()))
 
 
 @app.route("/api/observers", methods=["POST"])
@@ -96,34 +139,63 @@ def api_save_observers():
             observers[k.strip().upper()] = str(v).strip()
     old = load_observers()
     save_observers(observers)
+    stream.publish("observers", observers)
     for symbol, target_str in observers.items():
         if not target_str or old.get(symbol) == target_str:
             continue
-        try:
-            target = float(str(target_str).replace(",", "").strip())
-        except ValueError:
+        old_keys = {r.key for r in parse_rules(symbol, old.get(symbol))}
+        new_rules = [r for r in parse_rules(symbol, target_str) if r.key not in old_keys]
+        if not new_rules:
             continue
         prices = fetch_prices_dict([symbol], INDEX_CODES)
-        price = prices.get(symbol)
-        if price is None:
-            price = target
-        append_history(symbol, target, price)
-        logging.info("History row added for %s (target changed to %s, price %s)", symbol, target, price)
+        for rule in new_rules:
+            price = prices.get(symbol, rule.target)
+            append_history(symbol, rule.target, price)
+            logging.info("History row added for %s (target changed to %s, price %s)", symbol, rule.target, price)
     return jsonify({"ok": True, "observers": observers})
 
 
+def _events_page(kind: str):
+    try:
+        start = parse_time(request.args.get("from"))
+        end = parse_time(request.args.get("to"), end=True)
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    compact = request.args.get("format") == "compact"
+
+    def build():
+        try:
+            rows, next_cursor = query_events(
+                kind,
+                symbol=request.args.get("symbol", "").strip() or None,
+                start=start,
+                end=end,
+                cursor=request.args.get("cursor") or None,
+                limit=limit,
+                compact=compact,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            logging.exception("api/%s: %s", kind, e)
+            return jsonify({"error": str(e)}), 500
+        return jsonify({kind: rows, "next_cursor": next_cursor})
+
+    version = events_version(kind)
+    if version is None:
+        return http_cache.cached(kind, None, build)
+    return http_cache.cached(kind, version[0], build, last_modified=version[1])
+
+
 @app.route("/api/history")
 def api_history():
-    symbol = request.args.get("symbol", "").strip() or None
-    history = get_history_filtered(symbol)
-    return jsonify({"history": history})
+    return _events_page("history")
 
 
 @app.route("/api/observer-price-change")
 def api_observer_price_change():
-    symbol = request.args.get("symbol", "").strip() or None
-    rows = get_observer_price_change_filtered(symbol)
-    return jsonify({"observer_price_change": rows})
+    return _events_page("observer_price_change")
 
 
 @app.route("/api/price")
@@ -132,24 +204,145 @@ def api_price():
     if not symbol:
         return jsonify({"error": "Missing symbol"}), 400
     try:
-        prices = fetch_prices_dict([symbol], INDEX_CODES)
-        if symbol not in prices:
+        quotes = get_quotes([symbol], INDEX_CODES)
+        if symbol not in quotes:
             return jsonify({
                 "error": f"Could not get price for {symbol}. All sources failed (vnstock, VNDirect, Yahoo). Try again later or check network/VPN."
             }), 404
-        return jsonify({"symbol": symbol, "price": prices[symbol]})
+        return jsonify(quotes[symbol].to_dict())
     except Exception as e:
         logging.exception("api/price: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/ticks")
+def api_ticks():
+    symbol = (request.args.get("symbol") or "").strip().upper()
+    if not symbol:
+        return jsonify({**tick_store.stats(), "archive": tick_archive.stats()})
+    resolution = (request.args.get("resolution") or "raw").strip().lower()
+    if resolution != "raw" and resolution not in tick_store.RESOLUTIONS:
+        return jsonify({"error": f"resolution must be raw or one of {', '.join(tick_store.RESOLUTIONS)}"}), 400
+    try:
+        start = parse_time(request.args.get("from"))
+        end = parse_time(request.args.get("to"), end=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    ts, px = tick_store.ticks(symbol, start, end)
+    if TICK_ARCHIVE_ENABLED and start is not None:
+        first = datetime.fromtimestamp(ts[0], UTC7) if ts else end or datetime.now(UTC7)
+        if start.replace(tzinfo=UTC7) < first.replace(tzinfo=UTC7):
+            old_ts, old_px = tick_archive.read(symbol, start, first)
+            ts, px = old_ts + ts, old_px + px
+    if resolution == "raw":
+        data = {"t": [int(t * 1000) for t in ts], "price": px.tolist()}
+    else:
+        data = tick_store.bars_from(ts, px, resolution)
+    return jsonify({"symbol": symbol, "resolution": resolution, **data})
+
+
+@app.route("/api/quote-cache")
+def api_quote_cache():
+    return jsonify(quote_cache.stats())
+
+
+@app.route("/api/sources")
+def api_sources():
+    return jsonify(source_status())
+
+
+@app.route("/api/telegram-queue")
+def api_telegram_queue():
+    return jsonify(telegram_queue.stats())
+
+
+metrics.gauge("stockbot_quote_cache_entries", "Quotes held in the in-process cache.", lambda: quote_cache.stats()["size"])
+metrics.gauge("stockbot_telegram_queue_pending", "Telegram messages waiting to be sent.", lambda: telegram_queue.stats()["pending"])
+metrics.gauge("stockbot_stream_clients", "Connected /api/stream clients.", lambda: stream.stats()["clients"])
+metrics.gauge("stockbot_tick_store_symbols", "Symbols with an in-memory tick ring.", lambda: tick_store.stats()["symbols"])
+
+
+@app.route("/metrics")
+def api_metrics():
+    resp = Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    resp.cache_control.no_store = True
+    return resp
+
+
+@app.route("/api/schedule")
+def api_schedule():
+    return jsonify(session_schedule.status())
+
+
+@app.route("/api/checker/members")
+def api_checker_members():
+    index_set = set(INDEX_CODES)
+    symbols = [s for s in load_rule_index().symbols() if s not in index_set] + list(INDEX_CODES)
+    return jsonify(coordination.status(symbols))
+
+
+@app.route("/api/traces/slow")
+def api_slow_traces():
+    return jsonify(tracing.slow_traces())
+
+
+@app.route("/api/debug/profile")
+def api_profile():
+    """Sample all threads for ?seconds=N and return collapsed stacks (flamegraph.pl / speedscope input)."""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is off; set PROFILER_ENABLED=1"}), 404
+    try:
+        seconds = float(request.args.get("seconds") or 10)
+        hz = float(request.args.get("hz") or 0) or profiler.PROFILER_HZ
+    except ValueError:
+        return jsonify({"error": "seconds and hz must be numbers"}), 400
+    try:
+        counts = profiler.sample(seconds, hz, request.args.get("thread") or None)
+    except profiler.ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    resp = Response(profiler.collapsed(counts), content_type="text/plain; charset=utf-8")
+    resp.headers["Content-Disposition"] = f'inline; filename="profile-{datetime.now(UTC7):%Y%m%d-%H%M%S}.folded"'
+    resp.cache_control.no_store = True
+    return resp
+
+
+@app.route("/api/stream")
+def api_stream():
+    raw = (request.args.get("symbols") or "").strip()
+    symbols = {s.strip().upper() for s in raw.split(",") if s.strip()} or None
+    sub = stream.subscribe(symbols)
+    if sub is None:
+        return jsonify({"error": "Too many stream clients"}), 503
+
+    def generate():
+        try:
+            yield from sub.events()
+        finally:
+            stream.unsubscribe(sub)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/stream/stats")
+def api_stream_stats():
+    return jsonify(stream.stats())
+
+
 @app.route("/api/check", methods=["GET", "POST"])
 def api_run_check():
     try:
         if run_check is None:
             return jsonify({"ok": False, "error": "Checker not available"}), 500
-        run_check()
-        return jsonify({"ok": True, "message": "Check completed"})
+        result = run_check() or {"checked": [], "skipped": []}
+        message = "Check completed"
+        if result["skipped"]:
+            # Each worker only checks its hash-ring share; the others cover the rest on their own schedule.
+            message = f"Checked {len(result['checked'])} symbols; {len(result['skipped'])} belong to other workers"
+        return jsonify({"ok": True, "message": message, "member": coordination.member_id(), **result})
     except Exception as e:
         logging.exception("api/check: %s", e)
         return jsonify({"ok": False, "error": str(e)}), 500
@@ -162,7 +355,11 @@ def _run_broadcast_once() -> bool:
     if not SYMBOLS:
         logging.error("Set STOCK_SYMBOLS in .env (e.g. VCB,TCB,FPT,VNINDEX,VN30)")
         return False
-    body = fetch_prices(SYMBOLS, INDEX_CODES)
+    quotes = fetch_quotes(SYMBOLS, INDEX_CODES)
+    if quotes:
+        body = format_quotes(quotes.values())
+    else:
+        body = "⚠️ Could not fetch prices. Check network and symbols (e.g. VCB, TCB, FPT)."
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     msg = f"🇻🇳 Vietnam stock @ {now}\n\n{body}"
     ok = send_telegram(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, msg)
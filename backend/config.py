@@ -1,5 +1,5 @@
 import os
-from datetime import timezone, timedelta
+from datetime import date, timezone, timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -34,18 +34,142 @@ VNDIRECT_REST_URL = os.getenv(
 ).strip() or "https://finfo-api.vndirect.com.vn/v4/stock_prices"
 
 CHECK_INTERVAL_SEC = int(os.getenv("CHECK_INTERVAL_SEC", "30").strip() or "30")
+CHECK_SCHEDULE = os.getenv("CHECK_SCHEDULE", "session").strip().lower() or "session"
+CHECK_INTERVAL_TRADING_SEC = float(os.getenv("CHECK_INTERVAL_TRADING_SEC", "15").strip() or "15")
+CHECK_INTERVAL_AUCTION_SEC = float(os.getenv("CHECK_INTERVAL_AUCTION_SEC", "60").strip() or "60")
+CHECK_INTERVAL_IDLE_SEC = float(os.getenv("CHECK_INTERVAL_IDLE_SEC", "0").strip() or "0")
+
+
+def _parse_holidays(raw: str) -> frozenset[date]:
+    """Parse "2026-01-01, 2026-02-16..2026-02-20" into a set of dates (ranges inclusive)."""
+    out = set()
+    for part in raw.replace(";", ",").split(","):
+        first, _, last = part.strip().partition("..")
+        try:
+            if not first:
+                continue
+            day = date.fromisoformat(first.strip())
+            end = date.fromisoformat(last.strip()) if last.strip() else day
+        except ValueError:
+            continue
+        while day <= end:
+            out.add(day)
+            day += timedelta(days=1)
+    return frozenset(out)
+
+
+MARKET_HOLIDAYS = _parse_holidays(os.getenv("MARKET_HOLIDAYS", ""))
 PRICE_BAND_PCT = float(os.getenv("PRICE_BAND_PCT", "0.001").strip() or "0.001")
 EQUAL_TOLERANCE_PCT = float(os.getenv("EQUAL_TOLERANCE_PCT", "0.0001").strip() or "0.0001")
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "8").strip() or "8")
 WS_WAIT_SEC = int(os.getenv("WS_WAIT_SEC", "5").strip() or "5")
+WS_FEED_ENABLED = os.getenv("WS_FEED_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+WS_FEED_STALE_SEC = int(os.getenv("WS_FEED_STALE_SEC", "60").strip() or "60")
+WS_FEED_RECONNECT_MAX_SEC = int(os.getenv("WS_FEED_RECONNECT_MAX_SEC", "60").strip() or "60")
+WS_FEED_TRANSIENT_SEC = int(os.getenv("WS_FEED_TRANSIENT_SEC", "300").strip() or "300")
+WS_REGIST_CHUNK_SIZE = int(os.getenv("WS_REGIST_CHUNK_SIZE", "100").strip() or "100")
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "16").strip() or "16")
+FETCH_MODE = os.getenv("FETCH_MODE", "hedged").strip().lower() or "hedged"
+FETCH_HEDGE_DELAY_SEC = float(os.getenv("FETCH_HEDGE_DELAY_SEC", "2").strip() or "2")
+FETCH_DEADLINE_SEC = float(os.getenv("FETCH_DEADLINE_SEC", "20").strip() or "20")
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3").strip() or "3")
+CIRCUIT_OPEN_SEC = float(os.getenv("CIRCUIT_OPEN_SEC", "120").strip() or "120")
+SOURCE_LATENCY_WINDOW = int(os.getenv("SOURCE_LATENCY_WINDOW", "200").strip() or "200")
+SOURCE_ADAPTIVE_ORDER = os.getenv("SOURCE_ADAPTIVE_ORDER", "1").strip().lower() in ("1", "true", "yes")
+FETCH_BATCH_TIMEOUT_SEC = float(
+    os.getenv("FETCH_BATCH_TIMEOUT_SEC", "").strip() or max(CHECK_INTERVAL_SEC, REQUEST_TIMEOUT + 10)
+)
+VNSTOCK_CHUNK_SIZE = int(os.getenv("VNSTOCK_CHUNK_SIZE", "50").strip() or "50")
+VNDIRECT_REST_CHUNK_SIZE = int(os.getenv("VNDIRECT_REST_CHUNK_SIZE", "5").strip() or "5")
+YFINANCE_CHUNK_SIZE = int(os.getenv("YFINANCE_CHUNK_SIZE", "5").strip() or "5")
 MAX_MESSAGE_LENGTH = int(os.getenv("MAX_MESSAGE_LENGTH", "4096").strip() or "4096")
 
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4").strip() or "4")
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16").strip() or "16")
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2").strip() or "2")
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.3").strip() or "0.3")
+
+QUOTE_CACHE_TTL_SEC = float(os.getenv("QUOTE_CACHE_TTL_SEC", "10").strip() or "10")
+QUOTE_CACHE_MAX_SIZE = int(os.getenv("QUOTE_CACHE_MAX_SIZE", "5000").strip() or "5000")
+QUOTE_CACHE_WAIT_SEC = float(os.getenv("QUOTE_CACHE_WAIT_SEC", "60").strip() or "60")
+
+
+def _parse_ttl_overrides(raw: str) -> dict[str, float]:
+    out = {}
+    for part in raw.split(","):
+        sym, _, ttl = part.partition(":")
+        try:
+            if sym.strip():
+                out[sym.strip().upper()] = float(ttl)
+        except ValueError:
+            pass
+    return out
+
+
+QUOTE_CACHE_TTL_OVERRIDES = _parse_ttl_overrides(os.getenv("QUOTE_CACHE_TTL_OVERRIDES", ""))
+
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5").strip() or "5")
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "10").strip() or "10")
+DB_POOL_MAX_AGE_SEC = float(os.getenv("DB_POOL_MAX_AGE_SEC", "1800").strip() or "1800")
+DB_POOL_CHECK_IDLE_SEC = float(os.getenv("DB_POOL_CHECK_IDLE_SEC", "30").strip() or "30")
+DB_CONNECT_TIMEOUT_SEC = int(os.getenv("DB_CONNECT_TIMEOUT_SEC", "10").strip() or "10")
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200").strip() or "200")
+WRITE_BEHIND_FLUSH_SEC = float(os.getenv("WRITE_BEHIND_FLUSH_SEC", "2").strip() or "2")
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000").strip() or "10000")
+
+OBSERVER_CACHE_ENABLED = os.getenv("OBSERVER_CACHE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+OBSERVER_CACHE_FALLBACK_TTL_SEC = float(os.getenv("OBSERVER_CACHE_FALLBACK_TTL_SEC", "30").strip() or "30")
+
+TELEGRAM_QUEUE_ENABLED = os.getenv("TELEGRAM_QUEUE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+TELEGRAM_SEND_TIMEOUT_SEC = float(os.getenv("TELEGRAM_SEND_TIMEOUT_SEC", "15").strip() or "15")
+TELEGRAM_GLOBAL_RATE_PER_SEC = float(os.getenv("TELEGRAM_GLOBAL_RATE_PER_SEC", "25").strip() or "25")
+TELEGRAM_CHAT_INTERVAL_SEC = float(os.getenv("TELEGRAM_CHAT_INTERVAL_SEC", "1").strip() or "1")
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "8").strip() or "8")
+TELEGRAM_RETRY_MAX_SEC = float(os.getenv("TELEGRAM_RETRY_MAX_SEC", "300").strip() or "300")
+
+STREAM_QUOTE_INTERVAL_SEC = float(os.getenv("STREAM_QUOTE_INTERVAL_SEC", "5").strip() or "5")
+STREAM_CLIENT_QUEUE = int(os.getenv("STREAM_CLIENT_QUEUE", "100").strip() or "100")
+STREAM_KEEPALIVE_SEC = float(os.getenv("STREAM_KEEPALIVE_SEC", "15").strip() or "15")
+# Must match gunicorn's --threads. Each open stream holds a thread, so the cap
+# stays below it and leaves the rest for the API.
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16").strip() or "16")
+STREAM_MAX_CLIENTS = min(
+    int(os.getenv("STREAM_MAX_CLIENTS", "").strip() or WEB_THREADS // 2),
+    WEB_THREADS - 1,
+)
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "500").strip() or "500")
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "2000").strip() or "2000")
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024").strip() or "1024")
+
+TICK_STORE_CAPACITY = int(os.getenv("TICK_STORE_CAPACITY", "8192").strip() or "8192")
+TICK_STORE_MAX_SYMBOLS = int(os.getenv("TICK_STORE_MAX_SYMBOLS", "500").strip() or "500")
+TICK_MIN_INTERVAL_SEC = float(os.getenv("TICK_MIN_INTERVAL_SEC", "1").strip() or "1")
+TICK_ARCHIVE_ENABLED = os.getenv("TICK_ARCHIVE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+TICK_ARCHIVE_FLUSH_SEC = float(os.getenv("TICK_ARCHIVE_FLUSH_SEC", "5").strip() or "5")
+TICK_ARCHIVE_RETENTION_DAYS = int(os.getenv("TICK_ARCHIVE_RETENTION_DAYS", "90").strip() or "90")
+
+TRACE_SLOW_CHECK_SEC = float(os.getenv("TRACE_SLOW_CHECK_SEC", "10").strip() or "10")
+TRACE_SLOW_REQUEST_SEC = float(os.getenv("TRACE_SLOW_REQUEST_SEC", "2").strip() or "2")
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "20").strip() or "20")
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "").strip().lower() in ("1", "true", "yes")
+PROFILER_MAX_SEC = float(os.getenv("PROFILER_MAX_SEC", "60").strip() or "60")
+PROFILER_HZ = float(os.getenv("PROFILER_HZ", "100").strip() or "100")
+
+CHECKER_COORDINATION = os.getenv("CHECKER_COORDINATION", "lease").strip().lower() or "lease"
+CHECKER_HEARTBEAT_SEC = float(os.getenv("CHECKER_HEARTBEAT_SEC", "5").strip() or "5")
+CHECKER_LEASE_TTL_SEC = float(os.getenv("CHECKER_LEASE_TTL_SEC", "20").strip() or "20")
+CHECKER_RING_VNODES = int(os.getenv("CHECKER_RING_VNODES", "64").strip() or "64")
+
 LOCAL_DATA_DIR_NAME = os.getenv("LOCAL_DATA_DIR", "local-data").strip() or "local-data"
 
 def _project_root() -> Path:
     return Path(__file__).resolve().parent.parent
 
 DATA_DIR = _project_root() / LOCAL_DATA_DIR_NAME
+LOCAL_DB_FILE = os.getenv("LOCAL_DB_FILE", "store.sqlite3").strip() or "store.sqlite3"
 
 UTC_OFFSET_HOURS = int(os.getenv("UTC_OFFSET_HOURS", "7").strip() or "7")
 UTC7 = timezone(timedelta(hours=UTC_OFFSET_HOURS))
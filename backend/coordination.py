@@ -0,0 +1,212 @@
+"""Split the background checker's symbols across workers and nodes.
+
+Every process that runs the checker is a member. It holds a lease row in
+checker_members (Postgres, or the local SQLite file when DATABASE_URL is
+unset) and renews it every CHECKER_HEARTBEAT_SEC. A member whose lease is
+older than CHECKER_LEASE_TTL_SEC is dropped by the next heartbeat of anyone
+else. The live members form a consistent-hash ring with CHECKER_RING_VNODES
+points each, and a symbol belongs to the member whose point follows the
+symbol's hash. When a member joins or dies, only the symbols next to its
+points move.
+
+Two rules keep an alert from firing twice while the members' views differ:
+
+- a member drops a symbol as soon as its own view no longer gives it that
+  symbol;
+- a member picks up a symbol that someone else held only after its view has
+  been stable for two heartbeats, by which time the previous owner has seen
+  the change too.
+
+A member that cannot renew its lease for CHECKER_LEASE_TTL_SEC owns nothing,
+because the others may already have taken its symbols.
+
+CHECKER_COORDINATION=off makes every process check every symbol, which was
+the behaviour before this module. The lease still runs then, because the
+Telegram outbox uses it to tell a live worker's messages from a dead one's.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from bisect import bisect
+from typing import Callable, Iterable, Optional
+
+from . import metrics, store
+from .config import (
+    CHECKER_COORDINATION,
+    CHECKER_HEARTBEAT_SEC,
+    CHECKER_LEASE_TTL_SEC,
+    CHECKER_RING_VNODES,
+)
+
+logger = logging.getLogger(__name__)
+
+HEARTBEATS = metrics.counter("stockbot_checker_heartbeats_total", "Lease renewals by outcome (ok, error).", ("outcome",))
+REBALANCES = metrics.counter("stockbot_checker_rebalances_total", "Membership changes seen by this member.")
+
+_GRACE_SEC = 2 * CHECKER_HEARTBEAT_SEC
+
+
+def _hash(key: str) -> int:
+    # Python's hash() is salted per process; the ring must agree across processes.
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, members: Iterable[str] = (), vnodes: int = CHECKER_RING_VNODES) -> None:
+        self.members = tuple(sorted(set(members)))
+        points = sorted((_hash(f"{m}#{i}"), m) for m in self.members for i in range(max(1, vnodes)))
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        return self._owners[bisect(self._keys, _hash(key)) % len(self._keys)]
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+_lock = threading.Lock()
+_member_id: Optional[str] = None
+_ring = HashRing()
+_settled = HashRing()  # the ring before the latest change; see owns()
+_changed_at = 0.0
+_last_ok: Optional[float] = None
+_listeners: list[Callable[[tuple[str, ...]], None]] = []
+_thread: threading.Thread | None = None
+
+
+def enabled() -> bool:
+    return CHECKER_COORDINATION != "off"
+
+
+def member_id() -> Optional[str]:
+    """This process's member id, or None before start()."""
+    return _member_id
+
+
+def on_change(fn: Callable[[tuple[str, ...]], None]) -> None:
+    """fn(live members) runs on the heartbeat thread after each membership change."""
+    _listeners.append(fn)
+
+
+def _fenced(now: float) -> bool:
+    return _last_ok is None or now - _last_ok > CHECKER_LEASE_TTL_SEC
+
+
+def owns(symbol: str) -> bool:
+    """Whether this process should check `symbol`. True for everything while coordination is off or until start() joins the ring."""
+    if _member_id is None or not enabled():
+        return True
+    now = time.monotonic()
+    with _lock:
+        if _fenced(now) or _ring.owner(symbol) != _member_id:
+            return False
+        if now - _changed_at >= _GRACE_SEC:
+            return True
+        return _settled.owner(symbol) in (_member_id, None)
+
+
+def _apply(members: list[str]) -> None:
+    global _ring, _settled, _changed_at, _last_ok
+    now = time.monotonic()
+    with _lock:
+        # After an expired lease the others may have taken our symbols, so rejoin from scratch.
+        rejoin = _fenced(now)
+        _last_ok = now
+        if tuple(members) == _ring.members and not rejoin:
+            return
+        before = _ring
+        if rejoin:
+            # Whatever another live member holds is only taken after the grace period.
+            _settled = HashRing(m for m in members if m != _member_id)
+        elif now - _changed_at >= _GRACE_SEC:
+            # A second change inside the grace period keeps the older settled ring,
+            # so a symbol still being handed over waits for the full grace again.
+            _settled = before
+        _ring = HashRing(members)
+        _changed_at = now
+    REBALANCES.inc()
+    joined = sorted(set(members) - set(before.members))
+    left = sorted(set(before.members) - set(members))
+    logger.info(
+        "Checker members: %d live%s%s",
+        len(members),
+        f", joined {', '.join(joined)}" if joined else "",
+        f", left {', '.join(left)}" if left else "",
+    )
+    for fn in _listeners:
+        try:
+            fn(tuple(members))
+        except Exception as e:
+            logger.exception("coordination listener: %s", e)
+
+
+def _heartbeat() -> bool:
+    try:
+        members = store.heartbeat_member(_member_id, CHECKER_LEASE_TTL_SEC)
+    except Exception as e:
+        HEARTBEATS.inc("error")
+        if not _fenced(time.monotonic()):
+            logger.warning("Checker lease renewal failed: %s", e)
+        return False
+    HEARTBEATS.inc("ok")
+    if _member_id not in members:
+        members = sorted({*members, _member_id})
+    _apply(members)
+    return True
+
+
+def _loop() -> None:
+    was_fenced = False
+    while True:
+        time.sleep(CHECKER_HEARTBEAT_SEC)
+        _heartbeat()
+        fenced = _fenced(time.monotonic())
+        if fenced != was_fenced and enabled():
+            if fenced:
+                logger.warning("Checker lease expired; pausing checks until it can be renewed")
+            else:
+                logger.info("Checker lease renewed; resuming checks")
+            was_fenced = fenced
+
+
+def _leave() -> None:
+    if _member_id is not None:
+        store.leave_member(_member_id)
+
+
+def start() -> None:
+    """Join the ring and keep the lease alive. Call once per process, after forking."""
+    global _member_id, _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _member_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        _thread = threading.Thread(target=_loop, daemon=True, name="checker-heartbeat")
+    _heartbeat()
+    atexit.register(_leave)
+    _thread.start()
+    logger.info("Checker member %s joined (%d live)", _member_id, len(_ring))
+
+
+def status(symbols: Iterable[str] = ()) -> dict:
+    symbols = list(symbols)
+    with _lock:
+        ring, last_ok = _ring, _last_ok
+    return {
+        "mode": CHECKER_COORDINATION if enabled() else "off",
+        "member": _member_id,
+        "members": list(ring.members),
+        "lease_age_sec": None if last_ok is None else round(time.monotonic() - last_ok, 3),
+        "symbols": len(symbols),
+        "owned": [s for s in symbols if owns(s)],
+    }
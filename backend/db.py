@@ -1,13 +1,26 @@
 import logging
 import os
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
 
-from .config import UTC7
+from .config import (
+    DB_CONNECT_TIMEOUT_SEC,
+    DB_POOL_CHECK_IDLE_SEC,
+    DB_POOL_MAX,
+    DB_POOL_MAX_AGE_SEC,
+    DB_POOL_TIMEOUT_SEC,
+    UTC7,
+)
+from . import metrics, tracing
+from .events import rows_to_dicts
 
 logger = logging.getLogger(__name__)
 
+QUERY_SECONDS = metrics.histogram("stockbot_db_query_seconds", "Postgres query latency per db.py function (time holding a pooled cursor).", ("function",))
+
 DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
 
 
@@ -20,12 +33,96 @@ def _conn():
         url = url.replace("postgres://", "postgresql://", 1)
     if "sslmode" not in url and "postgresql" in url:
         url = url + ("&" if "?" in url else "?") + "sslmode=require"
-    return psycopg2.connect(url)
+    return psycopg2.connect(url, connect_timeout=DB_CONNECT_TIMEOUT_SEC)
+
+
+class _Pool:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(1, maxsize)
+        self.size = 0
+        self.idle: list[tuple[Any, float, float]] = []
+        self.cond = threading.Condition()
+
+    def acquire(self) -> tuple[Any, float]:
+        deadline = time.monotonic() + DB_POOL_TIMEOUT_SEC
+        while True:
+            with self.cond:
+                while not self.idle and self.size >= self.maxsize:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise TimeoutError("db pool exhausted")
+                    self.cond.wait(left)
+                if self.idle:
+                    conn, created, last_used = self.idle.pop()
+                else:
+                    self.size += 1
+                    conn = None
+            if conn is None:
+                try:
+                    return _conn(), time.monotonic()
+                except Exception:
+                    self._forget()
+                    raise
+            if self._healthy(conn, created, last_used):
+                return conn, created
+            self.discard(conn)
+
+    def _healthy(self, conn, created: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created > DB_POOL_MAX_AGE_SEC:
+            return False
+        if now - last_used < DB_POOL_CHECK_IDLE_SEC:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def release(self, conn, created: float) -> None:
+        if conn.closed:
+            self._forget()
+            return
+        with self.cond:
+            self.idle.append((conn, created, time.monotonic()))
+            self.cond.notify()
+
+    def discard(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self) -> None:
+        with self.cond:
+            self.size -= 1
+            self.cond.notify()
+
+    def close_all(self) -> None:
+        with self.cond:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for conn, _, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+_pool = _Pool(DB_POOL_MAX)
 
 
 @contextmanager
-def _cursor():
-    conn = _conn()
+def _raw_cursor(label: str):
+    """A pooled cursor, committed on success. Its time is observed in QUERY_SECONDS under `label`."""
+    import psycopg2
+    started = time.perf_counter()
+    with tracing.span("db.acquire"):
+        conn, created = _pool.acquire()
+    broken = False
     try:
         cur = conn.cursor()
         try:
@@ -33,100 +130,352 @@ def _cursor():
             conn.commit()
         finally:
             cur.close()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
     finally:
-        conn.close()
+        if broken or conn.closed:
+            _pool.discard(conn)
+        else:
+            if conn.status != psycopg2.extensions.STATUS_READY:
+                try:
+                    conn.rollback()
+                except Exception:
+                    _pool.discard(conn)
+                    conn = None
+            if conn is not None:
+                _pool.release(conn, created)
+        QUERY_SECONDS.observe(time.perf_counter() - started, label)
+
+
+@contextmanager
+def _cursor(label: str):
+    if not _schema_ready:
+        ensure_schema()
+    with _raw_cursor(label) as cur:
+        yield cur
+
+
+MIGRATIONS: list[tuple[int, list[str]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS observers (
+            symbol VARCHAR(20) PRIMARY KEY,
+            target_price TEXT NOT NULL DEFAULT ''
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            id SERIAL PRIMARY KEY,
+            symbol VARCHAR(20) NOT NULL,
+            target NUMERIC NOT NULL,
+            price NUMERIC NOT NULL,
+            at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS last_alerted (
+            symbol VARCHAR(20) PRIMARY KEY,
+            target NUMERIC NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_history_symbol ON history(symbol);",
+        "CREATE INDEX IF NOT EXISTS idx_history_at ON history(at DESC);",
+        """
+        CREATE TABLE IF NOT EXISTS observer_price_change (
+            id SERIAL PRIMARY KEY,
+            symbol VARCHAR(20) NOT NULL,
+            target NUMERIC NOT NULL,
+            price NUMERIC NOT NULL,
+            at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_symbol ON observer_price_change(symbol);",
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_at ON observer_price_change(at DESC);",
+    ]),
+    (2, [
+        "ALTER TABLE last_alerted ALTER COLUMN symbol TYPE VARCHAR(64);",
+    ]),
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS telegram_outbox (
+            id SERIAL PRIMARY KEY,
+            kind VARCHAR(32) NOT NULL,
+            chat_id VARCHAR(64) NOT NULL,
+            text TEXT NOT NULL,
+            dedupe_key VARCHAR(128),
+            payload TEXT NOT NULL DEFAULT '{}',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ]),
+    (4, [
+        "UPDATE history SET symbol = UPPER(TRIM(symbol)) WHERE symbol <> UPPER(TRIM(symbol));",
+        "UPDATE observer_price_change SET symbol = UPPER(TRIM(symbol)) WHERE symbol <> UPPER(TRIM(symbol));",
+        "CREATE INDEX IF NOT EXISTS idx_history_symbol_at ON history(symbol, at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_history_at_id ON history(at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_symbol_at ON observer_price_change(symbol, at DESC, id DESC);",
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_at_id ON observer_price_change(at DESC, id DESC);",
+        "DROP INDEX IF EXISTS idx_history_symbol;",
+        "DROP INDEX IF EXISTS idx_history_at;",
+        "DROP INDEX IF EXISTS idx_observer_price_change_symbol;",
+        "DROP INDEX IF EXISTS idx_observer_price_change_at;",
+    ]),
+    (5, [
+        """
+        CREATE TABLE IF NOT EXISTS checker_members (
+            member_id VARCHAR(128) PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """,
+        "ALTER TABLE telegram_outbox ADD COLUMN IF NOT EXISTS owner VARCHAR(128);",
+    ]),
+]
+
+OBSERVERS_CHANNEL = "observers_changed"
+STREAM_CHANNEL = "stream_events"
+
+_SCHEMA_LOCK_ID = 5_003_001
+_OBSERVERS_LOCK_ID = 5_003_002
+_LAST_ALERTED_LOCK_ID = 5_003_003
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def ensure_schema() -> None:
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with _raw_cursor("ensure_schema") as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_SCHEMA_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cur.fetchall()}
+            for version, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                for stmt in statements:
+                    cur.execute(stmt)
+                cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+                logger.info("db migration %s applied", version)
+        _schema_ready = True
 
 
 def init_schema() -> None:
-    with _cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS observers (
-                symbol VARCHAR(20) PRIMARY KEY,
-                target_price TEXT NOT NULL DEFAULT ''
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS history (
-                id SERIAL PRIMARY KEY,
-                symbol VARCHAR(20) NOT NULL,
-                target NUMERIC NOT NULL,
-                price NUMERIC NOT NULL,
-                at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS last_alerted (
-                symbol VARCHAR(20) PRIMARY KEY,
-                target NUMERIC NOT NULL
-            );
-        """)
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_symbol ON history(symbol);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_history_at ON history(at DESC);")
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS observer_price_change (
-                id SERIAL PRIMARY KEY,
-                symbol VARCHAR(20) NOT NULL,
-                target NUMERIC NOT NULL,
-                price NUMERIC NOT NULL,
-                at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_observer_price_change_symbol ON observer_price_change(symbol);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_observer_price_change_at ON observer_price_change(at DESC);")
+    ensure_schema()
+
+
+def close_pool() -> None:
+    _pool.close_all()
+
+
+def fetch_observers() -> dict[str, str]:
+    """Like load_observers, but raises on error so the observer cache can keep its last good copy."""
+    with _cursor("fetch_observers") as cur:
+        cur.execute("SELECT symbol, target_price FROM observers")
+        return {row[0]: row[1] or "" for row in cur.fetchall()}
 
 
 def load_observers() -> dict[str, str]:
-    obs = {}
     try:
-        init_schema()
-        with _cursor() as cur:
-            cur.execute("SELECT symbol, target_price FROM observers")
-            for row in cur.fetchall():
-                obs[row[0]] = row[1] or ""
+        return fetch_observers()
     except Exception as e:
         logger.warning("db load_observers: %s", e)
-    return obs
+        return {}
+
+
+def _apply_diff(cur, table: str, key: str, column: str, current: dict, wanted: dict) -> tuple[int, int]:
+    from psycopg2.extras import execute_values
+    changed = [(k, v) for k, v in wanted.items() if k not in current or current[k] != v]
+    removed = [k for k in current if k not in wanted]
+    if changed:
+        execute_values(
+            cur,
+            f"INSERT INTO {table} ({key}, {column}) VALUES %s "
+            f"ON CONFLICT ({key}) DO UPDATE SET {column} = EXCLUDED.{column}",
+            changed,
+            page_size=len(changed),
+        )
+    if removed:
+        cur.execute(f"DELETE FROM {table} WHERE {key} = ANY(%s)", (removed,))
+    return len(changed), len(removed)
 
 
 def save_observers(observers: dict[str, str]) -> None:
+    wanted = {}
+    for sym, target in observers.items():
+        if sym and sym.strip():
+            wanted[sym.strip().upper()] = str(target).strip()
     try:
-        init_schema()
-        with _cursor() as cur:
-            cur.execute("DELETE FROM observers")
-            for sym, target in observers.items():
-                if sym:
-                    cur.execute(
-                        "INSERT INTO observers (symbol, target_price) VALUES (%s, %s) ON CONFLICT (symbol) DO UPDATE SET target_price = EXCLUDED.target_price",
-                        (sym.strip().upper(), str(target).strip()),
-                    )
+        with _cursor("save_observers") as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_OBSERVERS_LOCK_ID,))
+            cur.execute("SELECT symbol, target_price FROM observers")
+            current = {row[0]: row[1] or "" for row in cur.fetchall()}
+            if any(_apply_diff(cur, "observers", "symbol", "target_price", current, wanted)):
+                cur.execute(f"NOTIFY {OBSERVERS_CHANNEL}")
     except Exception as e:
         logger.warning("db save_observers: %s", e)
 
 
+_listener_lock = threading.Lock()
+_listener_thread: threading.Thread | None = None
+_listener_ok = False
+_observers_generation = 0
+_stream_handler: Callable[[str], None] | None = None
+
+
+def _listen_loop() -> None:
+    global _listener_ok, _observers_generation
+    import select
+    delay = 1.0
+    while True:
+        conn = None
+        try:
+            conn = _conn()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {OBSERVERS_CHANNEL}")
+                cur.execute(f"LISTEN {STREAM_CHANNEL}")
+            _observers_generation += 1
+            _listener_ok = True
+            delay = 1.0
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                conn.poll()
+                notifies = list(conn.notifies)
+                conn.notifies.clear()
+                if any(n.channel == OBSERVERS_CHANNEL for n in notifies):
+                    _observers_generation += 1
+                handler = _stream_handler
+                for n in notifies:
+                    if n.channel == STREAM_CHANNEL and handler is not None:
+                        try:
+                            handler(n.payload)
+                        except Exception as e:
+                            logger.warning("db stream event: %s", e)
+        except Exception as e:
+            logger.info("db listener: %s", e)
+        _listener_ok = False
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        time.sleep(delay)
+        delay = min(delay * 2, 60)
+
+
+def start_listener() -> None:
+    global _listener_thread
+    if _listener_thread is None:
+        with _listener_lock:
+            if _listener_thread is None:
+                _listener_thread = threading.Thread(target=_listen_loop, daemon=True, name="db-listen")
+                _listener_thread.start()
+
+
+def observers_version() -> int | None:
+    start_listener()
+    return _observers_generation if _listener_ok else None
+
+
+def set_stream_handler(fn: Callable[[str], None]) -> None:
+    """fn(payload) runs on the listener thread for every NOTIFY on stream_events, this process's own included."""
+    global _stream_handler
+    _stream_handler = fn
+    start_listener()
+
+
+def notify_stream(payload: str) -> None:
+    with _raw_cursor("notify_stream") as cur:
+        cur.execute("SELECT pg_notify(%s, %s)", (STREAM_CHANNEL, payload))
+
+
+def query_events(
+    table: str,
+    symbol: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: tuple[str, int] | None = None,
+    limit: int = 500,
+) -> tuple[list[tuple], tuple[str, int] | None]:
+    """Newest-first page of raw (id, symbol, target, price, at) rows.
+
+    Keyset pagination on (at, id): `after` is the last (at, id) already returned,
+    and the returned key is where the next page starts (None on the last page).
+    """
+    where, params = [], []
+    if symbol:
+        where.append("symbol = %s")
+        params.append(symbol.strip().upper())
+    if start is not None:
+        where.append("at >= %s")
+        params.append(start)
+    if end is not None:
+        where.append("at < %s")
+        params.append(end)
+    if after is not None:
+        where.append("(at, id) < (%s::timestamp, %s)")
+        params.extend(after)
+    sql = f"SELECT id, symbol, target, price, at FROM {EVENT_TABLES[table]}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
+    with _cursor("query_events") as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1][4].isoformat(sep=" "), rows[-1][0])
+    return rows, next_key
+
+
+def events_version(table: str) -> tuple[int, datetime | None]:
+    """(MAX(id), MAX(at)) of an append-only event table; both are index lookups."""
+    t = EVENT_TABLES[table]
+    with _cursor("events_version") as cur:
+        cur.execute(f"SELECT (SELECT MAX(id) FROM {t}), (SELECT MAX(at) FROM {t})")
+        max_id, max_at = cur.fetchone()
+    return max_id or 0, max_at
+
+
 def load_history() -> list[dict[str, Any]]:
-    out = []
-    try:
-        with _cursor() as cur:
-            cur.execute("SELECT symbol, target, price, at FROM history ORDER BY at DESC LIMIT 500")
-            for row in cur.fetchall():
-                out.append({
-                    "symbol": row[0],
-                    "target": float(row[1]) if row[1] is not None else 0,
-                    "price": float(row[2]) if row[2] is not None else 0,
-                    "at": row[3].strftime("%Y-%m-%d %H:%M:%S") if hasattr(row[3], "strftime") else str(row[3]),
-                })
-    except Exception as e:
-        logger.warning("db load_history: %s", e)
-    return out
+    return get_history_filtered(None)
+
+
+EVENT_TABLES = {"history": "history", "observer_price_change": "observer_price_change"}
+
+
+def insert_event_rows(rows_by_kind: dict[str, list[tuple]]) -> None:
+    from psycopg2.extras import execute_values
+    with _cursor("insert_event_rows") as cur:
+        for kind, rows in rows_by_kind.items():
+            if rows:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {EVENT_TABLES[kind]} (symbol, target, price, at) VALUES %s",
+                    [(str(sym).strip().upper(), *rest) for sym, *rest in rows],
+                    page_size=len(rows),
+                )
 
 
 def append_history(symbol: str, target: float, price: float) -> None:
     try:
-        with _cursor() as cur:
-            cur.execute(
-                "INSERT INTO history (symbol, target, price, at) VALUES (%s, %s, %s, %s)",
-                (symbol, target, price, datetime.now(UTC7).replace(tzinfo=None)),
-            )
+        insert_event_rows({"history": [(symbol, target, price, datetime.now(UTC7).replace(tzinfo=None))]})
     except Exception as e:
         logger.warning("db append_history: %s", e)
 
@@ -134,7 +483,7 @@ def append_history(symbol: str, target: float, price: float) -> None:
 def load_last_alerted() -> dict[str, float]:
     out = {}
     try:
-        with _cursor() as cur:
+        with _cursor("load_last_alerted") as cur:
             cur.execute("SELECT symbol, target FROM last_alerted")
             for row in cur.fetchall():
                 out[row[0]] = float(row[1])
@@ -144,69 +493,134 @@ def load_last_alerted() -> dict[str, float]:
 
 
 def save_last_alerted(last: dict[str, float]) -> None:
+    wanted = {sym: float(target) for sym, target in last.items() if sym}
     try:
-        with _cursor() as cur:
-            cur.execute("DELETE FROM last_alerted")
-            for sym, target in last.items():
-                cur.execute(
-                    "INSERT INTO last_alerted (symbol, target) VALUES (%s, %s) ON CONFLICT (symbol) DO UPDATE SET target = EXCLUDED.target",
-                    (sym, target),
-                )
+        with _cursor("save_last_alerted") as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LAST_ALERTED_LOCK_ID,))
+            cur.execute("SELECT symbol, target FROM last_alerted")
+            current = {row[0]: float(row[1]) for row in cur.fetchall()}
+            _apply_diff(cur, "last_alerted", "symbol", "target", current, wanted)
     except Exception as e:
         logger.warning("db save_last_alerted: %s", e)
 
 
+def update_last_alerted(changed: dict[str, float], removed: list[str]) -> None:
+    """Upsert and delete single keys; unlike save_last_alerted it leaves every other key alone."""
+    from psycopg2.extras import execute_values
+    try:
+        with _cursor("update_last_alerted") as cur:
+            if changed:
+                execute_values(
+                    cur,
+                    "INSERT INTO last_alerted (symbol, target) VALUES %s "
+                    "ON CONFLICT (symbol) DO UPDATE SET target = EXCLUDED.target",
+                    [(k, float(v)) for k, v in changed.items()],
+                    page_size=len(changed),
+                )
+            if removed:
+                cur.execute("DELETE FROM last_alerted WHERE symbol = ANY(%s)", (list(removed),))
+    except Exception as e:
+        logger.warning("db update_last_alerted: %s", e)
+
+
 def get_history_filtered(symbol: str | None) -> list[dict[str, Any]]:
-    if not symbol:
-        return load_history()
-    out = []
     try:
-        with _cursor() as cur:
-            cur.execute(
-                "SELECT symbol, target, price, at FROM history WHERE UPPER(symbol) = UPPER(%s) ORDER BY at DESC LIMIT 500",
-                (symbol.strip(),),
-            )
-            for row in cur.fetchall():
-                out.append({
-                    "symbol": row[0],
-                    "target": float(row[1]) if row[1] is not None else 0,
-                    "price": float(row[2]) if row[2] is not None else 0,
-                    "at": row[3].strftime("%Y-%m-%d %H:%M:%S") if hasattr(row[3], "strftime") else str(row[3]),
-                })
+        return rows_to_dicts(query_events("history", symbol)[0])
     except Exception as e:
         logger.warning("db get_history_filtered: %s", e)
-    return out
+        return []
 
 
 def insert_observer_price_change(symbol: str, target: float, price: float) -> None:
     try:
-        with _cursor() as cur:
-            cur.execute(
-                "INSERT INTO observer_price_change (symbol, target, price, at) VALUES (%s, %s, %s, %s)",
-                (symbol, target, price, datetime.now(UTC7).replace(tzinfo=None)),
-            )
+        insert_event_rows({"observer_price_change": [(symbol, target, price, datetime.now(UTC7).replace(tzinfo=None))]})
     except Exception as e:
         logger.warning("db insert_observer_price_change: %s", e)
 
 
 def get_observer_price_change_filtered(symbol: str | None) -> list[dict[str, Any]]:
-    out = []
     try:
-        with _cursor() as cur:
-            if symbol:
-                cur.execute(
-                    "SELECT symbol, target, price, at FROM observer_price_change WHERE UPPER(symbol) = UPPER(%s) ORDER BY at DESC LIMIT 500",
-                    (symbol.strip(),),
-                )
-            else:
-                cur.execute("SELECT symbol, target, price, at FROM observer_price_change ORDER BY at DESC LIMIT 500")
-            for row in cur.fetchall():
-                out.append({
-                    "symbol": row[0],
-                    "target": float(row[1]) if row[1] is not None else 0,
-                    "price": float(row[2]) if row[2] is not None else 0,
-                    "at": row[3].strftime("%Y-%m-%d %H:%M:%S") if hasattr(row[3], "strftime") else str(row[3]),
-                })
+        return rows_to_dicts(query_events("observer_price_change", symbol)[0])
     except Exception as e:
         logger.warning("db get_observer_price_change_filtered: %s", e)
-    return out
+        return []
+
+
+def outbox_add(
+    kind: str, chat_id: str, text: str, dedupe_key: str | None, payload: str, owner: str | None = None
+) -> int | None:
+    try:
+        with _cursor("outbox_add") as cur:
+            cur.execute(
+                "INSERT INTO telegram_outbox (kind, chat_id, text, dedupe_key, payload, owner) "
+                "VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
+                (kind, chat_id, text, dedupe_key, payload, owner),
+            )
+            return cur.fetchone()[0]
+    except Exception as e:
+        logger.warning("db outbox_add: %s", e)
+        return None
+
+
+def claim_outbox(owner: str, ttl: float) -> list[dict[str, Any]]:
+    """Take over unowned rows and rows whose owner's lease has expired; returns only the rows taken."""
+    try:
+        with _cursor("claim_outbox") as cur:
+            cur.execute(
+                """
+                UPDATE telegram_outbox o SET owner = %s
+                WHERE o.owner IS DISTINCT FROM %s AND NOT EXISTS (
+                    SELECT 1 FROM checker_members m
+                    WHERE m.member_id = o.owner AND m.heartbeat_at >= now() - make_interval(secs => %s)
+                )
+                RETURNING id, kind, chat_id, text, dedupe_key, payload, attempts
+                """,
+                (owner, owner, ttl),
+            )
+            return [
+                {"id": r[0], "kind": r[1], "chat_id": r[2], "text": r[3], "dedupe_key": r[4], "payload": r[5], "attempts": r[6]}
+                for r in sorted(cur.fetchall())
+            ]
+    except Exception as e:
+        logger.warning("db claim_outbox: %s", e)
+        return []
+
+
+def outbox_update(outbox_id: int, attempts: int) -> None:
+    try:
+        with _cursor("outbox_update") as cur:
+            cur.execute("UPDATE telegram_outbox SET attempts = %s WHERE id = %s", (attempts, outbox_id))
+    except Exception as e:
+        logger.warning("db outbox_update: %s", e)
+
+
+def outbox_delete(outbox_id: int) -> None:
+    try:
+        with _cursor("outbox_delete") as cur:
+            cur.execute("DELETE FROM telegram_outbox WHERE id = %s", (outbox_id,))
+    except Exception as e:
+        logger.warning("db outbox_delete: %s", e)
+
+
+def heartbeat_member(member_id: str, ttl: float) -> list[str]:
+    """Renew this member's lease, drop leases older than `ttl` and return the live members, sorted.
+
+    Timestamps come from the database clock, so nodes with skewed clocks agree.
+    """
+    with _cursor("heartbeat_member") as cur:
+        cur.execute(
+            "INSERT INTO checker_members (member_id) VALUES (%s) "
+            "ON CONFLICT (member_id) DO UPDATE SET heartbeat_at = now()",
+            (member_id,),
+        )
+        cur.execute("DELETE FROM checker_members WHERE heartbeat_at < now() - make_interval(secs => %s)", (ttl,))
+        cur.execute("SELECT member_id FROM checker_members ORDER BY member_id")
+        return [row[0] for row in cur.fetchall()]
+
+
+def leave_member(member_id: str) -> None:
+    try:
+        with _cursor("leave_member") as cur:
+            cur.execute("DELETE FROM checker_members WHERE member_id = %s", (member_id,))
+    except Exception as e:
+        logger.warning("db leave_member: %s", e)
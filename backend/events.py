@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+from .config import UTC_OFFSET_HOURS
+
+# Rows from history / observer_price_change as read by db.query_events and local_db.query_events:
+# (id, symbol, target, price, at). `at` is a naive UTC+7 datetime from Postgres or text from SQLite.
+COLUMNS = ("id", "symbol", "target", "price", "at")
+
+_EPOCH_LOCAL = datetime(1970, 1, 1) + timedelta(hours=UTC_OFFSET_HOURS)
+_MS = timedelta(milliseconds=1)
+
+
+def _at_text(at) -> str:
+    if isinstance(at, datetime):
+        return at.isoformat(sep=" ", timespec="seconds")
+    return str(at)[:19]
+
+
+def _at_ms(at) -> int:
+    if not isinstance(at, datetime):
+        at = datetime.fromisoformat(str(at))
+    return (at - _EPOCH_LOCAL) // _MS
+
+
+def rows_to_dicts(rows: list[tuple]) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": r[0],
+            "symbol": r[1],
+            "target": float(r[2]) if r[2] is not None else 0,
+            "price": float(r[3]) if r[3] is not None else 0,
+            "at": _at_text(r[4]),
+        }
+        for r in rows
+    ]
+
+
+def rows_to_columns(rows: list[tuple]) -> dict[str, list]:
+    """Columnar form for ?format=compact: one array per column, `at` as epoch milliseconds."""
+    return {
+        "id": [r[0] for r in rows],
+        "symbol": [r[1] for r in rows],
+        "target": [float(r[2]) if r[2] is not None else 0 for r in rows],
+        "price": [float(r[3]) if r[3] is not None else 0 for r in rows],
+        "at": [_at_ms(r[4]) for r in rows],
+    }
@@ -1,32 +1,58 @@
 import asyncio
-import json
 import logging
 import random
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
 from datetime import datetime, timedelta
-from typing import Optional
-
-import requests
+from functools import partial
+from typing import Callable, Optional
 
 from .config import (
+    FETCH_BATCH_TIMEOUT_SEC,
+    FETCH_DEADLINE_SEC,
+    FETCH_HEDGE_DELAY_SEC,
+    FETCH_MAX_WORKERS,
+    FETCH_MODE,
     REQUEST_TIMEOUT,
     SAMPLE_HPG_MAX,
     SAMPLE_HPG_MIN,
     SAMPLE_PRICES,
     SAMPLE_PRICES_ROTATE_MINUTES,
+    VNDIRECT_REST_CHUNK_SIZE,
     VNDIRECT_REST_URL,
     VNDIRECT_WS_URL,
+    VNSTOCK_CHUNK_SIZE,
+    WS_FEED_ENABLED,
+    WS_REGIST_CHUNK_SIZE,
     WS_WAIT_SEC,
+    YFINANCE_CHUNK_SIZE,
 )
+from . import metrics, quote_cache, source_health, tick_store, tracing, ws_feed
+from .http_pool import get_session
+from .quotes import Quote, now_utc7, parse_date
+from .ws_feed import BA, MI, parse_message, regist_message, split_symbols
 
 logger = logging.getLogger(__name__)
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; StockBot/1.0)", "Accept": "application/json"}
 
-BA, SP, MI = "BA", "SP", "MI"
-MI_IDS = {"10": "VNINDEX", "11": "VN30", "12": "HNX30", "13": "VNXALL", "02": "HNX", "03": "UPCOM"}
+INDEX_SET = {"VNINDEX", "VN30", "HNXINDEX", "HNX30"}
+
+SOURCE_SECONDS = metrics.histogram("stockbot_source_fetch_seconds", "Time spent in one price source call.", ("source",))
+SOURCE_CALLS = metrics.counter(
+    "stockbot_source_fetch_total", "Price source calls by outcome (ok, empty, error, cancelled, skipped).", ("source", "outcome")
+)
+SOURCE_SYMBOLS = metrics.counter(
+    "stockbot_source_symbols_total", "Symbols asked of and priced by each source.", ("source", "kind")
+)
+FETCH_SECONDS = metrics.histogram("stockbot_fetch_seconds", "Time for fetch_quotes across all sources.")
+FETCH_SYMBOLS = metrics.counter(
+    "stockbot_fetch_symbols_total", "Symbols requested from, and returned by, fetch_quotes.", ("kind",)
+)
+
+_chunk_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch-chunk")
+_source_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch-source")
 
 VNSTOCK_AVAILABLE = False
 try:
@@ -53,76 +79,100 @@ except Exception:
     pass
 
 
-def _vndirect_realtime_prices(symbols: list[str]) -> Optional[str]:
-    symbol_set = {s.strip().upper() for s in symbols}
-    index_set = {"VNINDEX", "VN30", "HNXINDEX", "HNX30", "HNX", "UPCOM", "VNXALL"}
-    stock_symbols = [s for s in symbol_set if s not in index_set][:20]
-    index_wanted = [k for k, v in MI_IDS.items() if v in symbol_set]
+def chunked(items: list, size: int) -> list[list]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _stock_symbols(symbols: list[str]) -> list[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip() and s.strip().upper() not in INDEX_SET))
+
+
+def _fetch_chunked(
+    fn,
+    symbols: list[str],
+    chunk_size: int,
+    timeout: float = FETCH_BATCH_TIMEOUT_SEC,
+    cancel: Optional[threading.Event] = None,
+) -> dict[str, Quote]:
+    chunks = chunked(symbols, chunk_size)
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        return fn(chunks[0]) or {}
+
+    def run(chunk: list[str]) -> dict[str, Quote]:
+        if cancel is not None and cancel.is_set():
+            return {}
+        return fn(chunk)
+
+    quotes = {}
+    run = tracing.bind(run)
+    futures = [_chunk_executor.submit(run, chunk) for chunk in chunks]
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                quotes.update(future.result() or {})
+            except Exception as e:
+                logger.debug("chunk %s: %s", getattr(fn, "__name__", fn), e)
+    except FuturesTimeout:
+        pending = sum(1 for f in futures if not f.done())
+        for f in futures:
+            f.cancel()
+        logger.info("%s: %d of %d chunks timed out", getattr(fn, "__name__", fn), pending, len(chunks))
+    return quotes
+
+
+def _vndirect_realtime_prices(symbols: list[str], cancel: Optional[threading.Event] = None) -> dict[str, Quote]:
+    stocks, index_ids = split_symbols(symbols)
+    stock_symbols = sorted(stocks)
+    index_wanted = sorted(index_ids)
     try:
-        return asyncio.run(_vndirect_ws_fetch(stock_symbols, index_wanted))
+        return asyncio.run(_vndirect_ws_fetch(stock_symbols, index_wanted, cancel))
     except Exception as e:
         logger.info("VNDirect WebSocket failed: %s", e)
-        return None
+        return {}
 
 
-async def _vndirect_ws_fetch(stock_symbols: list[str], index_ids: list[str]) -> Optional[str]:
+async def _vndirect_ws_fetch(
+    stock_symbols: list[str],
+    index_ids: list[str],
+    cancel: Optional[threading.Event] = None,
+) -> dict[str, Quote]:
     import websockets
-    prices = {}
-    indices = {}
+    quotes = {}
     try:
-        async with websockets.connect(VNDIRECT_WS_URL, ssl=True, close_timeout=2) as ws:
-            if stock_symbols:
-                await ws.send(json.dumps({
-                    "type": "registConsumer",
-                    "data": {"sequence": 0, "params": {"name": BA, "codes": stock_symbols}},
-                }))
+        async with websockets.connect(VNDIRECT_WS_URL, close_timeout=2) as ws:
+            for chunk in chunked(stock_symbols, WS_REGIST_CHUNK_SIZE):
+                await ws.send(regist_message(BA, chunk))
             if index_ids:
-                await ws.send(json.dumps({
-                    "type": "registConsumer",
-                    "data": {"sequence": 0, "params": {"name": MI, "codes": index_ids}},
-                }))
+                await ws.send(regist_message(MI, index_ids))
+            wanted = len(stock_symbols) + len(index_ids)
             deadline = time.monotonic() + WS_WAIT_SEC
-            while time.monotonic() < deadline:
+            while time.monotonic() < deadline and len(quotes) < wanted:
+                if cancel is not None and cancel.is_set():
+                    break
                 try:
                     left = max(0.5, deadline - time.monotonic())
                     msg = await asyncio.wait_for(ws.recv(), timeout=min(2, left))
                 except asyncio.TimeoutError:
                     break
-                obj = json.loads(msg)
-                typ = obj.get("type")
-                data = obj.get("data") or ""
-                arr = data.split("|") if isinstance(data, str) else []
-                if typ == BA and len(arr) >= 16:
-                    code = arr[1]
-                    try:
-                        prices[code] = float(arr[15])
-                    except (ValueError, IndexError):
-                        pass
-                elif typ == MI and len(arr) >= 8:
-                    mid = arr[0]
-                    name = MI_IDS.get(mid)
-                    try:
-                        if name:
-                            indices[name] = float(arr[7])
-                    except (ValueError, IndexError):
-                        pass
-            if not prices and not indices:
-                return None
-            lines = [f"📊 {k}: {v:,.2f}" for k, v in sorted(indices.items())]
-            lines += [f"📈 {k}: {v:,.0f}" for k, v in sorted(prices.items())]
-            return "\n".join(lines) if lines else None
+                parsed = parse_message(msg)
+                if parsed:
+                    typ, code, price = parsed
+                    quotes[code] = Quote(code, price, "vndirect-ws", now_utc7(), typ == MI)
     except Exception as e:
         logger.debug("VNDirect WS: %s", e)
-        return None
+    return quotes
 
 
-def _fetch_one_vndirect(sym: str) -> Optional[tuple[str, float, str]]:
+def _fetch_one_vndirect(sym: str) -> Optional[Quote]:
     base = VNDIRECT_REST_URL
     today = datetime.now().strftime("%Y-%m-%d")
     from_d = (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%d")
     q = f"code:{sym}~date:gte:{from_d}~date:lte:{today}"
     try:
-        r = requests.get(
+        r = get_session("vndirect").get(
             base,
             params={"q": q, "size": 1, "sort": "date", "page": 1},
             headers=HEADERS,
@@ -134,88 +184,78 @@ def _fetch_one_vndirect(sym: str) -> Optional[tuple[str, float, str]]:
             return None
         d = data[0]
         close = d.get("close")
-        date = (d.get("date") or "")[:10]
         if close is not None:
-            return (sym, float(close), date)
+            return Quote(sym, float(close), "vndirect-rest", parse_date(d.get("date")))
     except Exception as e:
         logger.debug("VNDirect %s: %s", sym, e)
     return None
 
 
-def _vndirect_prices(symbols: list[str]) -> Optional[str]:
-    index_set = {"VNINDEX", "VN30", "HNXINDEX", "HNX30"}
-    stock_symbols = [s.strip().upper() for s in symbols if s.strip().upper() not in index_set][:20]
+def _vndirect_rest_chunk(stock_symbols: list[str]) -> dict[str, Quote]:
+    quotes = {}
+    for sym in stock_symbols:
+        quote = _fetch_one_vndirect(sym)
+        if quote:
+            quotes[quote.symbol] = quote
+    return quotes
+
+
+def _vndirect_prices(symbols: list[str], cancel: Optional[threading.Event] = None) -> dict[str, Quote]:
+    stock_symbols = _stock_symbols(symbols)
     if not stock_symbols:
-        return None
-    lines = []
-    max_workers = min(10, len(stock_symbols))
-    try:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(_fetch_one_vndirect, sym): sym for sym in stock_symbols}
-            for future in as_completed(futures, timeout=REQUEST_TIMEOUT + 10):
-                try:
-                    result = future.result()
-                    if result:
-                        sym, close, date = result
-                        lines.append(f"📈 {sym}: {close:,.0f} ({date})")
-                except Exception:
-                    pass
-    except Exception as e:
-        logger.info("VNDirect fetch failed: %s", e)
-    if not lines:
+        return {}
+    quotes = _fetch_chunked(_vndirect_rest_chunk, stock_symbols, VNDIRECT_REST_CHUNK_SIZE, cancel=cancel)
+    if not quotes:
         logger.info("VNDirect returned no data (timeout or blocked)")
-        return None
-    lines.sort(key=lambda x: x.split(":")[0])
-    return "\n".join(lines)
+    return quotes
 
 
-def _vnstock_price_board(trading_source: str, stock_symbols: list[str]) -> Optional[list[str]]:
+def _vnstock_price_board(trading_source: str, stock_symbols: list[str]) -> dict[str, Quote]:
     if not VNSTOCK_AVAILABLE or not stock_symbols:
-        return None
-    lines = []
+        return {}
+    quotes = {}
+    source = f"vnstock-{trading_source.lower()}"
     try:
         trading = Trading(source=trading_source)
         df = trading.price_board(stock_symbols)
         if df is not None and not df.empty:
+            at = now_utc7()
             for _, r in df.iterrows():
-                ticker = r.get("ticker") or r.get("organCode") or r.get("symbol", "")
+                ticker = str(r.get("ticker") or r.get("organCode") or r.get("symbol", "")).strip()
                 price = r.get("price") or r.get("matchPrice") or r.get("p")
-                if price is not None and str(ticker).strip():
+                if price is not None and ticker:
                     try:
-                        p = float(price)
-                        lines.append(f"📈 {ticker}: {p:,.0f}")
+                        quotes[ticker] = Quote(ticker, float(price), source, at)
                     except (TypeError, ValueError):
-                        lines.append(f"📈 {ticker}: {price}")
+                        pass
     except Exception as e:
         logger.debug("vnstock %s: %s", trading_source, e)
-    return lines if lines else None
+    return quotes
 
 
-def _vnstock_prices(symbols: list[str], index_codes: tuple) -> Optional[str]:
+def _vnstock_prices(
+    symbols: list[str],
+    trading_source: str,
+    cancel: Optional[threading.Event] = None,
+) -> dict[str, Quote]:
     if not VNSTOCK_AVAILABLE:
-        return None
+        return {}
     _vnstock_register_if_configured()
-    index_set = {"VNINDEX", "VN30", "HNXINDEX", "HNX30"}
-    stock_symbols = [s for s in symbols if s.upper() not in index_set][:20]
+    stock_symbols = _stock_symbols(symbols)
     if not stock_symbols:
-        return None
-    for source in ("KBS", "VCI"):
-        lines = _vnstock_price_board(source, stock_symbols)
-        if lines:
-            logger.info("vnstock %s OK", source)
-            return "\n".join(lines)
-    logger.info("vnstock returned no data (KBS and VCI)")
-    return None
-
-
-def _yfinance_prices(symbols: list[str]) -> Optional[str]:
-    if not YFINANCE_AVAILABLE:
-        return None
-    index_set = {"VNINDEX", "VN30", "HNXINDEX", "HNX30"}
-    stock_symbols = [s.strip().upper() for s in symbols if s.strip().upper() not in index_set][:15]
-    if not stock_symbols:
-        return None
-    lines = []
+        return {}
+    quotes = _fetch_chunked(
+        partial(_vnstock_price_board, trading_source), stock_symbols, VNSTOCK_CHUNK_SIZE, cancel=cancel
+    )
+    if quotes:
+        logger.info("vnstock %s OK (%d symbols)", trading_source, len(quotes))
+    else:
+        logger.info("vnstock %s returned no data", trading_source)
+    return quotes
+
+
+def _yfinance_chunk(stock_symbols: list[str]) -> dict[str, Quote]:
+    quotes = {}
     for sym in stock_symbols:
         try:
             ticker = yf.Ticker(f"{sym}.VN")
@@ -223,43 +263,171 @@ def _yfinance_prices(symbols: list[str]) -> Optional[str]:
             if hist is not None and not hist.empty and "Close" in hist.columns:
                 last = hist.iloc[-1]
                 close = float(last["Close"])
-                date = hist.index[-1].strftime("%Y-%m-%d") if hasattr(hist.index[-1], "strftime") else ""
-                lines.append(f"📈 {sym}: {close:,.0f} ({date})")
+                ts = hist.index[-1]
+                at = ts.to_pydatetime() if hasattr(ts, "to_pydatetime") else None
+                quotes[sym] = Quote(sym, close, "yahoo", at)
         except Exception as e:
             logger.debug("yfinance %s: %s", sym, e)
-    if not lines:
+    return quotes
+
+
+def _yfinance_prices(symbols: list[str], cancel: Optional[threading.Event] = None) -> dict[str, Quote]:
+    if not YFINANCE_AVAILABLE:
+        return {}
+    stock_symbols = _stock_symbols(symbols)
+    if not stock_symbols:
+        return {}
+    quotes = _fetch_chunked(_yfinance_chunk, stock_symbols, YFINANCE_CHUNK_SIZE, cancel=cancel)
+    if not quotes:
         logger.info("Yahoo Finance returned no data")
-        return None
-    lines.sort(key=lambda x: x.split(":")[0])
-    return "\n".join(lines)
+    return quotes
 
 
-def fetch_prices(symbols: list[str], index_codes: tuple) -> str:
+SOURCE_INDEX_SUPPORT = {"vndirect-ws"}
+
+
+def _source_chain() -> list[tuple[str, Callable[..., dict[str, Quote]]]]:
+    chain: list[tuple[str, Callable[..., dict[str, Quote]]]] = []
     if VNSTOCK_AVAILABLE:
-        logger.info("Trying vnstock (thinh-vu/vnstock)...")
-        text = _vnstock_prices(symbols, index_codes)
-        if text:
-            return text
+        chain.append(("vnstock-kbs", partial(_vnstock_prices, trading_source="KBS")))
+        chain.append(("vnstock-vci", partial(_vnstock_prices, trading_source="VCI")))
+    if not ws_feed.is_connected():
+        chain.append(("vndirect-ws", _vndirect_realtime_prices))
+    chain.append(("vndirect-rest", _vndirect_prices))
+    if YFINANCE_AVAILABLE:
+        chain.append(("yahoo", _yfinance_prices))
+    fns = dict(chain)
+    available = [name for name, _ in chain if source_health.is_available(name)]
+    return [(name, fns[name]) for name in source_health.order(available)]
+
+
+def source_status() -> dict:
+    return {
+        "order": [name for name, _ in _source_chain()],
+        "mode": FETCH_MODE,
+        "sources": source_health.snapshot(),
+    }
+
+
+def _call_source(name: str, fn, symbols: list[str], cancel: threading.Event) -> dict[str, Quote]:
+    if name not in SOURCE_INDEX_SUPPORT:
+        symbols = _stock_symbols(symbols)
+    if not symbols:
+        return {}
+    if not source_health.allow(name):
+        SOURCE_CALLS.inc(name, "skipped")
+        return {}
+    logger.info("Trying %s for %d symbols...", name, len(symbols))
+    SOURCE_SYMBOLS.inc(name, "requested", amount=len(symbols))
+    with tracing.span(f"source {name}", requested=len(symbols)) as sp:
+        quotes = _run_source(name, fn, symbols, cancel)
+        sp.set(returned=len(quotes))
+    return quotes
+
+
+def _run_source(name: str, fn, symbols: list[str], cancel: threading.Event) -> dict[str, Quote]:
+    started = time.monotonic()
     try:
-        logger.info("Trying VNDirect WebSocket (realtime)...")
-        text = _vndirect_realtime_prices(symbols)
-        if text:
-            logger.info("VNDirect WebSocket OK")
-            return text
+        quotes = fn(symbols, cancel=cancel) or {}
     except Exception as e:
-        logger.debug("VNDirect WS: %s", e)
-    logger.info("Trying VNDirect REST...")
-    text = _vndirect_prices(symbols)
-    if text:
-        logger.info("VNDirect REST OK")
-        return text
-    if YFINANCE_AVAILABLE:
-        logger.info("Trying Yahoo Finance (.VN)...")
-        text = _yfinance_prices(symbols)
-        if text:
-            logger.info("Yahoo Finance OK")
-            return text
-    return "⚠️ Could not fetch prices. Check network and symbols (e.g. VCB, TCB, FPT)."
+        tracing.current().set(error=type(e).__name__)
+        logger.info("%s failed: %s", name, e)
+        elapsed = time.monotonic() - started
+        source_health.record(name, False, elapsed, str(e))
+        SOURCE_SECONDS.observe(elapsed, name)
+        SOURCE_CALLS.inc(name, "error")
+        return {}
+    elapsed = time.monotonic() - started
+    SOURCE_SECONDS.observe(elapsed, name)
+    if quotes:
+        source_health.record(name, True, elapsed)
+        SOURCE_CALLS.inc(name, "ok")
+        SOURCE_SYMBOLS.inc(name, "returned", amount=len(quotes))
+    elif cancel.is_set():
+        source_health.release(name)
+        SOURCE_CALLS.inc(name, "cancelled")
+    else:
+        source_health.record(name, False, elapsed, "no data")
+        SOURCE_CALLS.inc(name, "empty")
+    return quotes
+
+
+def _fetch_sequential(chain, symbols: list[str], deadline: float) -> dict[str, Quote]:
+    quotes: dict[str, Quote] = {}
+    remaining = list(symbols)
+    cancel = threading.Event()
+    for name, fn in chain:
+        if time.monotonic() >= deadline:
+            logger.info("Fetch deadline reached before %s", name)
+            break
+        for sym, quote in _call_source(name, fn, remaining, cancel).items():
+            quotes.setdefault(sym, quote)
+        remaining = [s for s in remaining if s not in quotes]
+        if not remaining:
+            break
+    return quotes
+
+
+def _fetch_hedged(chain, symbols: list[str], deadline: float, delay: float) -> dict[str, Quote]:
+    quotes: dict[str, Quote] = {}
+    remaining = set(symbols)
+    cancel = threading.Event()
+    pending = {}
+    next_index = 0
+    next_start = time.monotonic()
+    while remaining:
+        now = time.monotonic()
+        if now >= deadline:
+            logger.info("Fetch deadline reached with %d symbols missing", len(remaining))
+            break
+        while next_index < len(chain) and (now >= next_start or not pending):
+            name, fn = chain[next_index]
+            next_index += 1
+            pending[_source_executor.submit(tracing.bind(_call_source), name, fn, sorted(remaining), cancel)] = name
+            next_start = now + delay
+        if not pending:
+            break
+        until = deadline if next_index >= len(chain) else min(deadline, next_start)
+        done, _ = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.pop(future)
+            for sym, quote in (future.result() or {}).items():
+                if sym in remaining:
+                    quotes[sym] = quote
+                    remaining.discard(sym)
+    cancel.set()
+    for future in pending:
+        future.cancel()
+    return quotes
+
+
+def fetch_quotes(symbols: list[str], index_codes: tuple) -> dict[str, Quote]:
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not symbols:
+        return {}
+    with tracing.span("fetch_quotes", symbols=len(symbols)) as sp:
+        quotes = _fetch_quotes(symbols)
+        sp.set(returned=len(quotes))
+    return quotes
+
+
+def _fetch_quotes(symbols: list[str]) -> dict[str, Quote]:
+    chain = _source_chain()
+    started = time.monotonic()
+    deadline = started + FETCH_DEADLINE_SEC if FETCH_DEADLINE_SEC > 0 else float("inf")
+    if FETCH_MODE == "parallel":
+        quotes = _fetch_hedged(chain, symbols, deadline, 0.0)
+    elif FETCH_MODE == "hedged":
+        quotes = _fetch_hedged(chain, symbols, deadline, FETCH_HEDGE_DELAY_SEC)
+    else:
+        quotes = _fetch_sequential(chain, symbols, deadline)
+    FETCH_SECONDS.observe(time.monotonic() - started)
+    FETCH_SYMBOLS.inc("requested", amount=len(symbols))
+    FETCH_SYMBOLS.inc("returned", amount=len(quotes))
+    missing = [s for s in symbols if s not in quotes]
+    if missing:
+        logger.warning("No price for %d of %d symbols: %s", len(missing), len(symbols), ", ".join(missing[:20]))
+    return quotes
 
 
 def parse_prices_text(text: str) -> dict[str, float]:
@@ -295,7 +463,7 @@ def _sample_price_loop() -> None:
         logger.info("Sample HPG price set to %s", _sample_hpg_price)
 
 
-def fetch_prices_dict(symbols: list[str], index_codes: tuple) -> dict[str, float]:
+def get_quotes(symbols: list[str], index_codes: tuple) -> dict[str, Quote]:
     if SAMPLE_PRICES:
         global _sample_thread_started, _sample_hpg_price
         with _sample_lock:
@@ -314,9 +482,21 @@ def fetch_prices_dict(symbols: list[str], index_codes: tuple) -> dict[str, float
         result = {}
         for s in symbols:
             if str(s).strip().upper() == "HPG":
-                result["HPG"] = current
+                result["HPG"] = Quote("HPG", current, "sample", now_utc7())
+        tick_store.record_quotes(result)
         return result
-    text = fetch_prices(symbols, index_codes)
-    if not text or text.startswith("⚠️"):
-        return {}
-    return parse_prices_text(text)
+    live = {}
+    if WS_FEED_ENABLED:
+        ws_feed.add_symbols(symbols)
+        live = ws_feed.get_quotes(symbols)
+        symbols = [s for s in symbols if str(s).strip().upper() not in live]
+        if not symbols:
+            return live
+    fetched = quote_cache.get_many(symbols, lambda missing: fetch_quotes(missing, index_codes))
+    tick_store.record_quotes(fetched)
+    return {**fetched, **live}
+
+
+@tracing.traced()
+def fetch_prices_dict(symbols: list[str], index_codes: tuple) -> dict[str, float]:
+    return {sym: q.price for sym, q in get_quotes(symbols, index_codes).items()}
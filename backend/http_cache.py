@@ -0,0 +1,80 @@
+import gzip
+import zlib
+from datetime import datetime
+from typing import Callable, Optional
+
+from flask import Response, request
+
+from .config import HTTP_COMPRESS_MIN_BYTES, UTC7
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+
+
+def cached(
+    name: str,
+    version,
+    build: Callable[[], object],
+    last_modified: Optional[datetime] = None,
+):
+    """Serve build() with a validator derived from a store version.
+
+    The ETag is known before the body is built, so a matching If-None-Match
+    (or If-Modified-Since) skips the query and serialisation entirely. With no
+    version (store unreachable, listener down) it falls back to hashing the body.
+    """
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=UTC7)
+    if version is None:
+        resp = build()
+        if isinstance(resp, Response) and resp.status_code == 200:
+            resp.add_etag(weak=True)
+            resp.cache_control.no_cache = True
+            return resp.make_conditional(request)
+        return resp
+    etag = f"{name}-{version}-{zlib.crc32(request.query_string):08x}"
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = bool(since and last_modified and last_modified.replace(microsecond=0) <= since)
+    if not_modified:
+        resp = Response(status=304)
+    else:
+        resp = build()
+        if not isinstance(resp, Response) or resp.status_code != 200:
+            return resp
+    resp.set_etag(etag, weak=True)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.cache_control.no_cache = True
+    return resp
+
+
+def compress(resp: Response) -> Response:
+    """after_request hook: gzip (or brotli when installed and accepted) for large text bodies."""
+    if (
+        resp.direct_passthrough
+        or resp.is_streamed
+        or resp.status_code != 200
+        or "Content-Encoding" in resp.headers
+        or resp.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    data = resp.get_data()
+    if len(data) < HTTP_COMPRESS_MIN_BYTES:
+        return resp
+    accept = request.accept_encodings
+    if BROTLI_AVAILABLE and accept["br"]:
+        resp.set_data(brotli.compress(data, quality=5))
+        resp.headers["Content-Encoding"] = "br"
+    elif accept["gzip"]:
+        resp.set_data(gzip.compress(data, compresslevel=6))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
@@ -0,0 +1,436 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+from .config import DATA_DIR, LOCAL_DB_FILE, UTC7
+from .events import rows_to_dicts
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = DATA_DIR / LOCAL_DB_FILE
+
+LEGACY_OBSERVERS_FILE = DATA_DIR / "observers.json"
+LEGACY_HISTORY_FILE = DATA_DIR / "history.json"
+LEGACY_LAST_ALERTED_FILE = DATA_DIR / "last_alerted.json"
+LEGACY_OBSERVER_PRICE_CHANGE_FILE = DATA_DIR / "observer_price_change.json"
+
+MIGRATIONS: list[tuple[int, list[str]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS observers (
+            symbol TEXT PRIMARY KEY,
+            target_price TEXT NOT NULL DEFAULT ''
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            target REAL NOT NULL,
+            price REAL NOT NULL,
+            at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_history_symbol_at ON history(symbol, at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_history_at ON history(at DESC, id DESC)",
+        """
+        CREATE TABLE IF NOT EXISTS last_alerted (
+            symbol TEXT PRIMARY KEY,
+            target REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS observer_price_change (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            target REAL NOT NULL,
+            price REAL NOT NULL,
+            at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_symbol_at ON observer_price_change(symbol, at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_observer_price_change_at ON observer_price_change(at DESC, id DESC)",
+    ]),
+    (2, [
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('observers_version', 0)",
+    ]),
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS telegram_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            chat_id TEXT NOT NULL,
+            text TEXT NOT NULL,
+            dedupe_key TEXT,
+            payload TEXT NOT NULL DEFAULT '{}',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+        """,
+    ]),
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS checker_members (
+            member_id TEXT PRIMARY KEY,
+            started_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL
+        )
+        """,
+        "ALTER TABLE telegram_outbox ADD COLUMN owner TEXT",
+    ]),
+]
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _connect() -> sqlite3.Connection:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+    if not _schema_ready:
+        _ensure_schema(conn)
+    return conn
+
+
+@contextmanager
+def _tx(immediate: bool = True):
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for v, statements in MIGRATIONS:
+                if v <= version:
+                    continue
+                for stmt in statements:
+                    conn.execute(stmt)
+                if v == 1:
+                    _import_legacy_json(conn)
+                conn.execute(f"PRAGMA user_version = {v}")
+                logger.info("local db migration %s applied", v)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        _schema_ready = True
+
+
+def _read_json(path, default):
+    if not path.exists():
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, type(default)) else default
+    except Exception as e:
+        logger.warning("legacy import %s: %s", path.name, e)
+        return default
+
+
+def _legacy_rows(path, items, convert) -> list[tuple]:
+    out, skipped = [], 0
+    for item in items:
+        try:
+            out.append(convert(item))
+        except (TypeError, ValueError, AttributeError):
+            skipped += 1
+    if skipped:
+        logger.warning("legacy import %s: skipped %d malformed rows", path.name, skipped)
+    return out
+
+
+def _import_legacy_json(conn: sqlite3.Connection) -> None:
+    observers = _read_json(LEGACY_OBSERVERS_FILE, {})
+    conn.executemany(
+        "INSERT OR REPLACE INTO observers (symbol, target_price) VALUES (?, ?)",
+        [(str(k).strip().upper(), str(v).strip()) for k, v in observers.items() if k],
+    )
+    last = _read_json(LEGACY_LAST_ALERTED_FILE, {})
+    conn.executemany(
+        "INSERT OR REPLACE INTO last_alerted (symbol, target) VALUES (?, ?)",
+        _legacy_rows(LEGACY_LAST_ALERTED_FILE, last.items(), lambda kv: (kv[0], float(kv[1]))),
+    )
+    for table, path in (("history", LEGACY_HISTORY_FILE), ("observer_price_change", LEGACY_OBSERVER_PRICE_CHANGE_FILE)):
+        rows = _read_json(path, [])
+        conn.executemany(
+            f"INSERT INTO {table} (symbol, target, price, at) VALUES (?, ?, ?, ?)",
+            _legacy_rows(
+                path,
+                reversed(rows),
+                lambda r: (
+                    (r.get("symbol") or "").upper(),
+                    float(r.get("target") or 0),
+                    float(r.get("price") or 0),
+                    str(r.get("at") or ""),
+                ),
+            ),
+        )
+    if observers or last:
+        logger.info("Imported legacy JSON files from %s into %s", DATA_DIR, DB_PATH.name)
+
+
+def _now() -> str:
+    return datetime.now(UTC7).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def fetch_observers() -> dict[str, str]:
+    return dict(_conn().execute("SELECT symbol, target_price FROM observers").fetchall())
+
+
+def load_observers() -> dict[str, str]:
+    try:
+        return fetch_observers()
+    except Exception as e:
+        logger.warning("local db load_observers: %s", e)
+        return {}
+
+
+def save_observers(observers: dict[str, str]) -> None:
+    wanted = {str(k).strip().upper(): str(v).strip() for k, v in observers.items() if k and str(k).strip()}
+    try:
+        with _tx() as conn:
+            current = dict(conn.execute("SELECT symbol, target_price FROM observers").fetchall())
+            changed = [(k, v) for k, v in wanted.items() if current.get(k) != v]
+            removed = [(k,) for k in current if k not in wanted]
+            conn.executemany(
+                "INSERT INTO observers (symbol, target_price) VALUES (?, ?) "
+                "ON CONFLICT (symbol) DO UPDATE SET target_price = excluded.target_price",
+                changed,
+            )
+            conn.executemany("DELETE FROM observers WHERE symbol = ?", removed)
+            if changed or removed:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'observers_version'")
+    except Exception as e:
+        logger.warning("local db save_observers: %s", e)
+
+
+def observers_version() -> int | None:
+    try:
+        row = _conn().execute("SELECT value FROM meta WHERE key = 'observers_version'").fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning("local db observers_version: %s", e)
+        return None
+
+
+def load_last_alerted() -> dict[str, float]:
+    try:
+        return {k: float(v) for k, v in _conn().execute("SELECT symbol, target FROM last_alerted").fetchall()}
+    except Exception as e:
+        logger.warning("local db load_last_alerted: %s", e)
+        return {}
+
+
+def save_last_alerted(last: dict[str, float]) -> None:
+    wanted = {k: float(v) for k, v in last.items() if k}
+    try:
+        with _tx() as conn:
+            current = {k: float(v) for k, v in conn.execute("SELECT symbol, target FROM last_alerted").fetchall()}
+            conn.executemany(
+                "INSERT INTO last_alerted (symbol, target) VALUES (?, ?) "
+                "ON CONFLICT (symbol) DO UPDATE SET target = excluded.target",
+                [(k, v) for k, v in wanted.items() if current.get(k) != v],
+            )
+            conn.executemany("DELETE FROM last_alerted WHERE symbol = ?", [(k,) for k in current if k not in wanted])
+    except Exception as e:
+        logger.warning("local db save_last_alerted: %s", e)
+
+
+def update_last_alerted(changed: dict[str, float], removed: list[str]) -> None:
+    try:
+        with _tx() as conn:
+            conn.executemany(
+                "INSERT INTO last_alerted (symbol, target) VALUES (?, ?) "
+                "ON CONFLICT (symbol) DO UPDATE SET target = excluded.target",
+                [(k, float(v)) for k, v in changed.items()],
+            )
+            conn.executemany("DELETE FROM last_alerted WHERE symbol = ?", [(k,) for k in removed])
+    except Exception as e:
+        logger.warning("local db update_last_alerted: %s", e)
+
+
+def _append(table: str, symbol: str, target: float, price: float) -> None:
+    try:
+        with _tx() as conn:
+            conn.execute(
+                f"INSERT INTO {table} (symbol, target, price, at) VALUES (?, ?, ?, ?)",
+                (symbol.strip().upper(), float(target), float(price), _now()),
+            )
+    except Exception as e:
+        logger.warning("local db append %s: %s", table, e)
+
+
+EVENT_TABLES = {"history": "history", "observer_price_change": "observer_price_change"}
+
+
+def query_events(
+    table: str,
+    symbol: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: tuple[str, int] | None = None,
+    limit: int = 500,
+) -> tuple[list[tuple], tuple[str, int] | None]:
+    where, params = [], []
+    if symbol:
+        where.append("symbol = ?")
+        params.append(symbol.strip().upper())
+    if start is not None:
+        where.append("at >= ?")
+        params.append(start.strftime("%Y-%m-%d %H:%M:%S"))
+    if end is not None:
+        where.append("at < ?")
+        params.append(end.strftime("%Y-%m-%d %H:%M:%S"))
+    if after is not None:
+        where.append("(at, id) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT id, symbol, target, price, at FROM {EVENT_TABLES[table]}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = _conn().execute(sql, params).fetchall()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1][4], rows[-1][0])
+    return rows, next_key
+
+
+def events_version(table: str) -> tuple[int, datetime | None]:
+    t = EVENT_TABLES[table]
+    max_id, max_at = _conn().execute(f"SELECT (SELECT MAX(id) FROM {t}), (SELECT MAX(at) FROM {t})").fetchone()
+    return max_id or 0, datetime.fromisoformat(max_at) if max_at else None
+
+
+def _filtered(table: str, symbol: str | None) -> list[dict[str, Any]]:
+    try:
+        return rows_to_dicts(query_events(table, symbol)[0])
+    except Exception as e:
+        logger.warning("local db read %s: %s", table, e)
+        return []
+
+
+def append_history(symbol: str, target: float, price: float) -> None:
+    _append("history", symbol, target, price)
+
+
+def load_history() -> list[dict[str, Any]]:
+    return _filtered("history", None)
+
+
+def get_history_filtered(symbol: str | None) -> list[dict[str, Any]]:
+    return _filtered("history", symbol)
+
+
+def insert_observer_price_change(symbol: str, target: float, price: float) -> None:
+    _append("observer_price_change", symbol, target, price)
+
+
+def get_observer_price_change_filtered(symbol: str | None) -> list[dict[str, Any]]:
+    return _filtered("observer_price_change", symbol)
+
+
+def outbox_add(
+    kind: str, chat_id: str, text: str, dedupe_key: str | None, payload: str, owner: str | None = None
+) -> int | None:
+    try:
+        with _tx() as conn:
+            cur = conn.execute(
+                "INSERT INTO telegram_outbox (kind, chat_id, text, dedupe_key, payload, owner, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, chat_id, text, dedupe_key, payload, owner, _now()),
+            )
+            return cur.lastrowid
+    except Exception as e:
+        logger.warning("local db outbox_add: %s", e)
+        return None
+
+
+def claim_outbox(owner: str, ttl: float) -> list[dict[str, Any]]:
+    try:
+        with _tx() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, kind, chat_id, text, dedupe_key, payload, attempts FROM telegram_outbox o
+                WHERE o.owner IS NOT ? AND NOT EXISTS (
+                    SELECT 1 FROM checker_members m WHERE m.member_id = o.owner AND m.heartbeat_at >= ?
+                )
+                ORDER BY id
+                """,
+                (owner, time.time() - ttl),
+            ).fetchall()
+            conn.executemany("UPDATE telegram_outbox SET owner = ? WHERE id = ?", [(owner, r[0]) for r in rows])
+    except Exception as e:
+        logger.warning("local db claim_outbox: %s", e)
+        return []
+    return [
+        {"id": r[0], "kind": r[1], "chat_id": r[2], "text": r[3], "dedupe_key": r[4], "payload": r[5], "attempts": r[6]}
+        for r in rows
+    ]
+
+
+def outbox_update(outbox_id: int, attempts: int) -> None:
+    try:
+        with _tx() as conn:
+            conn.execute("UPDATE telegram_outbox SET attempts = ? WHERE id = ?", (attempts, outbox_id))
+    except Exception as e:
+        logger.warning("local db outbox_update: %s", e)
+
+
+def outbox_delete(outbox_id: int) -> None:
+    try:
+        with _tx() as conn:
+            conn.execute("DELETE FROM telegram_outbox WHERE id = ?", (outbox_id,))
+    except Exception as e:
+        logger.warning("local db outbox_delete: %s", e)
+
+
+def heartbeat_member(member_id: str, ttl: float) -> list[str]:
+    now = time.time()
+    with _tx() as conn:
+        conn.execute(
+            "INSERT INTO checker_members (member_id, started_at, heartbeat_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (member_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (member_id, now, now),
+        )
+        conn.execute("DELETE FROM checker_members WHERE heartbeat_at < ?", (now - ttl,))
+        return [r[0] for r in conn.execute("SELECT member_id FROM checker_members ORDER BY member_id").fetchall()]
+
+
+def leave_member(member_id: str) -> None:
+    try:
+        with _tx() as conn:
+            conn.execute("DELETE FROM checker_members WHERE member_id = ?", (member_id,))
+    except Exception as e:
+        logger.warning("local db leave_member: %s", e)
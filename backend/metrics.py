@@ -0,0 +1,191 @@
+"""Counters and histograms for /metrics in the Prometheus text format.
+
+Updates never take a lock. Each thread writes to its own shard (a plain dict
+of cells), so an increment is a thread-local lookup and a float add. The
+scrape sums the shards under a lock that only the scrape and thread
+registration/retirement use. When a thread ends, its shard is folded into a
+shared one, so short-lived request threads do not pile up.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_local = threading.local()
+_lock = threading.RLock()  # re-entrant: a thread finalizer can run during a scrape
+_shards: list[dict] = []
+_retired: dict = {}
+_metrics: dict[str, "_Metric"] = {}
+_gauges: list[tuple[str, str, Callable[[], float]]] = []
+
+
+def _retire(shard: dict) -> None:
+    with _lock:
+        _merge(_retired, shard)
+        try:
+            _shards.remove(shard)
+        except ValueError:
+            pass
+
+
+def _shard() -> dict:
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = {}
+        with _lock:
+            _shards.append(shard)
+        weakref.finalize(threading.current_thread(), _retire, shard)
+        return shard
+
+
+def _merge(into: dict, shard: dict) -> None:
+    for key, cell in list(shard.items()):
+        total = into.get(key)
+        if total is None:
+            into[key] = list(cell)
+        else:
+            for i, v in enumerate(cell):
+                total[i] += v
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: tuple) -> str:
+        if not self.labelnames:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, values)) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        shard = _shard()
+        key = (self.name, labels)
+        cell = shard.get(key)
+        if cell is None:
+            cell = shard[key] = [0.0]
+        cell[0] += amount
+
+    def _render(self, cells: dict, out: list[str]) -> None:
+        for labels, cell in cells.items():
+            out.append(f"{self.name}{self._labels(labels)} {_num(cell[0])}")
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        shard = _shard()
+        key = (self.name, labels)
+        cell = shard.get(key)
+        if cell is None:
+            # one slot per bucket, one for +Inf, then the sum
+            cell = shard[key] = [0.0] * (len(self.buckets) + 2)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self, *labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _render(self, cells: dict, out: list[str]) -> None:
+        for labels, cell in cells.items():
+            base = self._labels(labels)[1:-1]
+            sep = "," if base else ""
+            running = 0.0
+            for bound, n in zip(self.buckets, cell):
+                running += n
+                out.append(f'{self.name}_bucket{{{base}{sep}le="{_num(bound)}"}} {_num(running)}')
+            running += cell[len(self.buckets)]
+            out.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {_num(running)}')
+            out.append(f"{self.name}_sum{self._labels(labels)} {cell[-1]!r}")
+            out.append(f"{self.name}_count{self._labels(labels)} {_num(running)}")
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "started")
+
+    def __init__(self, hist: Histogram, labels: tuple) -> None:
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.hist.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        _metrics[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def gauge(name: str, help: str, fn: Callable[[], float]) -> None:
+    """A value read at scrape time, e.g. a queue length from an existing stats()."""
+    with _lock:
+        if all(g[0] != name for g in _gauges):
+            _gauges.append((name, help, fn))
+
+
+def render() -> str:
+    with _lock:
+        totals: dict = {}
+        _merge(totals, _retired)
+        for shard in list(_shards):
+            _merge(totals, shard)
+        metrics = sorted(_metrics.values(), key=lambda m: m.name)
+        gauges = list(_gauges)
+    by_name: dict[str, dict] = {}
+    for (name, labels), cell in totals.items():
+        by_name.setdefault(name, {})[labels] = cell
+    out: list[str] = []
+    for m in metrics:
+        out.append(f"# HELP {m.name} {m.help}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        m._render(dict(sorted(by_name.get(m.name, {}).items())), out)
+    for name, help, fn in gauges:
+        try:
+            value = float(fn())
+        except Exception:
+            continue
+        out.append(f"# HELP {name} {help}")
+        out.append(f"# TYPE {name} gauge")
+        out.append(f"{name} {_num(value)}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,61 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from .alert_engine import RuleIndex
+from .config import OBSERVER_CACHE_ENABLED, OBSERVER_CACHE_FALLBACK_TTL_SEC
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entry: Optional[tuple[object, float, dict[str, str], RuleIndex]] = None
+
+
+def _load(loader: Callable[[], dict[str, str]]) -> Optional[dict[str, str]]:
+    try:
+        return loader()
+    except Exception as e:
+        logger.warning("observer reload failed: %s", e)
+        return None
+
+
+def _get(loader: Callable[[], dict[str, str]], version_fn: Callable[[], object]):
+    global _entry
+    if not OBSERVER_CACHE_ENABLED:
+        observers = _load(loader) or {}
+        return observers, RuleIndex.from_observers(observers)
+    version = version_fn()
+    now = time.monotonic()
+    with _lock:
+        entry = _entry
+    if entry is not None:
+        cached_version, loaded_at, observers, index = entry
+        if version is not None and cached_version == version:
+            return observers, index
+        if version is None and now - loaded_at < OBSERVER_CACHE_FALLBACK_TTL_SEC:
+            return observers, index
+    observers = _load(loader)
+    if observers is None:
+        # Not cached, so the next call retries; until then keep the last good copy.
+        if entry is not None:
+            return entry[2], entry[3]
+        return {}, RuleIndex.from_observers({})
+    index = RuleIndex.from_observers(observers)
+    with _lock:
+        _entry = (version, now, observers, index)
+    return observers, index
+
+
+def observers(loader: Callable[[], dict[str, str]], version_fn: Callable[[], object]) -> dict[str, str]:
+    return dict(_get(loader, version_fn)[0])
+
+
+def rules(loader: Callable[[], dict[str, str]], version_fn: Callable[[], object]) -> RuleIndex:
+    return _get(loader, version_fn)[1]
+
+
+def invalidate() -> None:
+    global _entry
+    with _lock:
+        _entry = None
@@ -0,0 +1,53 @@
+import base64
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .config import HISTORY_PAGE_MAX, HISTORY_PAGE_SIZE, UTC7
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def encode_cursor(at: str, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{at}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[str, int]]:
+    """Cursor -> (at, id) of the last row already returned. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, _, row_id = raw.rpartition("|")
+        datetime.fromisoformat(at)
+        return at, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_time(value: Optional[str], end: bool = False) -> Optional[datetime]:
+    """Parse a from/to query value as local (UTC+7) naive time.
+
+    A bare date as the upper bound means the whole day, so it becomes the next midnight.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(UTC7).replace(tzinfo=None)
+    if end and len(value) == 10:
+        dt += timedelta(days=1)
+    return dt
+
+
+def parse_limit(value: Optional[str]) -> int:
+    if not value:
+        return HISTORY_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid limit: {value}")
+    return max(1, min(limit, HISTORY_PAGE_MAX))
@@ -0,0 +1,70 @@
+"""Opt-in wall-clock sampling profiler (PROFILER_ENABLED=1).
+
+Samples every thread's stack with sys._current_frames() and returns collapsed
+stacks, one "thread;outer;...;inner count" line per distinct stack. That is
+the input format of flamegraph.pl, and speedscope or inferno can load it
+directly. Waiting threads are sampled too, so a check stuck on a socket shows
+up as time in the read call rather than disappearing.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from .config import PROFILER_HZ, PROFILER_MAX_SEC
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)})".replace(";", ":")
+
+
+def sample(seconds: float, hz: float = PROFILER_HZ, thread: Optional[str] = None) -> Counter:
+    """Sample for `seconds` (capped at PROFILER_MAX_SEC). `thread` keeps only threads whose name contains it."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        seconds = max(0.1, min(seconds, PROFILER_MAX_SEC))
+        interval = 1.0 / max(1.0, min(hz, 1000.0))
+        me = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        next_at = time.monotonic()
+        while True:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                tname = names.get(ident, f"thread-{ident}")
+                if thread and thread not in tname:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(tname.replace(";", ":"))
+                counts[";".join(reversed(stack))] += 1
+            next_at += interval
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if next_at > now:
+                time.sleep(next_at - now)
+            else:
+                next_at = now
+        return counts
+    finally:
+        _busy.release()
+
+
+def collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
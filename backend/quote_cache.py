@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from .config import (
+    QUOTE_CACHE_MAX_SIZE,
+    QUOTE_CACHE_TTL_OVERRIDES,
+    QUOTE_CACHE_TTL_SEC,
+    QUOTE_CACHE_WAIT_SEC,
+)
+from .quotes import Quote
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("event", "quotes")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.quotes: dict[str, Quote] = {}
+
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, tuple[Quote, float]]" = OrderedDict()
+_inflight: dict[str, _Flight] = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+
+def ttl_for(symbol: str) -> float:
+    return QUOTE_CACHE_TTL_OVERRIDES.get(symbol, QUOTE_CACHE_TTL_SEC)
+
+
+def _store(quotes: dict[str, Quote]) -> None:
+    now = time.monotonic()
+    for sym, quote in quotes.items():
+        ttl = ttl_for(sym)
+        if ttl <= 0:
+            continue
+        _entries[sym] = (quote, now + ttl)
+        _entries.move_to_end(sym)
+    while len(_entries) > QUOTE_CACHE_MAX_SIZE:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def get_many(symbols: list[str], loader: Callable[[list[str]], dict[str, Quote]]) -> dict[str, Quote]:
+    now = time.monotonic()
+    result: dict[str, Quote] = {}
+    waits: dict[str, _Flight] = {}
+    mine: list[str] = []
+    with _lock:
+        for sym in dict.fromkeys(str(s).strip().upper() for s in symbols):
+            if not sym:
+                continue
+            entry = _entries.get(sym)
+            if entry is not None and entry[1] > now:
+                _entries.move_to_end(sym)
+                result[sym] = entry[0]
+                _stats["hits"] += 1
+                continue
+            flight = _inflight.get(sym)
+            if flight is not None:
+                waits[sym] = flight
+                _stats["coalesced"] += 1
+                continue
+            _stats["misses"] += 1
+            mine.append(sym)
+        own = _Flight() if mine else None
+        for sym in mine:
+            _inflight[sym] = own
+    if own is not None:
+        fetched: dict[str, Quote] = {}
+        try:
+            fetched = loader(mine) or {}
+        except Exception as e:
+            logger.warning("quote cache loader: %s", e)
+        finally:
+            with _lock:
+                _store(fetched)
+                for sym in mine:
+                    if _inflight.get(sym) is own:
+                        del _inflight[sym]
+            own.quotes = fetched
+            own.event.set()
+        for sym in mine:
+            if sym in fetched:
+                result[sym] = fetched[sym]
+    for sym, flight in waits.items():
+        if flight.event.wait(QUOTE_CACHE_WAIT_SEC) and sym in flight.quotes:
+            result[sym] = flight.quotes[sym]
+    return result
+
+
+def invalidate(symbols=None) -> None:
+    with _lock:
+        if symbols is None:
+            _entries.clear()
+            return
+        for sym in symbols:
+            _entries.pop(str(sym).strip().upper(), None)
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+        out["size"] = len(_entries)
+        out["inflight"] = len(_inflight)
+    lookups = out["hits"] + out["misses"] + out["coalesced"]
+    out["hit_ratio"] = round((out["hits"] + out["coalesced"]) / lookups, 4) if lookups else 0.0
+    out["ttl_sec"] = QUOTE_CACHE_TTL_SEC
+    out["ttl_overrides"] = dict(QUOTE_CACHE_TTL_OVERRIDES)
+    out["max_size"] = QUOTE_CACHE_MAX_SIZE
+    return out
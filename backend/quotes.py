@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from .config import UTC7
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    symbol: str
+    price: float
+    source: str
+    at: Optional[datetime] = None
+    is_index: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "source": self.source,
+            "at": self.at.isoformat() if self.at else None,
+            "is_index": self.is_index,
+        }
+
+
+def now_utc7() -> datetime:
+    return datetime.now(UTC7)
+
+
+def parse_date(value) -> Optional[datetime]:
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").replace(tzinfo=UTC7)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_quotes(quotes: Iterable[Quote]) -> str:
+    quotes = list(quotes)
+    lines = [f"📊 {q.symbol}: {q.price:,.2f}" for q in sorted(quotes, key=lambda q: q.symbol) if q.is_index]
+    for q in sorted(quotes, key=lambda q: q.symbol):
+        if q.is_index:
+            continue
+        suffix = f" ({q.at:%Y-%m-%d})" if q.at else ""
+        lines.append(f"📈 {q.symbol}: {q.price:,.0f}{suffix}")
+    return "\n".join(lines)
@@ -0,0 +1,258 @@
+"""Replay recorded ticks through the alert rules without sleeping or touching the network.
+
+    python -m backend.replay --archive --from 2026-09-01 --to 2026-10-01
+    python -m backend.replay --file ticks.csv --band 0.001,0.002,0.005
+    python -m backend.replay --table history --rules "HPG=38600;40000@0.5%"
+
+Ticks come from the tick archive (--archive), a CSV/JSONL file of symbol, ts,
+price (--file) or a history table (--table). Rules are the saved observers
+unless --rules is given. Each value of --band replays the same ticks with
+that default band, which is how PRICE_BAND_PCT sweeps are run. With
+--interval N, prices are sampled the way run_check sees them: the last price
+of each symbol in every N-second window.
+"""
+import argparse
+import csv
+import heapq
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from .alert_engine import RuleIndex, evaluate_symbol, format_number, parse_rules
+from .config import PRICE_BAND_PCT, UTC7
+
+Tick = tuple[float, str, float]
+
+
+@dataclass(slots=True)
+class ReplayAlert:
+    ts: float
+    symbol: str
+    target: float
+    price: float
+    band_pct: float
+
+    @property
+    def distance_pct(self) -> float:
+        return (self.price - self.target) / self.target * 100
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    band_pct: float
+    ticks: int
+    evaluations: int
+    rearms: int
+    alerts: list[ReplayAlert]
+    elapsed_sec: float
+
+    def summary(self) -> dict:
+        dist = [abs(a.distance_pct) for a in self.alerts]
+        per_symbol: dict[str, int] = {}
+        for a in self.alerts:
+            per_symbol[a.symbol] = per_symbol.get(a.symbol, 0) + 1
+        return {
+            "band_pct": self.band_pct,
+            "ticks": self.ticks,
+            "evaluations": self.evaluations,
+            "alerts": len(self.alerts),
+            "rearms": self.rearms,
+            "first_alert": _fmt_ts(self.alerts[0].ts) if self.alerts else None,
+            "last_alert": _fmt_ts(self.alerts[-1].ts) if self.alerts else None,
+            "mean_abs_distance_pct": sum(dist) / len(dist) if dist else None,
+            "max_abs_distance_pct": max(dist) if dist else None,
+            "alerts_per_symbol": per_symbol,
+            "elapsed_sec": self.elapsed_sec,
+            "ticks_per_sec": self.ticks / self.elapsed_sec if self.elapsed_sec else None,
+        }
+
+
+def _fmt_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts, UTC7).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _parse_ts(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        dt = datetime.fromisoformat(str(value))
+        return (dt if dt.tzinfo else dt.replace(tzinfo=UTC7)).timestamp()
+
+
+def replay(
+    index: RuleIndex,
+    ticks: Iterable[Tick],
+    interval: float = 0.0,
+    last_alerted: Optional[dict[str, float]] = None,
+) -> ReplayResult:
+    """Feed time-ordered (ts, symbol, price) ticks through evaluate_symbol.
+
+    A fired rule is treated as delivered, so it stays quiet until price leaves
+    its band, the same as last_alerted in run_check.
+    """
+    last_alerted = dict(last_alerted or {})
+    alerted: dict[str, set[str]] = {}
+    for key in last_alerted:
+        rule = index.by_key.get(key)
+        if rule is not None:
+            alerted.setdefault(rule.symbol, set()).add(key)
+    alerts: list[ReplayAlert] = []
+    counts = {"ticks": 0, "evaluations": 0, "rearms": 0}
+    empty: set[str] = set()
+
+    def step(ts: float, symbol: str, price: float) -> None:
+        keys = alerted.get(symbol, empty)
+        fired, rearmed = evaluate_symbol(index, symbol, price, last_alerted, keys)
+        counts["evaluations"] += 1
+        for key in rearmed:
+            del last_alerted[key]
+            keys.discard(key)
+        counts["rearms"] += len(rearmed)
+        for rule in fired:
+            last_alerted[rule.key] = rule.target
+            alerted.setdefault(symbol, set()).add(rule.key)
+            alerts.append(ReplayAlert(ts, symbol, rule.target, price, rule.band_pct))
+
+    wanted = set(index.symbols())
+    started = time.perf_counter()
+    if interval <= 0:
+        for ts, symbol, price in ticks:
+            counts["ticks"] += 1
+            if symbol in wanted:
+                step(ts, symbol, price)
+    else:
+        window_end = None
+        latest: dict[str, float] = {}
+        for ts, symbol, price in ticks:
+            counts["ticks"] += 1
+            if window_end is None:
+                window_end = (ts // interval + 1) * interval
+            if ts >= window_end:
+                for sym, p in latest.items():
+                    step(window_end, sym, p)
+                latest.clear()
+                window_end = (ts // interval + 1) * interval
+            if symbol in wanted:
+                latest[symbol] = price
+        for sym, p in latest.items():
+            step(window_end, sym, p)
+    return ReplayResult(0.0, counts["ticks"], counts["evaluations"], counts["rearms"], alerts, time.perf_counter() - started)
+
+
+def ticks_from_file(path: str) -> list[Tick]:
+    """CSV (symbol,ts,price with a header row) or JSONL ({"symbol", "ts"|"at", "price"})."""
+    out: list[Tick] = []
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            for line in f:
+                if line.strip():
+                    d = json.loads(line)
+                    out.append((_parse_ts(d.get("ts", d.get("at"))), str(d["symbol"]).upper(), float(d["price"])))
+        else:
+            for row in csv.DictReader(f):
+                out.append((_parse_ts(row.get("ts") or row.get("at")), row["symbol"].strip().upper(), float(row["price"])))
+    out.sort()
+    return out
+
+
+def ticks_from_archive(symbols: Iterable[str], start: datetime, end: datetime) -> Iterator[Tick]:
+    from . import tick_archive
+    streams = []
+    for symbol in sorted(set(symbols)):
+        ts, px = tick_archive.read(symbol, start, end)
+        streams.append(zip(ts, [symbol] * len(ts), px))
+    return heapq.merge(*streams)
+
+
+def ticks_from_table(kind: str, start: Optional[datetime], end: Optional[datetime]) -> list[Tick]:
+    from .store import query_events
+    out: list[Tick] = []
+    cursor = None
+    while True:
+        page, cursor = query_events(kind, start=start, end=end, cursor=cursor, limit=2000, compact=True)
+        out.extend(zip((t / 1000 for t in page["at"]), page["symbol"], page["price"]))
+        if not cursor:
+            break
+    out.sort()
+    return out
+
+
+def _load_observers(rules: list[str]) -> dict[str, str]:
+    if not rules:
+        from .store import load_observers
+        return load_observers()
+    observers = {}
+    for spec in rules:
+        symbol, _, targets = spec.partition("=")
+        observers[symbol.strip().upper()] = targets
+    return observers
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from .pagination import parse_time
+
+    p = argparse.ArgumentParser(prog="python -m backend.replay", description=__doc__.split("\n")[0])
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--archive", action="store_true", help="read ticks from the tick archive")
+    src.add_argument("--file", help="CSV or JSONL of symbol, ts, price")
+    src.add_argument("--table", choices=("history", "observer_price_change"))
+    p.add_argument("--from", dest="start", help="start time (UTC+7), required with --archive")
+    p.add_argument("--to", dest="end", help="end time (UTC+7), required with --archive")
+    p.add_argument("--rules", action="append", default=[], help='SYMBOL=targets, e.g. "HPG=38600;40000@0.5%%"')
+    p.add_argument("--band", default=str(PRICE_BAND_PCT), help="comma-separated default bands to sweep")
+    p.add_argument("--interval", type=float, default=0.0, help="sample like run_check every N seconds")
+    p.add_argument("--events", action="store_true", help="print every alert")
+    p.add_argument("--json", action="store_true", help="print results as JSON")
+    args = p.parse_args(argv)
+
+    start, end = parse_time(args.start), parse_time(args.end, end=True)
+    observers = _load_observers(args.rules)
+    if not observers:
+        p.error("no rules: save observers or pass --rules")
+    if args.archive:
+        if start is None or end is None:
+            p.error("--archive needs --from and --to")
+        ticks = list(ticks_from_archive([s for s, v in observers.items() if parse_rules(s, v)], start, end))
+    elif args.file:
+        ticks = ticks_from_file(args.file)
+    else:
+        ticks = ticks_from_table(args.table, start, end)
+
+    results = []
+    for band in (float(b) for b in args.band.split(",") if b.strip()):
+        index = RuleIndex.from_observers(observers, default_band=band)
+        result = replay(index, ticks, args.interval)
+        result.band_pct = band
+        results.append(result)
+
+    if args.json:
+        out = []
+        for r in results:
+            item = r.summary()
+            if args.events:
+                item["events"] = [{**asdict(a), "at": _fmt_ts(a.ts), "distance_pct": a.distance_pct} for a in r.alerts]
+            out.append(item)
+        print(json.dumps(out, indent=2))
+        return 0
+    for r in results:
+        s = r.summary()
+        print(
+            f"band {format_number(r.band_pct * 100)}%: {s['alerts']} alerts, {s['rearms']} re-arms "
+            f"over {s['ticks']:,} ticks ({s['ticks_per_sec'] or 0:,.0f} ticks/s)"
+        )
+        if s["alerts"]:
+            print(
+                f"  first {s['first_alert']}  last {s['last_alert']}  "
+                f"|distance| mean {s['mean_abs_distance_pct']:.4f}%  max {s['max_abs_distance_pct']:.4f}%"
+            )
+        if args.events:
+            for a in r.alerts:
+                print(f"  {_fmt_ts(a.ts)}  {a.symbol}  target {a.target:,.0f}  price {a.price:,.0f}  ({a.distance_pct:+.4f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""When the background checker should run, from the HOSE/HNX session calendar.
+
+Trading days (UTC+7, Monday-Friday except MARKET_HOLIDAYS):
+
+    09:00-09:15  ato         opening auction (HOSE); HNX is already matching
+    09:15-11:30  continuous
+    11:30-13:00  lunch
+    13:00-14:30  continuous
+    14:30-14:45  atc         closing auction
+    14:45-15:00  post_close  put-through / HNX post-close session
+    otherwise    closed
+
+Each phase has an interval: CHECK_INTERVAL_TRADING_SEC for continuous
+matching, CHECK_INTERVAL_AUCTION_SEC for the auctions and post-close, and
+CHECK_INTERVAL_IDLE_SEC for lunch and closed hours (0 pauses until the next
+session). One check always runs at every phase boundary, so the ATO match,
+the morning close and the ATC close are each seen once.
+
+Checks land on a fixed grid counted from the phase start (09:15:00,
+09:15:15, ...), not "interval after the last check finished". A slow check
+therefore skips the slots it overran instead of pushing every later check
+back. CHECK_SCHEDULE=fixed (or SAMPLE_PRICES) ignores the calendar and uses
+a CHECK_INTERVAL_SEC grid.
+"""
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Optional
+
+from .config import (
+    CHECK_INTERVAL_AUCTION_SEC,
+    CHECK_INTERVAL_IDLE_SEC,
+    CHECK_INTERVAL_SEC,
+    CHECK_INTERVAL_TRADING_SEC,
+    CHECK_SCHEDULE,
+    MARKET_HOLIDAYS,
+    SAMPLE_PRICES,
+    UTC7,
+)
+
+CLOSED, ATO, CONTINUOUS, LUNCH, ATC, POST_CLOSE, FIXED = (
+    "closed", "ato", "continuous", "lunch", "atc", "post_close", "fixed",
+)
+
+SESSIONS: tuple[tuple[dtime, dtime, str], ...] = (
+    (dtime(9, 0), dtime(9, 15), ATO),
+    (dtime(9, 15), dtime(11, 30), CONTINUOUS),
+    (dtime(11, 30), dtime(13, 0), LUNCH),
+    (dtime(13, 0), dtime(14, 30), CONTINUOUS),
+    (dtime(14, 30), dtime(14, 45), ATC),
+    (dtime(14, 45), dtime(15, 0), POST_CLOSE),
+)
+
+INTERVALS = {
+    CONTINUOUS: CHECK_INTERVAL_TRADING_SEC,
+    ATO: CHECK_INTERVAL_AUCTION_SEC,
+    ATC: CHECK_INTERVAL_AUCTION_SEC,
+    POST_CLOSE: CHECK_INTERVAL_AUCTION_SEC,
+    LUNCH: CHECK_INTERVAL_IDLE_SEC,
+    CLOSED: CHECK_INTERVAL_IDLE_SEC,
+    FIXED: CHECK_INTERVAL_SEC,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Slot:
+    at: float  # epoch seconds the check is due
+    phase: str  # phase the check belongs to
+    interval: float  # regular spacing inside that phase; 0 = only the boundary check
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in MARKET_HOLIDAYS
+
+
+def _at(day: date, t: dtime) -> datetime:
+    return datetime.combine(day, t, tzinfo=UTC7)
+
+
+def phase_at(now: datetime) -> tuple[str, datetime, datetime]:
+    """(phase, phase start, phase end) for a timezone-aware datetime."""
+    local = now.astimezone(UTC7)
+    day = local.date()
+    if is_trading_day(day):
+        for start, end, phase in SESSIONS:
+            if _at(day, start) <= local < _at(day, end):
+                return phase, _at(day, start), _at(day, end)
+        if local < _at(day, SESSIONS[0][0]):
+            return CLOSED, _previous_close(day), _at(day, SESSIONS[0][0])
+    return CLOSED, _previous_close(day + timedelta(days=1)), _next_open(day + timedelta(days=1))
+
+
+def _next_open(day: date) -> datetime:
+    for _ in range(366):
+        if is_trading_day(day):
+            return _at(day, SESSIONS[0][0])
+        day += timedelta(days=1)
+    raise ValueError("no trading day within a year; check MARKET_HOLIDAYS")
+
+
+def _previous_close(day: date) -> datetime:
+    """Close of the last trading day strictly before `day`."""
+    for _ in range(366):
+        day -= timedelta(days=1)
+        if is_trading_day(day):
+            return _at(day, SESSIONS[-1][1])
+    return _at(day, SESSIONS[-1][1])
+
+
+def next_slot(now: Optional[float] = None) -> Slot:
+    """The first check strictly after `now` (epoch seconds)."""
+    now = time.time() if now is None else now
+    if CHECK_SCHEDULE == "fixed" or SAMPLE_PRICES:
+        step = max(1.0, CHECK_INTERVAL_SEC)
+        return Slot((math.floor(now / step) + 1) * step, FIXED, step)
+    phase, start, end = phase_at(datetime.fromtimestamp(now, UTC7))
+    interval = INTERVALS[phase]
+    boundary = end.timestamp()
+    if interval > 0:
+        t0 = start.timestamp()
+        due = t0 + (math.floor((now - t0) / interval) + 1) * interval
+        if due < boundary:
+            return Slot(due, phase, interval)
+    next_phase = phase_at(end)[0]
+    return Slot(boundary, next_phase, INTERVALS[next_phase])
+
+
+def sleep_until(at: float, stop: Optional[threading.Event] = None) -> bool:
+    """Sleep until epoch `at`. Returns False if `stop` was set first.
+
+    Waits in chunks of at most a minute and re-reads the wall clock, so a
+    suspended host or a clock step cannot oversleep by hours.
+    """
+    while True:
+        left = at - time.time()
+        if left <= 0:
+            return True
+        if stop is not None:
+            if stop.wait(min(left, 60.0)):
+                return False
+        else:
+            time.sleep(min(left, 60.0))
+
+
+def status(now: Optional[float] = None) -> dict:
+    now = time.time() if now is None else now
+    slot = next_slot(now)
+    fixed = CHECK_SCHEDULE == "fixed" or SAMPLE_PRICES
+    phase = FIXED if fixed else phase_at(datetime.fromtimestamp(now, UTC7))[0]
+    return {
+        "mode": "fixed" if fixed else "session",
+        "phase": phase,
+        "interval_sec": INTERVALS[phase],
+        "next_check": datetime.fromtimestamp(slot.at, UTC7).isoformat(timespec="seconds"),
+        "next_check_in_sec": round(slot.at - now, 3),
+        "next_phase": slot.phase,
+        "holidays": len(MARKET_HOLIDAYS),
+    }
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+
+from .config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_OPEN_SEC,
+    SOURCE_ADAPTIVE_ORDER,
+    SOURCE_LATENCY_WINDOW,
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _Health:
+    __slots__ = (
+        "calls", "successes", "failures", "consecutive_failures", "latencies",
+        "state", "opened_at", "probing", "last_error", "last_success_at",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latencies: deque[float] = deque(maxlen=SOURCE_LATENCY_WINDOW)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_error = ""
+        self.last_success_at = 0.0
+
+
+_lock = threading.Lock()
+_sources: dict[str, _Health] = {}
+
+
+def _get(name: str) -> _Health:
+    h = _sources.get(name)
+    if h is None:
+        h = _sources[name] = _Health()
+    return h
+
+
+def _refresh(h: _Health, now: float) -> None:
+    if h.state == OPEN and now - h.opened_at >= CIRCUIT_OPEN_SEC:
+        h.state = HALF_OPEN
+        h.probing = False
+
+
+def is_available(name: str) -> bool:
+    with _lock:
+        h = _get(name)
+        _refresh(h, time.monotonic())
+        return h.state == CLOSED or (h.state == HALF_OPEN and not h.probing)
+
+
+def allow(name: str) -> bool:
+    with _lock:
+        h = _get(name)
+        _refresh(h, time.monotonic())
+        if h.state == CLOSED:
+            return True
+        if h.state == HALF_OPEN and not h.probing:
+            h.probing = True
+            return True
+        return False
+
+
+def release(name: str) -> None:
+    with _lock:
+        _get(name).probing = False
+
+
+def record(name: str, ok: bool, latency: float, error: str = "") -> None:
+    now = time.monotonic()
+    with _lock:
+        h = _get(name)
+        h.calls += 1
+        h.latencies.append(latency)
+        h.probing = False
+        if ok:
+            h.successes += 1
+            h.consecutive_failures = 0
+            h.state = CLOSED
+            h.last_success_at = now
+            return
+        h.failures += 1
+        h.consecutive_failures += 1
+        h.last_error = error
+        if h.state == HALF_OPEN or h.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            h.state = OPEN
+            h.opened_at = now
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def _score(h: _Health) -> float:
+    if not h.latencies:
+        return 0.0
+    rate = h.successes / h.calls if h.calls else 1.0
+    return _percentile(list(h.latencies), 50) / max(rate, 0.1)
+
+
+def order(names: list[str]) -> list[str]:
+    if not SOURCE_ADAPTIVE_ORDER:
+        return list(names)
+    with _lock:
+        scores = {n: _score(_get(n)) for n in names}
+    return sorted(names, key=lambda n: scores[n])
+
+
+def snapshot() -> dict[str, dict]:
+    now = time.monotonic()
+    out = {}
+    with _lock:
+        for name, h in _sources.items():
+            _refresh(h, now)
+            lat = list(h.latencies)
+            out[name] = {
+                "state": h.state,
+                "calls": h.calls,
+                "successes": h.successes,
+                "failures": h.failures,
+                "success_rate": round(h.successes / h.calls, 4) if h.calls else None,
+                "consecutive_failures": h.consecutive_failures,
+                "latency_ms": {
+                    "p50": round(_percentile(lat, 50) * 1000, 1),
+                    "p90": round(_percentile(lat, 90) * 1000, 1),
+                    "p99": round(_percentile(lat, 99) * 1000, 1),
+                },
+                "open_for_sec": round(max(0.0, CIRCUIT_OPEN_SEC - (now - h.opened_at)), 1) if h.state == OPEN else 0,
+                "last_error": h.last_error,
+                "last_success_ago_sec": round(now - h.last_success_at, 1) if h.last_success_at else None,
+            }
+    return out
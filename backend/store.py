@@ -1,156 +1,254 @@
-import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Any
 
-from .config import DATA_DIR, UTC7
+from . import local_db, observer_cache, tracing, write_behind
+from .alert_engine import RuleIndex
+from .config import HISTORY_PAGE_SIZE, WRITE_BEHIND_ENABLED
+from .events import rows_to_columns, rows_to_dicts
+from .pagination import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
-OBSERVERS_FILE = DATA_DIR / "observers.json"
-HISTORY_FILE = DATA_DIR / "history.json"
-LAST_ALERTED_FILE = DATA_DIR / "last_alerted.json"
-OBSERVER_PRICE_CHANGE_FILE = DATA_DIR / "observer_price_change.json"
+_PROCESS_TAG = f"{os.getpid():x}{int(time.time()):x}"
 
 
 def _use_db() -> bool:
     return bool(os.getenv("DATABASE_URL", "").strip())
 
 
-def _ensure_dir() -> None:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+def init_storage() -> None:
+    if _use_db():
+        from .db import ensure_schema
+        try:
+            ensure_schema()
+        except Exception as e:
+            logger.warning("db ensure_schema: %s", e)
+        if WRITE_BEHIND_ENABLED:
+            write_behind.start()
+        return
+    local_db.load_observers()
+
+
+def _load_observers_uncached() -> dict[str, str]:
+    # Raises on error: the cache then keeps serving the previous copy instead of caching {}.
+    if _use_db():
+        from .db import fetch_observers
+        return fetch_observers()
+    return local_db.fetch_observers()
 
 
-def load_observers() -> dict[str, str]:
+def _observers_version():
     if _use_db():
-        from .db import load_observers as _load
-        return _load()
-    _ensure_dir()
-    if not OBSERVERS_FILE.exists():
-        return {}
-    try:
-        with open(OBSERVERS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
-    except Exception as e:
-        logger.warning("load_observers: %s", e)
-        return {}
+        from .db import observers_version
+        return observers_version()
+    return local_db.observers_version()
 
 
+@tracing.traced()
+def load_observers() -> dict[str, str]:
+    return observer_cache.observers(_load_observers_uncached, _observers_version)
+
+
+@tracing.traced()
+def load_rule_index() -> RuleIndex:
+    return observer_cache.rules(_load_observers_uncached, _observers_version)
+
+
+@tracing.traced()
 def save_observers(observers: dict[str, str]) -> None:
     if _use_db():
         from .db import save_observers as _save
-        return _save(observers)
-    _ensure_dir()
-    with open(OBSERVERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(observers, f, indent=2, ensure_ascii=False)
+        _save(observers)
+    else:
+        local_db.save_observers(observers)
+    observer_cache.invalidate()
 
 
+@tracing.traced()
 def load_history() -> list[dict[str, Any]]:
     if _use_db():
+        write_behind.kick()
         from .db import load_history as _load
         return _load()
-    _ensure_dir()
-    if not HISTORY_FILE.exists():
-        return []
-    try:
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except Exception as e:
-        logger.warning("load_history: %s", e)
-        return []
+    return local_db.load_history()
 
 
+@tracing.traced()
 def append_history(symbol: str, target: float, price: float) -> None:
+    if _use_db() and WRITE_BEHIND_ENABLED:
+        return write_behind.enqueue("history", symbol, target, price)
     if _use_db():
         from .db import append_history as _append
         return _append(symbol, target, price)
-    _ensure_dir()
-    history = load_history()
-    history.insert(0, {
-        "symbol": symbol,
-        "target": target,
-        "price": price,
-        "at": datetime.now(UTC7).strftime("%Y-%m-%d %H:%M:%S"),
-    })
-    history = history[:500]
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    local_db.append_history(symbol, target, price)
 
 
+@tracing.traced()
 def load_last_alerted() -> dict[str, float]:
     if _use_db():
         from .db import load_last_alerted as _load
         return _load()
-    _ensure_dir()
-    if not LAST_ALERTED_FILE.exists():
-        return {}
-    try:
-        with open(LAST_ALERTED_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return {k: float(v) for k, v in (data or {}).items()}
-    except Exception:
-        return {}
+    return local_db.load_last_alerted()
 
 
+@tracing.traced()
 def save_last_alerted(last: dict[str, float]) -> None:
     if _use_db():
         from .db import save_last_alerted as _save
         return _save(last)
-    _ensure_dir()
-    with open(LAST_ALERTED_FILE, "w", encoding="utf-8") as f:
-        json.dump(last, f, indent=2)
+    local_db.save_last_alerted(last)
+
+
+@tracing.traced()
+def update_last_alerted(changed: dict[str, float], removed: list[str]) -> None:
+    if _use_db():
+        from .db import update_last_alerted as _update
+        return _update(changed, removed)
+    local_db.update_last_alerted(changed, removed)
+
+
+@tracing.traced()
+def query_events(
+    kind: str,
+    symbol: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = HISTORY_PAGE_SIZE,
+    compact: bool = False,
+) -> tuple[list[dict[str, Any]] | dict[str, list], str | None]:
+    """One page of history or observer_price_change rows plus the cursor for the next page.
+
+    compact=True returns columns (see events.rows_to_columns) instead of row dicts.
+    Raises ValueError for a malformed cursor; storage errors propagate to the caller.
+    """
+    after = decode_cursor(cursor)
+    if _use_db():
+        write_behind.kick()
+        from .db import query_events as _query
+    else:
+        _query = local_db.query_events
+    rows, next_key = _query(kind, symbol, start, end, after, limit)
+    payload = rows_to_columns(rows) if compact else rows_to_dicts(rows)
+    return payload, encode_cursor(*next_key) if next_key else None
+
+
+@tracing.traced()
+def events_version(kind: str) -> tuple[int, datetime | None] | None:
+    """(MAX(id), MAX(at)) for conditional GETs, or None if the store can't be read."""
+    try:
+        if _use_db():
+            write_behind.kick()
+            from .db import events_version as _version
+            return _version(kind)
+        return local_db.events_version(kind)
+    except Exception as e:
+        logger.warning("events_version %s: %s", kind, e)
+        return None
+
 
+@tracing.traced()
+def observers_version():
+    """Validator for the observers list. The Postgres one is a per-process NOTIFY counter, so it is tagged with this process."""
+    version = _observers_version()
+    if version is None or not _use_db():
+        return version
+    return f"{_PROCESS_TAG}.{version}"
 
+
+@tracing.traced()
 def get_history_filtered(symbol: str | None) -> list[dict[str, Any]]:
     if _use_db():
+        write_behind.kick()
         from .db import get_history_filtered as _get
         return _get(symbol)
-    history = load_history()
-    if symbol:
-        symbol = symbol.strip().upper()
-        history = [h for h in history if (h.get("symbol") or "").upper() == symbol]
-    return history
+    return local_db.get_history_filtered(symbol)
 
 
+@tracing.traced()
 def append_observer_price_change(symbol: str, target: float, price: float) -> None:
+    if _use_db() and WRITE_BEHIND_ENABLED:
+        return write_behind.enqueue("observer_price_change", symbol, target, price)
     if _use_db():
         from .db import insert_observer_price_change as _insert
         return _insert(symbol, target, price)
-    _ensure_dir()
-    data = load_observer_price_change_raw()
-    data.insert(0, {
-        "symbol": symbol,
-        "target": target,
-        "price": price,
-        "at": datetime.now(UTC7).strftime("%Y-%m-%d %H:%M:%S"),
-    })
-    data = data[:500]
-    with open(OBSERVER_PRICE_CHANGE_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
-def load_observer_price_change_raw() -> list[dict[str, Any]]:
-    _ensure_dir()
-    if not OBSERVER_PRICE_CHANGE_FILE.exists():
-        return []
-    try:
-        with open(OBSERVER_PRICE_CHANGE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, list) else []
-    except Exception as e:
-        logger.warning("load_observer_price_change_raw: %s", e)
-        return []
+    local_db.insert_observer_price_change(symbol, target, price)
 
 
+@tracing.traced()
 def get_observer_price_change_filtered(symbol: str | None) -> list[dict[str, Any]]:
     if _use_db():
+        write_behind.kick()
         from .db import get_observer_price_change_filtered as _get
         return _get(symbol)
-    data = load_observer_price_change_raw()
-    if symbol:
-        symbol = symbol.strip().upper()
-        data = [h for h in data if (h.get("symbol") or "").upper() == symbol]
-    return data
+    return local_db.get_observer_price_change_filtered(symbol)
+
+
+@tracing.traced()
+def outbox_add(
+    kind: str, chat_id: str, text: str, dedupe_key: str | None, payload: str, owner: str | None = None
+) -> int | None:
+    if _use_db():
+        from .db import outbox_add as _add
+        return _add(kind, chat_id, text, dedupe_key, payload, owner)
+    return local_db.outbox_add(kind, chat_id, text, dedupe_key, payload, owner)
+
+
+@tracing.traced()
+def claim_outbox(owner: str, ttl: float) -> list[dict[str, Any]]:
+    if _use_db():
+        from .db import claim_outbox as _claim
+        return _claim(owner, ttl)
+    return local_db.claim_outbox(owner, ttl)
+
+
+@tracing.traced()
+def outbox_update(outbox_id: int, attempts: int) -> None:
+    if _use_db():
+        from .db import outbox_update as _update
+        return _update(outbox_id, attempts)
+    local_db.outbox_update(outbox_id, attempts)
+
+
+@tracing.traced()
+def outbox_delete(outbox_id: int) -> None:
+    if _use_db():
+        from .db import outbox_delete as _delete
+        return _delete(outbox_id)
+    local_db.outbox_delete(outbox_id)
+
+
+def heartbeat_member(member_id: str, ttl: float) -> list[str]:
+    if _use_db():
+        from .db import heartbeat_member as _heartbeat
+        return _heartbeat(member_id, ttl)
+    return local_db.heartbeat_member(member_id, ttl)
+
+
+def leave_member(member_id: str) -> None:
+    if _use_db():
+        from .db import leave_member as _leave
+        return _leave(member_id)
+    local_db.leave_member(member_id)
+
+
+def relay_stream_events(handler) -> bool:
+    """Route stream events published by any worker to handler(payload).
+
+    Returns False when there is no shared channel (local SQLite store), in which
+    case events stay inside the process that published them.
+    """
+    if not _use_db():
+        return False
+    from .db import set_stream_handler
+    set_stream_handler(handler)
+    return True
+
+
+def broadcast_stream_event(payload: str) -> None:
+    if _use_db():
+        from .db import notify_stream
+        notify_stream(payload)
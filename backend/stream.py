@@ -0,0 +1,211 @@
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Iterator, Optional
+
+from .config import (
+    INDEX_CODES,
+    STREAM_CLIENT_QUEUE,
+    STREAM_KEEPALIVE_SEC,
+    STREAM_MAX_CLIENTS,
+    STREAM_QUOTE_INTERVAL_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+# Postgres caps a NOTIFY payload at 8000 bytes.
+_RELAY_MAX_BYTES = 7900
+
+
+class Subscriber:
+    """One connected client. Its queue is bounded; a client that falls behind is dropped, not waited on."""
+
+    def __init__(self, symbols: Optional[set[str]]) -> None:
+        self.symbols = symbols
+        self.queue: queue.Queue = queue.Queue(maxsize=STREAM_CLIENT_QUEUE)
+        self.closed = False
+
+    def offer(self, chunk: str) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            self.close()
+            _counts["dropped"] += 1
+            logger.info("stream client dropped: queue full")
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.queue.put_nowait(_CLOSE)
+        except queue.Full:
+            pass
+
+    def events(self) -> Iterator[str]:
+        yield f"retry: {int(STREAM_KEEPALIVE_SEC * 1000)}\n\n"
+        while not self.closed:
+            try:
+                chunk = self.queue.get(timeout=STREAM_KEEPALIVE_SEC)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if chunk is _CLOSE:
+                return
+            yield chunk
+
+
+_lock = threading.Lock()
+_subscribers: set[Subscriber] = set()
+_last_quotes: dict[str, dict[str, Any]] = {}
+_ids = itertools.count(1)
+_counts = {"published": 0, "dropped": 0, "relayed": 0}
+_thread: threading.Thread | None = None
+_origin = f"{os.getpid():x}.{uuid.uuid4().hex[:8]}"
+_relaying = False
+
+
+def _format(event: str, data: Any) -> str:
+    return f"id: {next(_ids)}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def subscribe(symbols: Optional[set[str]] = None) -> Optional[Subscriber]:
+    """Register a client; None means the server is at STREAM_MAX_CLIENTS."""
+    sub = Subscriber(symbols)
+    with _lock:
+        if len(_subscribers) >= STREAM_MAX_CLIENTS:
+            return None
+        _subscribers.add(sub)
+        snapshot = {s: q for s, q in _last_quotes.items() if symbols is None or s in symbols}
+    if snapshot:
+        sub.offer(_format("quotes", snapshot))
+    start()
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    sub.closed = True
+    with _lock:
+        _subscribers.discard(sub)
+
+
+def publish(event: str, data: Any, symbol: Optional[str] = None) -> None:
+    """Send an event to this process's clients and, with several workers, to everyone else's."""
+    _deliver(event, data, symbol)
+    if _relaying:
+        _relay(event, data, symbol)
+
+
+def _relay(event: str, data: Any, symbol: Optional[str]) -> None:
+    from .store import broadcast_stream_event
+    payload = json.dumps({"o": _origin, "e": event, "s": symbol, "d": data}, separators=(",", ":"))
+    if len(payload.encode()) > _RELAY_MAX_BYTES:
+        if event != "observers":
+            logger.warning("stream %s event too large to relay to other workers", event)
+            return
+        # Receivers reload the observers themselves.
+        payload = json.dumps({"o": _origin, "e": event, "s": symbol}, separators=(",", ":"))
+    try:
+        broadcast_stream_event(payload)
+    except Exception as e:
+        logger.warning("stream relay: %s", e)
+
+
+def _on_relayed(payload: str) -> None:
+    msg = json.loads(payload)
+    if msg.get("o") == _origin:
+        return
+    if "d" in msg:
+        data = msg["d"]
+    elif msg.get("e") == "observers":
+        from .store import load_observers
+        data = load_observers()
+    else:
+        return
+    _counts["relayed"] += 1
+    _deliver(msg["e"], data, msg.get("s"))
+
+
+def start_relay() -> None:
+    """Share published events with the other workers through the store (Postgres NOTIFY)."""
+    global _relaying
+    from .store import relay_stream_events
+    _relaying = relay_stream_events(_on_relayed)
+
+
+def _deliver(event: str, data: Any, symbol: Optional[str]) -> None:
+    with _lock:
+        subs = [s for s in _subscribers if symbol is None or s.symbols is None or symbol in s.symbols]
+    if not subs:
+        return
+    chunk = _format(event, data)
+    for sub in subs:
+        sub.offer(chunk)
+    _counts["published"] += 1
+
+
+def _observed_symbols() -> set[str]:
+    from .store import load_rule_index
+    return set(load_rule_index().symbols())
+
+
+def _publish_quotes() -> None:
+    from .fetcher import get_quotes
+    with _lock:
+        subs = list(_subscribers)
+    if not subs:
+        return
+    observed = _observed_symbols() if any(s.symbols is None for s in subs) else set()
+    wanted = set(observed)
+    for sub in subs:
+        if sub.symbols is not None:
+            wanted |= sub.symbols
+    if not wanted:
+        return
+    quotes = get_quotes(sorted(wanted), INDEX_CODES)
+    changed = {}
+    with _lock:
+        for sym, q in quotes.items():
+            prev = _last_quotes.get(sym)
+            if prev is None or prev["price"] != q.price:
+                changed[sym] = _last_quotes[sym] = q.to_dict()
+    if not changed:
+        return
+    for sub in subs:
+        symbols = observed if sub.symbols is None else sub.symbols
+        payload = {s: q for s, q in changed.items() if s in symbols}
+        if payload:
+            sub.offer(_format("quotes", payload))
+    _counts["published"] += 1
+
+
+def _loop() -> None:
+    while True:
+        started = time.monotonic()
+        try:
+            _publish_quotes()
+        except Exception as e:
+            logger.warning("stream quote producer: %s", e)
+        time.sleep(max(0.0, STREAM_QUOTE_INTERVAL_SEC - (time.monotonic() - started)))
+
+
+def stats() -> dict[str, Any]:
+    with _lock:
+        return {"clients": len(_subscribers), "symbols": len(_last_quotes), **_counts}
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="stream-quotes")
+    _thread.start()
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from . import coordination, store, tracing
+from .config import (
+    CHECKER_LEASE_TTL_SEC,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_CHAT_ID,
+    TELEGRAM_CHAT_INTERVAL_SEC,
+    TELEGRAM_GLOBAL_RATE_PER_SEC,
+    TELEGRAM_MAX_ATTEMPTS,
+    TELEGRAM_QUEUE_ENABLED,
+    TELEGRAM_RETRY_MAX_SEC,
+    TRACE_SLOW_REQUEST_SEC,
+)
+from .telegram_send import SendResult, deliver
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Message:
+    kind: str
+    chat_id: str
+    text: str
+    key: Optional[str] = None
+    payload: dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    id: Optional[int] = None
+
+
+class _RateLimiter:
+    """Spaces sends so the bot stays under Telegram's global and per-chat limits."""
+
+    def __init__(self, rate_per_sec: float, chat_interval: float) -> None:
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self.chat_interval = chat_interval
+        self.next_global = 0.0
+        self.next_chat: dict[str, float] = {}
+
+    def reserve(self, chat_id: str) -> float:
+        now = time.monotonic()
+        at = max(now, self.next_global, self.next_chat.get(chat_id, 0.0))
+        self.next_global = at + self.interval
+        self.next_chat[chat_id] = at + self.chat_interval
+        return at - now
+
+    def pause(self, chat_id: str, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        self.next_global = max(self.next_global, until)
+        self.next_chat[chat_id] = max(self.next_chat.get(chat_id, 0.0), until)
+
+
+_cond = threading.Condition()
+_heap: list[tuple[float, int, Message]] = []
+_keys: set[str] = set()
+_seq = itertools.count()
+_handlers: dict[str, Callable[[Message, bool], None]] = {}
+_limiter = _RateLimiter(TELEGRAM_GLOBAL_RATE_PER_SEC, TELEGRAM_CHAT_INTERVAL_SEC)
+_counts = {"sent": 0, "failed": 0, "retried": 0, "throttled": 0}
+_thread: threading.Thread | None = None
+
+
+def register_handler(kind: str, fn: Callable[[Message, bool], None]) -> None:
+    """fn(message, ok) runs on the delivery thread once a message is sent or given up on."""
+    _handlers[kind] = fn
+
+
+def _push(msg: Message, delay: float = 0.0) -> None:
+    with _cond:
+        heapq.heappush(_heap, (time.monotonic() + delay, next(_seq), msg))
+        _cond.notify()
+
+
+@tracing.traced("telegram.enqueue")
+def enqueue(
+    kind: str,
+    text: str,
+    chat_id: str = TELEGRAM_CHAT_ID,
+    key: Optional[str] = None,
+    payload: Optional[dict[str, Any]] = None,
+) -> bool:
+    """Queue a message for delivery. Returns False if one with the same key is already pending."""
+    msg = Message(kind, str(chat_id).strip(), text, key, dict(payload or {}))
+    if not TELEGRAM_QUEUE_ENABLED:
+        _finish(msg, deliver(TELEGRAM_BOT_TOKEN, msg.chat_id, text).ok)
+        return True
+    start()
+    with _cond:
+        if key is not None:
+            if key in _keys:
+                return False
+            _keys.add(key)
+    msg.id = store.outbox_add(kind, msg.chat_id, text, key, json.dumps(msg.payload), coordination.member_id())
+    _push(msg)
+    return True
+
+
+def _finish(msg: Message, ok: bool) -> None:
+    if msg.id is not None:
+        store.outbox_delete(msg.id)
+    with _cond:
+        _counts["sent" if ok else "failed"] += 1
+    handler = _handlers.get(msg.kind)
+    try:
+        if handler is not None:
+            handler(msg, ok)
+    except Exception as e:
+        logger.exception("telegram %s handler: %s", msg.kind, e)
+    finally:
+        # Only now: the handler may record state (last_alerted) that stops a re-send.
+        if msg.key is not None:
+            with _cond:
+                _keys.discard(msg.key)
+
+
+def _backoff(attempts: int) -> float:
+    return min(TELEGRAM_RETRY_MAX_SEC, 2.0 ** attempts) * random.uniform(0.5, 1.0)
+
+
+def _handle_result(msg: Message, result: SendResult) -> None:
+    if result.ok:
+        _finish(msg, True)
+        return
+    if result.retry_after is not None:
+        _limiter.pause(msg.chat_id, result.retry_after)
+        with _cond:
+            _counts["throttled"] += 1
+        _push(msg, result.retry_after)
+        return
+    msg.attempts += 1
+    if result.permanent or msg.attempts >= TELEGRAM_MAX_ATTEMPTS:
+        logger.error("telegram %s dropped after %d attempts: %s", msg.kind, msg.attempts, result.error)
+        _finish(msg, False)
+        return
+    if msg.id is not None:
+        store.outbox_update(msg.id, msg.attempts)
+    with _cond:
+        _counts["retried"] += 1
+    _push(msg, _backoff(msg.attempts))
+
+
+def _next_due() -> Message:
+    with _cond:
+        while True:
+            now = time.monotonic()
+            if _heap and _heap[0][0] <= now:
+                return heapq.heappop(_heap)[2]
+            _cond.wait(_heap[0][0] - now if _heap else None)
+
+
+def _loop() -> None:
+    while True:
+        msg = _next_due()
+        wait = _limiter.reserve(msg.chat_id)
+        if wait > 0:
+            time.sleep(wait)
+        with tracing.trace("telegram", TRACE_SLOW_REQUEST_SEC, kind=msg.kind, attempt=msg.attempts + 1):
+            try:
+                result = deliver(TELEGRAM_BOT_TOKEN, msg.chat_id, msg.text)
+            except Exception as e:
+                logger.exception("telegram delivery: %s", e)
+                result = SendResult(False, error=str(e))
+            _handle_result(msg, result)
+
+
+def _restore() -> None:
+    restored = 0
+    # Only rows no live member is delivering; the rest stay with their owner.
+    for row in store.claim_outbox(coordination.member_id(), CHECKER_LEASE_TTL_SEC):
+        try:
+            payload = json.loads(row["payload"] or "{}")
+        except ValueError:
+            payload = {}
+        msg = Message(row["kind"], row["chat_id"], row["text"], row["dedupe_key"], payload, row["attempts"], row["id"])
+        with _cond:
+            duplicate = msg.key is not None and msg.key in _keys
+            if msg.key is not None:
+                _keys.add(msg.key)
+        if duplicate:
+            store.outbox_delete(msg.id)
+            continue
+        _push(msg)
+        restored += 1
+    if restored:
+        logger.info("Restored %d pending Telegram messages", restored)
+
+
+def _adopt(members: tuple[str, ...]) -> None:
+    if _thread is not None:
+        _restore()
+
+
+coordination.on_change(_adopt)
+
+
+def stats() -> dict[str, Any]:
+    with _cond:
+        return {"enabled": TELEGRAM_QUEUE_ENABLED, "pending": len(_heap), **_counts}
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None or not TELEGRAM_QUEUE_ENABLED:
+        return
+    with _cond:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="telegram-queue")
+    # The outbox rows are owned by this process's lease, so hold one before claiming any.
+    coordination.start()
+    _restore()
+    _thread.start()
@@ -1,38 +1,74 @@
 import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
 
 import requests
 
-from .config import MAX_MESSAGE_LENGTH, TELEGRAM_API_BASE
+from .config import MAX_MESSAGE_LENGTH, TELEGRAM_API_BASE, TELEGRAM_SEND_TIMEOUT_SEC
+from . import metrics, tracing
+from .http_pool import get_session
 
 logger = logging.getLogger(__name__)
 
+SEND_SECONDS = metrics.histogram("stockbot_telegram_send_seconds", "Telegram sendMessage round trip.")
+SEND_TOTAL = metrics.counter(
+    "stockbot_telegram_send_total", "Telegram sends by outcome (ok, rate_limited, error, rejected).", ("outcome",)
+)
 
-def send_telegram(bot_token: str, chat_id: str, text: str) -> bool:
+
+@dataclass(frozen=True, slots=True)
+class SendResult:
+    ok: bool
+    retry_after: Optional[float] = None
+    permanent: bool = False
+    error: str = ""
+
+
+@tracing.traced("telegram.send")
+def deliver(bot_token: str, chat_id: str, text: str) -> SendResult:
     if not bot_token or not chat_id:
         logger.error("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID are required")
-        return False
+        return SendResult(False, permanent=True, error="missing token or chat id")
     chat_id = str(chat_id).strip()
     if len(text) > MAX_MESSAGE_LENGTH:
         text = text[: MAX_MESSAGE_LENGTH - 3] + "..."
     url = f"{TELEGRAM_API_BASE}/bot{bot_token}/sendMessage"
+    started = time.perf_counter()
     try:
-        r = requests.post(
+        r = get_session("telegram", retry_post=True).post(
             url,
             json={"chat_id": chat_id, "text": text, "disable_web_page_preview": True},
-            timeout=15,
+            timeout=TELEGRAM_SEND_TIMEOUT_SEC,
         )
-        if not r.ok:
-            body = r.text
-            try:
-                data = r.json()
-                body = data.get("description", body)
-            except Exception:
-                pass
-            logger.error("Telegram error %s: %s", r.status_code, body)
-            if r.status_code == 400 and "chat not found" in body.lower():
-                logger.info("Fix: 1) Open your bot in Telegram 2) Send /start or any message 3) Get your Id from @userinfobot 4) Put that number in .env as TELEGRAM_CHAT_ID")
-            return False
-        return True
     except requests.RequestException as e:
+        SEND_SECONDS.observe(time.perf_counter() - started)
+        SEND_TOTAL.inc("error")
         logger.error("Telegram send failed: %s", e)
-        return False
+        return SendResult(False, error=str(e))
+    SEND_SECONDS.observe(time.perf_counter() - started)
+    if r.ok:
+        SEND_TOTAL.inc("ok")
+        return SendResult(True)
+    body = r.text
+    retry_after = None
+    try:
+        data = r.json()
+        body = data.get("description", body)
+        retry_after = (data.get("parameters") or {}).get("retry_after")
+    except Exception:
+        pass
+    if r.status_code == 429:
+        SEND_TOTAL.inc("rate_limited")
+        retry_after = float(retry_after or r.headers.get("Retry-After") or 1)
+        logger.warning("Telegram rate limited, retry after %.0fs", retry_after)
+        return SendResult(False, retry_after=retry_after, error=body)
+    SEND_TOTAL.inc("rejected" if 400 <= r.status_code < 500 else "error")
+    logger.error("Telegram error %s: %s", r.status_code, body)
+    if r.status_code == 400 and "chat not found" in body.lower():
+        logger.info("Fix: 1) Open your bot in Telegram 2) Send /start or any message 3) Get your Id from @userinfobot 4) Put that number in .env as TELEGRAM_CHAT_ID")
+    return SendResult(False, permanent=400 <= r.status_code < 500, error=body)
+
+
+def send_telegram(bot_token: str, chat_id: str, text: str) -> bool:
+    return deliver(bot_token, chat_id, text).ok
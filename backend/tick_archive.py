@@ -0,0 +1,338 @@
+"""Durable intraday tick history as columnar files under DATA_DIR/ticks.
+
+Today's ticks are appended per process to raw column files:
+    ticks/2026-10-16/HPG.<pid>.ts   float64 epoch seconds
+    ticks/2026-10-16/HPG.<pid>.px   float64 prices
+Separate files per process keep the two columns aligned when several workers
+append at once. Compaction turns each finished day into one file,
+ticks/2026-10-16.day, that holds a JSON header (symbol -> offset, count)
+followed by each symbol's sorted ts column and then its px column. Reads
+mmap that file and bisect the ts column, so a slice never loads the whole day.
+A file written on a host with the other byte order (see the header's
+"byteorder") is still readable; its columns are swapped on read.
+
+Run `python -m backend.tick_archive compact` to compact by hand. The flush
+thread also compacts once a day. An flock on ticks/.compact.lock makes sure
+only one worker on the host compacts at a time.
+"""
+import atexit
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fine for a single dev process
+    fcntl = None
+
+from .config import (
+    DATA_DIR,
+    TICK_ARCHIVE_ENABLED,
+    TICK_ARCHIVE_FLUSH_SEC,
+    TICK_ARCHIVE_RETENTION_DAYS,
+    UTC7,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = DATA_DIR / "ticks"
+MAGIC = b"VTK1"
+_HEAD = struct.Struct("<4sI")
+
+_lock = threading.Lock()
+_pending: dict[str, tuple[array, array]] = {}
+_thread: threading.Thread | None = None
+_last_compacted: Optional[date] = None
+
+
+def _day_of(ts: float) -> date:
+    return datetime.fromtimestamp(ts, UTC7).date()
+
+
+def _day_start(day: date) -> float:
+    return datetime(day.year, day.month, day.day, tzinfo=UTC7).timestamp()
+
+
+def append(symbol: str, ts: float, price: float) -> None:
+    if not TICK_ARCHIVE_ENABLED:
+        return
+    with _lock:
+        cols = _pending.get(symbol)
+        if cols is None:
+            cols = _pending[symbol] = (array("d"), array("d"))
+        cols[0].append(ts)
+        cols[1].append(price)
+    start()
+
+
+def flush() -> int:
+    """Write buffered ticks to today's raw column files. Returns the number written."""
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    written = 0
+    pid = os.getpid()
+    for symbol, (ts, px) in pending.items():
+        # A buffer normally holds one day; split at midnight when it does not.
+        i = 0
+        while i < len(ts):
+            day = _day_of(ts[i])
+            cut = bisect_left(ts, _day_start(day + timedelta(days=1)), i)
+            folder = ARCHIVE_DIR / day.isoformat()
+            try:
+                folder.mkdir(parents=True, exist_ok=True)
+                with open(folder / f"{symbol}.{pid}.ts", "ab") as f:
+                    f.write(ts[i:cut].tobytes())
+                with open(folder / f"{symbol}.{pid}.px", "ab") as f:
+                    f.write(px[i:cut].tobytes())
+                written += cut - i
+            except OSError as e:
+                logger.warning("tick archive flush %s: %s", symbol, e)
+            i = cut
+    return written
+
+
+def _read_column(path: Path) -> array:
+    out = array("d")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return out
+    out.frombytes(data[: len(data) - len(data) % 8])
+    return out
+
+
+def _read_raw_day(folder: Path, symbol: str, seen: Optional[list[Path]] = None) -> list[tuple[float, float]]:
+    rows: list[tuple[float, float]] = []
+    for ts_path in folder.glob(f"{symbol}.*.ts"):
+        ts = _read_column(ts_path)
+        px = _read_column(ts_path.with_suffix(".px"))
+        rows.extend(zip(ts, px))
+        if seen is not None:
+            seen += [ts_path, ts_path.with_suffix(".px")]
+    rows.sort()
+    return rows
+
+
+def _slice_day_file(path: Path, symbol: str, start: float, end: float) -> tuple[array, array]:
+    ts_out, px_out = array("d"), array("d")
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, hlen = _HEAD.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path.name}: not a tick archive file")
+        header = json.loads(mm[_HEAD.size:_HEAD.size + hlen])
+        entry = header["symbols"].get(symbol)
+        if entry is None:
+            return ts_out, px_out
+        base = _align8(_HEAD.size + hlen) + entry[0]
+        count = entry[1]
+        px_base = base + 8 * count
+        if header.get("byteorder", sys.byteorder) != sys.byteorder:
+            # Written on a host with the other byte order: swap a copy, no in-place bisect.
+            ts = array("d", mm[base:px_base])
+            ts.byteswap()
+            lo, hi = bisect_left(ts, start), bisect_left(ts, end)
+            ts_out = ts[lo:hi]
+            px_out.frombytes(mm[px_base + 8 * lo:px_base + 8 * hi])
+            px_out.byteswap()
+            return ts_out, px_out
+        with memoryview(mm) as view:
+            with view[base:px_base].cast("d") as ts:
+                lo, hi = bisect_left(ts, start), bisect_left(ts, end)
+            ts_out.frombytes(mm[base + 8 * lo:base + 8 * hi])
+            px_out.frombytes(mm[px_base + 8 * lo:px_base + 8 * hi])
+    finally:
+        mm.close()
+    return ts_out, px_out
+
+
+def read(symbol: str, start: datetime, end: datetime) -> tuple[array, array]:
+    """Archived ticks with start <= t < end, oldest first. Naive datetimes are UTC+7."""
+    symbol = str(symbol).strip().upper()
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=UTC7)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=UTC7)
+    t0, t1 = start.timestamp(), end.timestamp()
+    ts_out, px_out = array("d"), array("d")
+    day = start.astimezone(UTC7).date()
+    last = end.astimezone(UTC7).date()
+    while day <= last:
+        day_file = ARCHIVE_DIR / f"{day.isoformat()}.day"
+        folder = ARCHIVE_DIR / day.isoformat()
+        if day_file.exists():
+            try:
+                ts, px = _slice_day_file(day_file, symbol, t0, t1)
+                ts_out.extend(ts)
+                px_out.extend(px)
+            except (OSError, ValueError) as e:
+                logger.warning("tick archive read %s: %s", day_file.name, e)
+        if folder.is_dir():
+            for t, p in _read_raw_day(folder, symbol):
+                if t0 <= t < t1:
+                    ts_out.append(t)
+                    px_out.append(p)
+        day += timedelta(days=1)
+    return ts_out, px_out
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def compact_day(day: date) -> bool:
+    """Merge a finished day's raw files into one sorted columnar .day file.
+
+    Call it through compact(), which holds the archive lock.
+    """
+    folder = ARCHIVE_DIR / day.isoformat()
+    if not folder.is_dir():
+        return False
+    day_file = ARCHIVE_DIR / f"{day.isoformat()}.day"
+    symbols = sorted({p.name.split(".", 1)[0] for p in folder.glob("*.ts")})
+    columns: dict[str, list[tuple[float, float]]] = {}
+    if day_file.exists():
+        for sym in _day_file_symbols(day_file):
+            ts, px = _slice_day_file(day_file, sym, float("-inf"), float("inf"))
+            columns[sym] = list(zip(ts, px))
+    merged: list[Path] = []
+    for sym in symbols:
+        rows = columns.get(sym, []) + _read_raw_day(folder, sym, merged)
+        rows.sort()
+        columns[sym] = rows
+    index, offset = {}, 0
+    for sym in sorted(columns):
+        index[sym] = [offset, len(columns[sym])]
+        offset += 16 * len(columns[sym])
+    header = json.dumps({"symbols": index, "byteorder": sys.byteorder}, separators=(",", ":")).encode()
+    tmp = day_file.with_suffix(f".day.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEAD.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_align8(_HEAD.size + len(header)) - _HEAD.size - len(header)))
+        for sym in sorted(columns):
+            rows = columns[sym]
+            f.write(array("d", (t for t, _ in rows)).tobytes())
+            f.write(array("d", (p for _, p in rows)).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, day_file)
+    # Remove only what was merged; raw files a late flush created since then wait for the next run.
+    for path in merged:
+        path.unlink(missing_ok=True)
+    try:
+        folder.rmdir()
+    except OSError:
+        pass
+    logger.info("tick archive compacted %s (%d symbols)", day.isoformat(), len(columns))
+    return True
+
+
+def _day_file_symbols(path: Path) -> list[str]:
+    with open(path, "rb") as f:
+        magic, hlen = _HEAD.unpack(f.read(_HEAD.size))
+        return list(json.loads(f.read(hlen))["symbols"]) if magic == MAGIC else []
+
+
+@contextmanager
+def _compaction_lock():
+    """Exclusive, non-blocking lock shared by every worker on this host; yields False if it is taken."""
+    if fcntl is None:
+        yield True
+        return
+    with open(ARCHIVE_DIR / ".compact.lock", "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def compact(today: Optional[date] = None) -> int:
+    """Compact every finished day and apply TICK_ARCHIVE_RETENTION_DAYS. Returns days compacted.
+
+    Workers sharing DATA_DIR all call this; whoever holds the lock does the work and the rest return 0.
+    """
+    today = today or datetime.now(UTC7).date()
+    if not ARCHIVE_DIR.is_dir():
+        return 0
+    with _compaction_lock() as locked:
+        return _compact(today) if locked else 0
+
+
+def _compact(today: date) -> int:
+    done = 0
+    for entry in sorted(ARCHIVE_DIR.iterdir()):
+        try:
+            day = date.fromisoformat(entry.name.split(".", 1)[0])
+        except ValueError:
+            continue
+        if TICK_ARCHIVE_RETENTION_DAYS > 0 and day < today - timedelta(days=TICK_ARCHIVE_RETENTION_DAYS):
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+            continue
+        if entry.is_dir() and day < today:
+            try:
+                done += compact_day(day)
+            except (OSError, ValueError) as e:
+                logger.warning("tick archive compact %s: %s", entry.name, e)
+    return done
+
+
+def stats() -> dict[str, object]:
+    days = sorted({p.name.split(".", 1)[0] for p in ARCHIVE_DIR.iterdir() if not p.name.startswith(".")}) if ARCHIVE_DIR.is_dir() else []
+    with _lock:
+        buffered = sum(len(ts) for ts, _ in _pending.values())
+    return {"enabled": TICK_ARCHIVE_ENABLED, "days": len(days), "first_day": days[0] if days else None, "buffered": buffered}
+
+
+def _loop() -> None:
+    global _last_compacted
+    while True:
+        time.sleep(TICK_ARCHIVE_FLUSH_SEC)
+        flush()
+        today = datetime.now(UTC7).date()
+        if _last_compacted != today:
+            _last_compacted = today
+            compact(today)
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None or not TICK_ARCHIVE_ENABLED:
+        return
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="tick-archive")
+    _thread.start()
+    atexit.register(flush)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:2] == ["compact"]:
+        print(f"compacted {compact()} day(s)")
+    else:
+        print(json.dumps(stats()))
@@ -0,0 +1,161 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from . import tick_archive
+from .config import TICK_MIN_INTERVAL_SEC, TICK_STORE_CAPACITY, TICK_STORE_MAX_SYMBOLS, UTC7
+
+RESOLUTIONS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class _Ring:
+    """Fixed-capacity ring of (epoch seconds, price) held in two array('d') columns.
+
+    The arrays grow until `capacity`, then the oldest slot is overwritten. Times are
+    kept non-decreasing so the logical order can be bisected.
+    """
+
+    __slots__ = ("capacity", "ts", "px", "head")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.ts = array("d")
+        self.px = array("d")
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def last(self) -> Optional[tuple[float, float]]:
+        n = len(self.ts)
+        if not n:
+            return None
+        i = (self.head - 1) % n
+        return self.ts[i], self.px[i]
+
+    def append(self, ts: float, price: float) -> None:
+        if len(self.ts) < self.capacity:
+            self.ts.append(ts)
+            self.px.append(price)
+            return
+        self.ts[self.head] = ts
+        self.px[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+
+    def _bisect(self, t: float) -> int:
+        """First logical index whose time is >= t."""
+        n = len(self.ts)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[(self.head + mid) % n] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start: Optional[float], end: Optional[float]) -> tuple[array, array]:
+        """Ticks with start <= t < end, oldest first, as fresh arrays."""
+        n = len(self.ts)
+        lo = self._bisect(start) if start is not None else 0
+        hi = self._bisect(end) if end is not None else n
+        if lo >= hi:
+            return array("d"), array("d")
+        a, b = (self.head + lo) % n, (self.head + hi) % n
+        if a < b:
+            return self.ts[a:b], self.px[a:b]
+        return self.ts[a:] + self.ts[:b], self.px[a:] + self.px[:b]
+
+
+_lock = threading.Lock()
+_rings: "OrderedDict[str, _Ring]" = OrderedDict()
+_evicted = 0
+
+
+def record(symbol: str, price: float, ts: Optional[float] = None) -> None:
+    global _evicted
+    if price is None or price <= 0:
+        return
+    symbol = str(symbol).strip().upper()
+    ts = time.time() if ts is None else ts
+    with _lock:
+        ring = _rings.get(symbol)
+        if ring is None:
+            ring = _rings[symbol] = _Ring(TICK_STORE_CAPACITY)
+            while len(_rings) > TICK_STORE_MAX_SYMBOLS:
+                _rings.popitem(last=False)
+                _evicted += 1
+        else:
+            _rings.move_to_end(symbol)
+        last = ring.last()
+        if last is not None:
+            if last[1] == price and ts - last[0] < TICK_MIN_INTERVAL_SEC:
+                return
+            ts = max(ts, last[0])
+        ring.append(ts, float(price))
+    tick_archive.append(symbol, ts, float(price))
+
+
+def record_quotes(quotes) -> None:
+    now = time.time()
+    for q in quotes.values():
+        record(q.symbol, q.price, now)
+
+
+def _epoch(dt: Optional[datetime]) -> Optional[float]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC7)
+    return dt.timestamp()
+
+
+def ticks(symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> tuple[array, array]:
+    with _lock:
+        ring = _rings.get(str(symbol).strip().upper())
+        if ring is None:
+            return array("d"), array("d")
+        return ring.window(_epoch(start), _epoch(end))
+
+
+def bars(symbol: str, resolution: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict[str, list]:
+    """OHLC bars over [start, end). Buckets align to epoch multiples, i.e. whole minutes/hours in UTC+7."""
+    return bars_from(*ticks(symbol, start, end), resolution)
+
+
+def bars_from(ts, px, resolution: str) -> dict[str, list]:
+    step = RESOLUTIONS[resolution]
+    out: dict[str, list] = {"t": [], "open": [], "high": [], "low": [], "close": [], "count": []}
+    bucket = None
+    for t, p in zip(ts, px):
+        b = int(t // step) * step
+        if b != bucket:
+            bucket = b
+            out["t"].append(b * 1000)
+            out["open"].append(p)
+            out["high"].append(p)
+            out["low"].append(p)
+            out["close"].append(p)
+            out["count"].append(1)
+            continue
+        if p > out["high"][-1]:
+            out["high"][-1] = p
+        elif p < out["low"][-1]:
+            out["low"][-1] = p
+        out["close"][-1] = p
+        out["count"][-1] += 1
+    return out
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {
+            "symbols": len(_rings),
+            "ticks": sum(len(r) for r in _rings.values()),
+            "capacity_per_symbol": TICK_STORE_CAPACITY,
+            "max_symbols": TICK_STORE_MAX_SYMBOLS,
+            "evicted_symbols": _evicted,
+        }
@@ -0,0 +1,184 @@
+"""Lightweight span tracing for checks and requests.
+
+A root span is opened with trace() around run_check or an HTTP request; code
+below it opens child spans with span() or @traced. The current span lives in a
+ContextVar, so nesting follows the call stack. bind() carries it into
+ThreadPoolExecutor workers. Outside a trace, span() returns a shared no-op
+object, so instrumented code costs one ContextVar lookup.
+
+When a root span ends after its threshold, the whole tree is logged and kept
+for /api/traces/slow:
+
+    check 41.20s
+      fetch_quotes 40.95s symbols=12
+        source vnstock-kbs 40.90s [fetch-source_0] requested=12 returned=0 error=ReadTimeout
+        source vndirect-ws 5.01s [fetch-source_1] requested=12 returned=12
+      store.save_last_alerted 0.21s
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from .config import TRACE_KEEP
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+_slow: deque = deque(maxlen=max(1, TRACE_KEEP))
+_slow_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children", "thread", "_token")
+
+    def __init__(self, name: str, attrs: dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.end = 0.0
+        self.children: list[Span] = []
+        self.thread = ""
+        self._token = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        if parent is not None:
+            parent.children.append(self)
+        self.thread = threading.current_thread().name
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs.setdefault("error", exc_type.__name__)
+        _current.reset(self._token)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "ms": round(self.duration * 1000, 3),
+            "thread": self.thread,
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [c.to_dict() for c in self.children]} if self.children else {}),
+        }
+
+    def format(self, depth: int = 0, parent_thread: str = "") -> str:
+        attrs = " ".join(f"{k}={v}" for k, v in self.attrs.items())
+        where = f" [{self.thread}]" if parent_thread and self.thread != parent_thread else ""
+        line = f"{'  ' * depth}{self.name} {self.duration:.3f}s{where}{' ' + attrs if attrs else ''}"
+        children = sorted(self.children, key=lambda c: c.start)
+        return "\n".join([line, *(c.format(depth + 1, self.thread) for c in children)])
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NOOP = _NoSpan()
+
+
+class _Root(Span):
+    __slots__ = ("threshold",)
+
+    def __init__(self, name: str, threshold: float, attrs: dict[str, Any]) -> None:
+        super().__init__(name, attrs)
+        self.threshold = threshold
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        finish(self)
+
+
+def span(name: str, **attrs):
+    """A child of the current span, or a no-op when nothing is being traced."""
+    if _current.get() is None:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def current():
+    return _current.get() or _NOOP
+
+
+def trace(name: str, threshold: float, **attrs) -> Span:
+    """Root span; logs the tree if it takes at least `threshold` seconds (<= 0 disables)."""
+    return _Root(name, threshold, attrs)
+
+
+def start(name: str, threshold: float, **attrs) -> Span:
+    """Open a root span without a with-block (e.g. Flask before_request); close it with finish()."""
+    root = _Root(name, threshold, attrs)
+    root.__enter__()
+    return root
+
+
+def finish(root: Span) -> None:
+    if not root.end:
+        root.end = time.perf_counter()
+        if root._token is not None:
+            try:
+                _current.reset(root._token)
+            except ValueError:
+                pass
+    threshold = getattr(root, "threshold", 0)
+    if threshold <= 0 or root.duration < threshold:
+        return
+    logger.warning("Slow %s (%.2fs > %.2fs):\n%s", root.name, root.duration, threshold, root.format())
+    with _slow_lock:
+        _slow.append((time.time(), root))
+
+
+def slow_traces() -> list[dict[str, Any]]:
+    with _slow_lock:
+        items = list(_slow)
+    return [{"at": at, **root.to_dict()} for at, root in reversed(items)]
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: run the function inside span(name or its qualified name)."""
+    def wrap(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap fn so it runs under the caller's current span, e.g. in an executor thread."""
+    ctx = contextvars.copy_context()
+    if ctx.get(_current) is None:
+        return fn
+
+    @wraps(fn)
+    def inner(*args, **kwargs):
+        # A Context can be entered by one thread at a time, so each call runs in its own copy.
+        return ctx.copy().run(fn, *args, **kwargs)
+    return inner
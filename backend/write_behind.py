@@ -0,0 +1,176 @@
+"""Batch history / observer_price_change inserts for Postgres.
+
+Rows wait in memory and are written every WRITE_BEHIND_FLUSH_SEC or once
+WRITE_BEHIND_BATCH_SIZE are queued. Reads do not wait for them; kick() only
+wakes the flush thread. Rows that cannot be kept in memory or written go to a
+spill file per process, write_behind_spill.<pid>.jsonl, so concurrent workers
+never append to or truncate each other's file. A flush replays its own spill
+file and any left by processes that have exited. Each file is claimed first
+by renaming it to write_behind_replay.<pid>.<n>.jsonl, and rename is atomic,
+so only one worker replays a given file.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from .config import (
+    DATA_DIR,
+    UTC7,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_SEC,
+    WRITE_BEHIND_MAX_QUEUE,
+)
+
+logger = logging.getLogger(__name__)
+
+SPILL_FILE = DATA_DIR / f"write_behind_spill.{os.getpid()}.jsonl"
+_SPILL_NAME = re.compile(r"write_behind_(?:spill|replay)\.(\d+)(?:\.\d+)?\.jsonl$")
+
+_cond = threading.Condition()
+_flush_lock = threading.Lock()
+_spill_lock = threading.Lock()
+_replay_seq = itertools.count()
+_pending: list[tuple[str, tuple]] = []
+_thread: threading.Thread | None = None
+
+
+def enqueue(kind: str, symbol: str, target: float, price: float) -> None:
+    row = (symbol, target, price, datetime.now(UTC7).replace(tzinfo=None))
+    overflow = None
+    with _cond:
+        _pending.append((kind, row))
+        if len(_pending) > WRITE_BEHIND_MAX_QUEUE:
+            overflow = _pending[:-WRITE_BEHIND_MAX_QUEUE]
+            del _pending[:-WRITE_BEHIND_MAX_QUEUE]
+        if len(_pending) >= WRITE_BEHIND_BATCH_SIZE:
+            _cond.notify()
+    if overflow:
+        _spill(overflow)
+    start()
+
+
+def _spill(items: list[tuple[str, tuple]]) -> None:
+    try:
+        SPILL_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with _spill_lock, open(SPILL_FILE, "a", encoding="utf-8") as f:
+            for kind, (symbol, target, price, at) in items:
+                f.write(json.dumps({"kind": kind, "symbol": symbol, "target": target, "price": price, "at": at.isoformat()}) + "\n")
+            f.flush()
+        logger.warning("write-behind spilled %d rows to %s", len(items), SPILL_FILE.name)
+    except Exception as e:
+        logger.error("write-behind spill failed, %d rows lost: %s", len(items), e)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _claim_spills() -> list:
+    """Rename this process's spill file and orphaned ones to replay files owned by this process."""
+    me = os.getpid()
+    claimed = []
+    for path in sorted(DATA_DIR.glob("write_behind_*.jsonl")):
+        m = _SPILL_NAME.match(path.name)
+        if m is None and path.name != "write_behind_spill.jsonl":  # legacy single file
+            continue
+        pid = int(m.group(1)) if m else None
+        if m and path.name.startswith("write_behind_replay.") and pid == me:
+            claimed.append(path)
+            continue
+        if pid is not None and pid != me and _pid_alive(pid):
+            continue
+        target = DATA_DIR / f"write_behind_replay.{me}.{next(_replay_seq)}.jsonl"
+        try:
+            with _spill_lock:
+                os.rename(path, target)
+        except FileNotFoundError:
+            continue  # another worker claimed it first
+        claimed.append(target)
+    return claimed
+
+
+def _read_spill(path) -> list[tuple[str, tuple]]:
+    items = []
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return items
+    with f:
+        for line in f:
+            try:
+                d = json.loads(line)
+                items.append((d["kind"], (d["symbol"], d["target"], d["price"], datetime.fromisoformat(d["at"]))))
+            except (ValueError, KeyError):
+                continue
+    return items
+
+
+def _write(items: list[tuple[str, tuple]]) -> None:
+    from .db import insert_event_rows
+    by_kind: dict[str, list[tuple]] = {}
+    for kind, row in items:
+        by_kind.setdefault(kind, []).append(row)
+    insert_event_rows(by_kind)
+
+
+def flush() -> bool:
+    with _flush_lock:
+        with _cond:
+            items = list(_pending)
+            _pending.clear()
+        claimed = _claim_spills() if DATA_DIR.exists() else []
+        spilled = [item for path in claimed for item in _read_spill(path)]
+        if not items and not spilled:
+            for path in claimed:
+                path.unlink(missing_ok=True)
+            return True
+        try:
+            _write(spilled + items)
+        except Exception as e:
+            logger.warning("write-behind flush of %d rows failed: %s", len(spilled) + len(items), e)
+            # Claimed files stay as this process's replay files and are retried next flush.
+            if items:
+                _spill(items)
+            return False
+        for path in claimed:
+            path.unlink(missing_ok=True)
+        return True
+
+
+def kick() -> None:
+    """Ask the flush thread to write what is queued now, without waiting for it."""
+    with _cond:
+        if _pending:
+            _cond.notify()
+
+
+def _loop() -> None:
+    while True:
+        with _cond:
+            _cond.wait(timeout=WRITE_BEHIND_FLUSH_SEC)
+        if not flush():
+            time.sleep(WRITE_BEHIND_FLUSH_SEC)
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None:
+        return
+    with _cond:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="write-behind")
+    _thread.start()
+    atexit.register(flush)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from .config import (
+    VNDIRECT_WS_URL,
+    WS_FEED_RECONNECT_MAX_SEC,
+    WS_REGIST_CHUNK_SIZE,
+    WS_FEED_STALE_SEC,
+    WS_FEED_TRANSIENT_SEC,
+)
+from . import tick_store
+from .quotes import Quote, now_utc7
+
+logger = logging.getLogger(__name__)
+
+BA, SP, MI = "BA", "SP", "MI"
+MI_IDS = {"10": "VNINDEX", "11": "VN30", "12": "HNX30", "13": "VNXALL", "02": "HNX", "03": "UPCOM"}
+MI_NAMES = {v: k for k, v in MI_IDS.items()}
+WS_INDEX_SET = {"VNINDEX", "VN30", "HNXINDEX", "HNX30", "HNX", "UPCOM", "VNXALL"}
+
+_lock = threading.Lock()
+_pinned: set[str] = set()
+_transient: dict[str, float] = {}
+_quotes: dict[str, Quote] = {}
+_connected = False
+_disconnected_at = 0.0
+_thread: Optional[threading.Thread] = None
+
+
+def regist_message(name: str, codes: list[str], unregister: bool = False) -> str:
+    return json.dumps({
+        "type": "unregistConsumer" if unregister else "registConsumer",
+        "data": {"sequence": 0, "params": {"name": name, "codes": codes}},
+    })
+
+
+def parse_message(msg) -> Optional[tuple[str, str, float]]:
+    try:
+        obj = json.loads(msg)
+    except (TypeError, ValueError):
+        return None
+    typ = obj.get("type")
+    data = obj.get("data") or ""
+    arr = data.split("|") if isinstance(data, str) else []
+    try:
+        if typ == BA and len(arr) >= 16:
+            return BA, arr[1], float(arr[15])
+        if typ == MI and len(arr) >= 8:
+            name = MI_IDS.get(arr[0])
+            if name:
+                return MI, name, float(arr[7])
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+def split_symbols(symbols) -> tuple[set[str], set[str]]:
+    symbol_set = {str(s).strip().upper() for s in symbols if str(s).strip()}
+    stocks = {s for s in symbol_set if s not in WS_INDEX_SET}
+    index_ids = {MI_NAMES[s] for s in symbol_set if s in MI_NAMES}
+    return stocks, index_ids
+
+
+def _wanted() -> set[str]:
+    now = time.monotonic()
+    with _lock:
+        for sym in [s for s, exp in _transient.items() if exp < now]:
+            del _transient[sym]
+        return _pinned | set(_transient)
+
+
+def set_symbols(symbols) -> None:
+    global _pinned
+    with _lock:
+        _pinned = {str(s).strip().upper() for s in symbols if str(s).strip()}
+    if _pinned:
+        start()
+
+
+def add_symbols(symbols) -> None:
+    expiry = time.monotonic() + WS_FEED_TRANSIENT_SEC
+    with _lock:
+        for s in symbols:
+            s = str(s).strip().upper()
+            if s and s not in _pinned:
+                _transient[s] = expiry
+    start()
+
+
+def is_connected() -> bool:
+    return _connected
+
+
+def get_quotes(symbols) -> dict[str, Quote]:
+    with _lock:
+        if not _connected and time.monotonic() - _disconnected_at > WS_FEED_STALE_SEC:
+            return {}
+        result = {}
+        for s in symbols:
+            s = str(s).strip().upper()
+            hit = _quotes.get(s)
+            if hit is not None:
+                result[s] = hit
+        return result
+
+
+def _set_connected(value: bool) -> None:
+    global _connected, _disconnected_at
+    with _lock:
+        if _connected and not value:
+            _disconnected_at = time.monotonic()
+        _connected = value
+
+
+async def _session() -> None:
+    import websockets
+    async with websockets.connect(VNDIRECT_WS_URL, close_timeout=2, ping_interval=20) as ws:
+        _set_connected(True)
+        logger.info("VNDirect feed connected")
+        subscribed: set[str] = set()
+        subscribed_idx: set[str] = set()
+        while True:
+            stocks, index_ids = split_symbols(_wanted())
+            if not stocks and not index_ids:
+                return
+            gone, gone_idx = sorted(subscribed - stocks), sorted(subscribed_idx - index_ids)
+            if gone or gone_idx:
+                # Unsubscribe on the open connection; reconnecting would gap every other symbol.
+                for i in range(0, len(gone), WS_REGIST_CHUNK_SIZE):
+                    await ws.send(regist_message(BA, gone[i:i + WS_REGIST_CHUNK_SIZE], unregister=True))
+                if gone_idx:
+                    await ws.send(regist_message(MI, gone_idx, unregister=True))
+                subscribed.difference_update(gone)
+                subscribed_idx.difference_update(gone_idx)
+                with _lock:
+                    for sym in [*gone, *(MI_IDS[i] for i in gone_idx)]:
+                        _quotes.pop(sym, None)
+                logger.info("VNDirect feed unsubscribed %d symbols", len(gone) + len(gone_idx))
+            new_stocks = sorted(stocks - subscribed)
+            for i in range(0, len(new_stocks), WS_REGIST_CHUNK_SIZE):
+                chunk = new_stocks[i:i + WS_REGIST_CHUNK_SIZE]
+                await ws.send(regist_message(BA, chunk))
+                subscribed.update(chunk)
+            new_idx = sorted(index_ids - subscribed_idx)
+            if new_idx:
+                await ws.send(regist_message(MI, new_idx))
+                subscribed_idx.update(new_idx)
+            try:
+                msg = await asyncio.wait_for(ws.recv(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            parsed = parse_message(msg)
+            # Frames already in flight for a code just unsubscribed are dropped.
+            if parsed and (parsed[1] in subscribed or MI_NAMES.get(parsed[1]) in subscribed_idx):
+                typ, code, price = parsed
+                quote = Quote(code, price, "vndirect-ws", now_utc7(), typ == MI)
+                with _lock:
+                    _quotes[code] = quote
+                tick_store.record(code, price)
+
+
+async def _run_forever() -> None:
+    delay = 1.0
+    while True:
+        if not _wanted():
+            await asyncio.sleep(1)
+            continue
+        started = time.monotonic()
+        try:
+            await _session()
+        except Exception as e:
+            logger.info("VNDirect feed disconnected: %s", e)
+        else:
+            _set_connected(False)
+            delay = 1.0
+            continue
+        _set_connected(False)
+        if time.monotonic() - started > 60:
+            delay = 1.0
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+        delay = min(delay * 2, WS_FEED_RECONNECT_MAX_SEC)
+
+
+def start() -> None:
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=lambda: asyncio.run(_run_forever()), daemon=True)
+    _thread.start()
+    logger.info("VNDirect feed started")
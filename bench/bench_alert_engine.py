@@ -0,0 +1,57 @@
+"""Alert evaluation: bisected RuleIndex vs. a full scan over every rule.
+
+Run from the project root: python -m bench.bench_alert_engine [rules] [symbols]
+"""
+import random
+import sys
+import time
+
+from backend.alert_engine import RuleIndex, evaluate, parse_rules
+
+
+def _naive(rules, prices, last_alerted):
+    fired = []
+    for rule in rules:
+        price = prices.get(rule.symbol)
+        if price is not None and rule.contains(price) and last_alerted.get(rule.key) != rule.target:
+            fired.append((rule, price))
+    return fired
+
+
+def run(n_rules: int = 100_000, n_symbols: int = 1600, rounds: int = 20) -> dict[str, float]:
+    rnd = random.Random(42)
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    base = {s: rnd.uniform(5_000, 150_000) for s in symbols}
+    per_symbol = max(1, n_rules // n_symbols)
+    observers = {
+        s: "; ".join(f"{base[s] * rnd.uniform(0.7, 1.3):.0f}" for _ in range(per_symbol))
+        for s in symbols
+    }
+    t = time.perf_counter()
+    index = RuleIndex.from_observers(observers)
+    build_ms = (time.perf_counter() - t) * 1000
+    rules = [r for s, v in observers.items() for r in parse_rules(s, v)]
+    ticks = [{s: base[s] * rnd.uniform(0.98, 1.02) for s in symbols} for _ in range(rounds)]
+
+    t = time.perf_counter()
+    indexed = [evaluate(index, p, {})[0] for p in ticks]
+    indexed_ms = (time.perf_counter() - t) * 1000 / rounds
+    t = time.perf_counter()
+    naive = [_naive(rules, p, {}) for p in ticks]
+    naive_ms = (time.perf_counter() - t) * 1000 / rounds
+    assert [sorted(r.key for r, _ in f) for f in indexed] == [sorted(r.key for r, _ in f) for f in naive]
+    return {
+        "rules": len(index),
+        "symbols": n_symbols,
+        "build_ms": build_ms,
+        "indexed_ms": indexed_ms,
+        "naive_ms": naive_ms,
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:3]])
+    print(f"{result['rules']} rules over {result['symbols']} symbols (index built in {result['build_ms']:.1f} ms)")
+    print(f"  indexed evaluate {result['indexed_ms']:8.3f} ms per tick")
+    print(f"  full scan        {result['naive_ms']:8.3f} ms per tick")
+    print(f"  speedup          {result['naive_ms'] / result['indexed_ms']:8.1f}x")
@@ -0,0 +1,58 @@
+"""One alert check (run_check) end to end against the local stubs.
+
+Run from the project root: python -m bench.bench_check [symbols] [levels] [rounds]
+
+Observers are saved to a throwaway local store with one level per symbol placed
+on the stub price, so the first check fires and queues every alert; later
+checks find them already alerted. Telegram delivery goes to the HTTP stub.
+"""
+import statistics
+import sys
+import time
+
+from bench.stubs import offline, stub_price
+
+
+def run(n_symbols: int = 200, levels: int = 5, rounds: int = 20) -> dict[str, float]:
+    offline()
+    from backend import alert_checker, quote_cache, store
+
+    symbols = [f"C{i:03d}" for i in range(n_symbols)]
+    observers = {
+        s: "; ".join(str(int(stub_price(s) * (1 + 0.02 * k))) for k in range(levels))
+        for s in symbols
+    }
+    store.save_observers(observers)
+    store.save_last_alerted({})
+    before = (store.events_version("observer_price_change") or (0, None))[0] or 0
+
+    t = time.perf_counter()
+    alert_checker.run_check()
+    first_ms = (time.perf_counter() - t) * 1000
+    fired = ((store.events_version("observer_price_change") or (0, None))[0] or 0) - before
+
+    warm, cold = [], []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        alert_checker.run_check()
+        warm.append(time.perf_counter() - t)
+        quote_cache.invalidate()
+        t = time.perf_counter()
+        alert_checker.run_check()
+        cold.append(time.perf_counter() - t)
+    return {
+        "symbols": n_symbols,
+        "rules": n_symbols * levels,
+        "alerts_fired": fired,
+        "first_check_ms": first_ms,
+        "check_cached_ms": statistics.median(warm) * 1000,
+        "check_cold_ms": statistics.median(cold) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:4]])
+    print(f"{result['rules']} rules over {result['symbols']} symbols")
+    print(f"  first check ({result['alerts_fired']} alerts queued) {result['first_check_ms']:9.3f} ms")
+    print(f"  check, quotes cached              {result['check_cached_ms']:9.3f} ms")
+    print(f"  check, quotes fetched from stubs  {result['check_cold_ms']:9.3f} ms")
@@ -0,0 +1,61 @@
+"""Quote fetching against the local VNDirect stubs.
+
+Run from the project root: python -m bench.bench_fetch [symbols] [rounds]
+
+Times each source on its own (WebSocket snapshot, chunked REST) and the full
+fetch_prices_dict path, cold (quote cache cleared every round) and warm.
+"""
+import statistics
+import sys
+import time
+
+from bench.stubs import offline
+
+
+def _median_ms(fn, rounds: int) -> float:
+    out = []
+    for _ in range(rounds):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000
+
+
+def run(n_symbols: int = 100, rounds: int = 20) -> dict[str, float]:
+    offline()
+    from backend import fetcher, quote_cache
+    from backend.config import INDEX_CODES
+
+    # Keep the chain on the stubbed sources even if vnstock / yfinance are installed.
+    fetcher.VNSTOCK_AVAILABLE = False
+    fetcher.YFINANCE_AVAILABLE = False
+    symbols = [f"S{i:03d}" for i in range(n_symbols)]
+
+    got = fetcher._vndirect_realtime_prices(symbols)
+    assert len(got) == n_symbols, f"WebSocket stub priced {len(got)} of {n_symbols}"
+    ws_ms = _median_ms(lambda: fetcher._vndirect_realtime_prices(symbols), rounds)
+    rest_ms = _median_ms(lambda: fetcher._vndirect_prices(symbols), max(1, rounds // 4))
+
+    def cold():
+        quote_cache.invalidate()
+        return fetcher.fetch_prices_dict(symbols, INDEX_CODES)
+
+    assert len(cold()) == n_symbols
+    cold_ms = _median_ms(cold, rounds)
+    warm_ms = _median_ms(lambda: fetcher.fetch_prices_dict(symbols, INDEX_CODES), rounds * 10)
+    return {
+        "symbols": n_symbols,
+        "ws_source_ms": ws_ms,
+        "rest_source_ms": rest_ms,
+        "fetch_cold_ms": cold_ms,
+        "fetch_warm_ms": warm_ms,
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:3]])
+    print(f"{result['symbols']} symbols, median per call")
+    print(f"  VNDirect WebSocket source   {result['ws_source_ms']:9.3f} ms")
+    print(f"  VNDirect REST source        {result['rest_source_ms']:9.3f} ms")
+    print(f"  fetch_prices_dict (cold)    {result['fetch_cold_ms']:9.3f} ms")
+    print(f"  fetch_prices_dict (cached)  {result['fetch_warm_ms']:9.3f} ms")
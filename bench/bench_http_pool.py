@@ -0,0 +1,58 @@
+"""Per-request latency: bare requests.get/post vs. the pooled keep-alive sessions.
+
+Run from the project root: python -m bench.bench_http_pool [requests]
+
+The stub is plain HTTP on loopback, so the gap shown here is TCP setup only;
+against the real HTTPS upstreams each avoided handshake also saves a TLS round trip.
+"""
+import statistics
+import sys
+import time
+
+import requests
+
+from backend.http_pool import get_session
+from bench.stubs import base_url, start_http_stub
+
+
+def _timed(fn, n: int) -> list[float]:
+    out = []
+    for i in range(n):
+        t = time.perf_counter()
+        fn(i)
+        out.append(time.perf_counter() - t)
+    return out
+
+
+def run(n: int = 300) -> dict[str, float]:
+    server = start_http_stub()
+    base = base_url(server)
+    rest_url = f"{base}/v4/stock_prices"
+    tg_url = f"{base}/botTOKEN/sendMessage"
+    params = lambda i: {"q": f"code:S{i % 50:03d}~date:gte:2026-10-01", "size": 1}
+    body = {"chat_id": "1", "text": "bench"}
+
+    bare_get = _timed(lambda i: requests.get(rest_url, params=params(i), timeout=5).json(), n)
+    session = get_session("bench-vndirect")
+    session.get(rest_url, params=params(0), timeout=5)
+    pooled_get = _timed(lambda i: session.get(rest_url, params=params(i), timeout=5).json(), n)
+    bare_post = _timed(lambda i: requests.post(tg_url, json=body, timeout=5).json(), n)
+    tg = get_session("bench-telegram", retry_post=True)
+    tg.post(tg_url, json=body, timeout=5)
+    pooled_post = _timed(lambda i: tg.post(tg_url, json=body, timeout=5).json(), n)
+    server.shutdown()
+    ms = lambda xs: statistics.median(xs) * 1000
+    return {
+        "requests": n,
+        "rest_bare_ms": ms(bare_get),
+        "rest_pooled_ms": ms(pooled_get),
+        "telegram_bare_ms": ms(bare_post),
+        "telegram_pooled_ms": ms(pooled_post),
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:2]])
+    print(f"{result['requests']} requests each, median per request")
+    print(f"  VNDirect REST  bare {result['rest_bare_ms']:7.3f} ms   pooled {result['rest_pooled_ms']:7.3f} ms")
+    print(f"  Telegram send  bare {result['telegram_bare_ms']:7.3f} ms   pooled {result['telegram_pooled_ms']:7.3f} ms")
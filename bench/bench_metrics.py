@@ -0,0 +1,54 @@
+"""Instrumentation overhead: per-thread metric shards vs. one lock around a shared dict.
+
+Run from the project root: python -m bench.bench_metrics [updates] [threads]
+"""
+import sys
+import threading
+import time
+
+from backend import metrics
+
+
+class _LockedCounter:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.values: dict = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+def _run_threads(fn, n: int, threads: int) -> float:
+    per = n // threads
+    workers = [threading.Thread(target=lambda: [fn() for _ in range(per)]) for _ in range(threads)]
+    t = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - t) / (per * threads) * 1e9
+
+
+def run(n: int = 400_000, threads: int = 8) -> dict[str, float]:
+    c = metrics.counter("bench_updates_total", "bench", ("source",))
+    h = metrics.histogram("bench_latency_seconds", "bench", ("source",))
+    locked = _LockedCounter()
+    return {
+        "updates": n,
+        "threads": threads,
+        "counter_1t_ns": _run_threads(lambda: c.inc("a"), n, 1),
+        "histogram_1t_ns": _run_threads(lambda: h.observe(0.003, "a"), n, 1),
+        "locked_1t_ns": _run_threads(lambda: locked.inc("a"), n, 1),
+        "counter_mt_ns": _run_threads(lambda: c.inc("a"), n, threads),
+        "histogram_mt_ns": _run_threads(lambda: h.observe(0.003, "a"), n, threads),
+        "locked_mt_ns": _run_threads(lambda: locked.inc("a"), n, threads),
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:3]])
+    print(f"{result['updates']} updates, per update")
+    print(f"  sharded counter    1 thread {result['counter_1t_ns']:7.1f} ns   {result['threads']} threads {result['counter_mt_ns']:7.1f} ns")
+    print(f"  sharded histogram  1 thread {result['histogram_1t_ns']:7.1f} ns   {result['threads']} threads {result['histogram_mt_ns']:7.1f} ns")
+    print(f"  locked dict        1 thread {result['locked_1t_ns']:7.1f} ns   {result['threads']} threads {result['locked_mt_ns']:7.1f} ns")
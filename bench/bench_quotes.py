@@ -0,0 +1,49 @@
+"""Quote round-trip micro-benchmark: text render + parse vs. typed Quote records.
+
+Run from the project root: python -m bench.bench_quotes [symbols] [rounds]
+"""
+import random
+import sys
+import timeit
+
+from backend.fetcher import parse_prices_text
+from backend.quotes import Quote, format_quotes, now_utc7
+
+
+def _sample_quotes(n: int) -> dict[str, Quote]:
+    at = now_utc7()
+    rng = random.Random(42)
+    return {
+        f"S{i:04d}": Quote(f"S{i:04d}", float(rng.randint(5_000, 150_000)), "bench", at)
+        for i in range(n)
+    }
+
+
+def text_round_trip(quotes: dict[str, Quote]) -> dict[str, float]:
+    return parse_prices_text(format_quotes(quotes.values()))
+
+
+def direct(quotes: dict[str, Quote]) -> dict[str, float]:
+    return {sym: q.price for sym, q in quotes.items()}
+
+
+def run(n: int = 1600, rounds: int = 200) -> dict[str, float]:
+    quotes = _sample_quotes(n)
+    assert text_round_trip(quotes) == direct(quotes)
+    text_s = min(timeit.repeat(lambda: text_round_trip(quotes), number=rounds, repeat=3)) / rounds
+    direct_s = min(timeit.repeat(lambda: direct(quotes), number=rounds, repeat=3)) / rounds
+    return {
+        "symbols": n,
+        "text_round_trip_us": text_s * 1e6,
+        "direct_us": direct_s * 1e6,
+        "speedup": text_s / direct_s if direct_s else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    result = run(*args)
+    print(f"{result['symbols']} symbols")
+    print(f"  text render + parse_prices_text: {result['text_round_trip_us']:10.1f} us")
+    print(f"  Quote records -> dict:           {result['direct_us']:10.1f} us")
+    print(f"  speedup: {result['speedup']:.1f}x")
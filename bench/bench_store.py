@@ -0,0 +1,94 @@
+"""Storage paths: the local SQLite store and, optionally, Postgres.
+
+Run from the project root: python -m bench.bench_store [symbols] [--pg URL|pgserver]
+
+Without --pg only the local store is measured. `--pg pgserver` starts a
+throwaway server with the pgserver package; any other value is used as the
+DATABASE_URL (it should point at a scratch database, the benchmark writes to it).
+BENCH_DATABASE_URL works in place of the flag.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from bench.stubs import offline
+
+
+def _median_ms(fn, rounds: int) -> float:
+    out = []
+    for i in range(rounds):
+        t = time.perf_counter()
+        fn(i)
+        out.append(time.perf_counter() - t)
+    return statistics.median(out) * 1000
+
+
+def _pgserver_url() -> str:
+    import pgserver
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="bench-pg-"), cleanup_mode="delete")
+    url = server.get_uri()
+    return url + ("&" if "?" in url else "?") + "sslmode=disable"
+
+
+def _measure(prefix: str, n_symbols: int, rounds: int) -> dict[str, float]:
+    from backend import store, write_behind
+
+    observers = {f"D{i:04d}": f"{10_000 + i}; {20_000 + i}@0.5%" for i in range(n_symbols)}
+    last = {f"D{i:04d}@{10_000 + i}": float(10_000 + i) for i in range(n_symbols)}
+    store.init_storage()
+    store.save_observers({})
+    out = {
+        "save_observers_ms": _median_ms(
+            lambda i: store.save_observers(observers if i % 2 == 0 else {**observers, "D0000": str(i)}), rounds
+        ),
+        "load_observers_ms": _median_ms(lambda i: store._load_observers_uncached(), rounds),
+        "load_rule_index_cached_ms": _median_ms(lambda i: store.load_rule_index(), rounds * 10),
+        "save_last_alerted_ms": _median_ms(
+            lambda i: store.save_last_alerted(last if i % 2 == 0 else {**last, "D0000@1": float(i)}), rounds
+        ),
+        "load_last_alerted_ms": _median_ms(lambda i: store.load_last_alerted(), rounds),
+    }
+
+    def appends(i: int) -> None:
+        for j in range(100):
+            store.append_history(f"D{j % n_symbols:04d}", 10_000.0, 10_000.0 + i + j)
+        write_behind.flush()
+
+    out["append_history_100_ms"] = _median_ms(appends, rounds)
+    out["query_events_page_ms"] = _median_ms(lambda i: store.query_events("history", limit=500), rounds)
+    out["query_events_symbol_ms"] = _median_ms(lambda i: store.query_events("history", symbol="D0001", limit=100), rounds)
+    return {f"{prefix}_{k}": v for k, v in out.items()}
+
+
+def run(n_symbols: int = 500, rounds: int = 20, pg: str = "") -> dict[str, float]:
+    offline()
+    result: dict[str, float] = {"symbols": n_symbols}
+    result.update(_measure("local", n_symbols, rounds))
+    pg = pg or os.getenv("BENCH_DATABASE_URL", "").strip()
+    if pg:
+        if "backend.db" in sys.modules:
+            raise RuntimeError("backend.db was imported before the Postgres benchmark could set DATABASE_URL")
+        os.environ["DATABASE_URL"] = _pgserver_url() if pg == "pgserver" else pg
+        try:
+            result.update(_measure("pg", n_symbols, rounds))
+        finally:
+            from backend import db
+            db.close_pool()
+            os.environ["DATABASE_URL"] = ""
+    return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    pg = ""
+    if "--pg" in args:
+        i = args.index("--pg")
+        pg = args[i + 1]
+        del args[i:i + 2]
+    result = run(*[int(a) for a in args[:1]], pg=pg)
+    print(f"{result['symbols']} observed symbols, median per call")
+    for key, value in result.items():
+        if key != "symbols":
+            print(f"  {key:34s} {value:9.3f} ms")
@@ -0,0 +1,51 @@
+"""send_telegram latency and the 429 (rate limited) path against the local Bot API stub.
+
+Run from the project root: python -m bench.bench_telegram [messages]
+"""
+import logging
+import statistics
+import sys
+import time
+
+from bench.stubs import offline
+
+
+def run(n: int = 200) -> dict[str, float]:
+    stubs = offline()
+    from backend.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+    from backend.telegram_send import deliver, send_telegram
+
+    assert send_telegram(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, "warm-up")
+    lat = []
+    for i in range(n):
+        t = time.perf_counter()
+        send_telegram(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, f"bench {i}")
+        lat.append(time.perf_counter() - t)
+    lat.sort()
+
+    stubs["http"].throttle = n
+    logging.disable(logging.WARNING)
+    try:
+        t = time.perf_counter()
+        for i in range(n):
+            result = deliver(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, f"throttled {i}")
+        throttled_s = time.perf_counter() - t
+    finally:
+        logging.disable(logging.NOTSET)
+        stubs["http"].throttle = 0
+    assert result.retry_after is not None
+    return {
+        "messages": n,
+        "send_median_ms": statistics.median(lat) * 1000,
+        "send_p95_ms": lat[int(len(lat) * 0.95) - 1] * 1000,
+        "send_per_sec": n / sum(lat),
+        "throttled_deliver_ms": throttled_s / n * 1000,
+    }
+
+
+if __name__ == "__main__":
+    result = run(*[int(a) for a in sys.argv[1:2]])
+    print(f"{result['messages']} messages")
+    print(f"  send_telegram median {result['send_median_ms']:7.3f} ms   p95 {result['send_p95_ms']:7.3f} ms")
+    print(f"  sequential throughput {result['send_per_sec']:7.0f} msg/s")
+    print(f"  429 response handled in {result['throttled_deliver_ms']:7.3f} ms")
@@ -0,0 +1,159 @@
+"""Run the benchmark suite offline and keep the results per commit.
+
+Run from the project root:
+
+    python -m bench.run                      # every benchmark, saved to bench/results/<commit>.json
+    python -m bench.run fetch check          # a subset
+    python -m bench.run --quick              # smaller sizes, for a quick pre-deploy check
+    python -m bench.run --pg pgserver        # also measure the Postgres store paths
+    python -m bench.run --compare 1a2b3c4 --max-regression 25
+
+Each run is compared with an earlier result (by default the newest saved one
+of the same size; --quick runs are saved as <commit>-quick.json).
+Timings (`*_ms`, `*_us`) that got slower by more than --max-regression percent
+make the command exit non-zero.
+"""
+import argparse
+import importlib
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench.stubs import offline
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# name -> (module, full-size kwargs, --quick kwargs)
+BENCHMARKS = {
+    "quotes": ("bench.bench_quotes", {}, {"n": 400, "rounds": 50}),
+    "alert_engine": ("bench.bench_alert_engine", {}, {"n_rules": 20_000, "n_symbols": 400}),
+    "http_pool": ("bench.bench_http_pool", {}, {"n": 100}),
+    "telegram": ("bench.bench_telegram", {}, {"n": 50}),
+    "fetch": ("bench.bench_fetch", {}, {"n_symbols": 50, "rounds": 5}),
+    "check": ("bench.bench_check", {}, {"n_symbols": 50, "rounds": 5}),
+    "store": ("bench.bench_store", {}, {"n_symbols": 100, "rounds": 5}),
+    "metrics": ("bench.bench_metrics", {}, {"n": 80_000}),
+}
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _commit() -> str:
+    sha = _git("rev-parse", "--short", "HEAD") or "nogit"
+    return f"{sha}-dirty" if _git("status", "--porcelain", "--untracked-files=no") else sha
+
+
+def _lower_is_better(key: str) -> bool | None:
+    if key.endswith(("_per_sec", "speedup")):
+        return False
+    if key.endswith(("_ms", "_us", "_sec")):
+        return True
+    return None
+
+
+def _baseline(ref: str | None, current: str, quick: bool) -> tuple[str, dict] | None:
+    suffix = "-quick" if quick else ""
+    if ref:
+        path = Path(ref)
+        if not path.exists():
+            sha = _git("rev-parse", "--short", ref) or ref
+            path = RESULTS_DIR / f"{sha}{suffix}.json"
+        if not path.exists():
+            raise SystemExit(f"no saved results for {ref}")
+    else:
+        saved = sorted(
+            (p for p in RESULTS_DIR.glob("*.json") if p.stem != current and p.stem.endswith("-quick") == quick),
+            key=lambda p: p.stat().st_mtime,
+        )
+        if not saved:
+            return None
+        path = saved[-1]
+    with open(path, "r", encoding="utf-8") as f:
+        return path.stem, json.load(f)["results"]
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Print a per-metric comparison; return the metrics that regressed past the limit."""
+    regressions = []
+    for name, metrics in results.items():
+        old = baseline.get(name) or {}
+        for key, value in metrics.items():
+            lower = _lower_is_better(key)
+            before = old.get(key)
+            if lower is None or not isinstance(value, (int, float)) or not before:
+                continue
+            change = (value - before) / before * 100
+            worse = change if lower else -change
+            flag = ""
+            if worse > max_regression:
+                flag = "  <-- slower"
+                regressions.append(f"{name}.{key}")
+            elif worse < -max_regression:
+                flag = "  faster"
+            print(f"  {name + '.' + key:44s} {before:12.3f} -> {value:12.3f}  {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.run", description="Offline benchmark suite.")
+    p.add_argument("names", nargs="*", metavar="name", help=", ".join(BENCHMARKS))
+    p.add_argument("--quick", action="store_true", help="smaller sizes")
+    p.add_argument("--pg", default="", help="Postgres for the store benchmark: a scratch DATABASE_URL or 'pgserver'")
+    p.add_argument("--compare", help="commit or results file to compare with (default: newest saved)")
+    p.add_argument("--max-regression", type=float, default=20.0, help="percent slowdown that fails the run")
+    p.add_argument("--no-save", action="store_true", help="do not write bench/results/<commit>.json")
+    args = p.parse_args(argv)
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        p.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    offline()
+    commit = _commit() + ("-quick" if args.quick else "")
+    results: dict[str, dict] = {}
+    for name in args.names or list(BENCHMARKS):
+        module, full, quick = BENCHMARKS[name]
+        kwargs = dict(quick if args.quick else full)
+        if name == "store" and args.pg:
+            kwargs["pg"] = args.pg
+        started = time.perf_counter()
+        results[name] = importlib.import_module(module).run(**kwargs)
+        print(f"{name:14s} done in {time.perf_counter() - started:6.1f} s", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        record = {
+            "commit": commit,
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "quick": args.quick,
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+            "results": results,
+        }
+        path = RESULTS_DIR / f"{commit}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"saved {path.relative_to(Path.cwd()) if path.is_relative_to(Path.cwd()) else path}", file=sys.stderr)
+
+    base = _baseline(args.compare, commit, args.quick)
+    if base is None:
+        return 0
+    print(f"\ncompared with {base[0]}:")
+    regressions = compare(results, base[1], args.max_regression)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) slower by more than {args.max_regression:g}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Local stand-ins for the upstream APIs, used by the benchmarks.
+
+Point the backend at them through TELEGRAM_API_BASE / VNDIRECT_REST_URL /
+VNDIRECT_WS_URL, or call offline() before anything imports backend.config.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def stub_price(code: str) -> float:
+    """Deterministic price per symbol, shared by the REST and WebSocket stubs."""
+    return float(10_000 + (sum(map(ord, code)) * 37) % 90_000)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, obj) -> None:
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        q = (parse_qs(url.query).get("q") or [""])[0]
+        m = re.match(r"code:([^~]+)", q)
+        if not url.path.endswith("/stock_prices") or not m:
+            self._send_json(404, {"data": []})
+            return
+        code = m.group(1)
+        self._send_json(200, {"data": [{"code": code, "close": stub_price(code), "date": "2026-10-16"}]})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/sendMessage"):
+            self._send_json(404, {"ok": False, "description": "Not Found"})
+            return
+        if self.server.throttle > 0:
+            self.server.throttle -= 1
+            self._send_json(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1", "parameters": {"retry_after": 1}})
+            return
+        self.server.sent.append(payload)
+        self._send_json(200, {"ok": True, "result": {"message_id": len(self.server.sent)}})
+
+
+def start_http_stub(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.sent = []
+    server.throttle = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def _ba_frame(code: str, price: float) -> str:
+    fields = [""] * 16
+    fields[1], fields[15] = code, f"{price:.0f}"
+    return json.dumps({"type": "BA", "data": "|".join(fields)})
+
+
+def _mi_frame(index_id: str, value: float) -> str:
+    fields = [""] * 8
+    fields[0], fields[7] = index_id, f"{value:.2f}"
+    return json.dumps({"type": "MI", "data": "|".join(fields)})
+
+
+class WsStub:
+    """VNDirect realtime stand-in: answers registConsumer with one BA/MI frame per
+    code, then keeps emitting random-walk frames at `rate` per second (0 = snapshot only).
+    unregistConsumer stops a code's frames."""
+
+    def __init__(self, port: int = 0, rate: float = 0.0) -> None:
+        self.rate = rate
+        self.frames = 0
+        self.connections = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._server = None
+        self.port = port
+        threading.Thread(target=self._run, daemon=True, name="ws-stub").start()
+        self._ready.wait(5)
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/realtime/websocket"
+
+    def _run(self) -> None:
+        from websockets.asyncio.server import serve
+
+        async def main() -> None:
+            self._server = await serve(self._session, "127.0.0.1", self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await self._server.wait_closed()
+
+        self._loop.run_until_complete(main())
+
+    async def _session(self, ws) -> None:
+        self.connections += 1
+        codes: dict[str, float] = {}
+        indexes: dict[str, float] = {}
+        rng = random.Random(self.connections)
+
+        async def ticker() -> None:
+            while True:
+                await asyncio.sleep(1 / self.rate)
+                if codes:
+                    code = rng.choice(list(codes))
+                    codes[code] = max(100.0, codes[code] + rng.choice((-50, 0, 50)))
+                    await ws.send(_ba_frame(code, codes[code]))
+                    self.frames += 1
+
+        task = asyncio.create_task(ticker()) if self.rate > 0 else None
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                params = (msg.get("data") or {}).get("params") or {}
+                name, new = params.get("name"), params.get("codes") or []
+                if msg.get("type") == "unregistConsumer":
+                    for code in new:
+                        (indexes if name == "MI" else codes).pop(code, None)
+                    continue
+                for code in new:
+                    if name == "MI":
+                        indexes[code] = 1_000 + int(code) * 10
+                        await ws.send(_mi_frame(code, indexes[code]))
+                    else:
+                        codes[code] = stub_price(code)
+                        await ws.send(_ba_frame(code, codes[code]))
+                    self.frames += 1
+        except Exception:
+            pass
+        finally:
+            if task is not None:
+                task.cancel()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def start_ws_stub(port: int = 0, rate: float = 0.0) -> WsStub:
+    return WsStub(port, rate)
+
+
+_offline: dict | None = None
+
+
+def offline(database_url: str = "") -> dict:
+    """Start every stub once and point the backend at them through the environment.
+
+    Must run before backend.config is imported, since config is read at import
+    time. Local storage goes to a throwaway LOCAL_DATA_DIR; background feeds that
+    would reconnect on their own are switched off.
+    """
+    global _offline
+    if _offline is not None:
+        return _offline
+    import sys
+    if "backend.config" in sys.modules:
+        raise RuntimeError("bench.stubs.offline() must run before backend is imported")
+    http, ws = start_http_stub(), start_ws_stub()
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "TELEGRAM_API_BASE": base_url(http),
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "VNDIRECT_REST_URL": f"{base_url(http)}/v4/stock_prices",
+        "VNDIRECT_WS_URL": ws.url,
+        "LOCAL_DATA_DIR": data_dir,
+        "DATABASE_URL": database_url,
+        "WS_FEED_ENABLED": "0",
+        "TICK_ARCHIVE_ENABLED": "0",
+        "SAMPLE_PRICES": "0",
+    })
+    _offline = {"http": http, "ws": ws, "data_dir": data_dir}
+    return _offline
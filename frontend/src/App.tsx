@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   fetchCurrentPrice,
   fetchHistory,
@@ -6,8 +6,10 @@ import {
   fetchObservers,
   fetchSymbols,
   saveObservers,
+  subscribeStream,
   type HistoryItem,
   type ObserverPriceChangeItem,
+  type PriceResponse,
 } from "./api";
 import "./App.css";
 
@@ -35,16 +37,42 @@ function App() {
     { symbol: string; price: number } | { error: string } | null
   >(null);
   const [priceLoading, setPriceLoading] = useState(false);
+  const [livePrices, setLivePrices] = useState<Record<string, PriceResponse>>(
+    {}
+  );
+
+  // Targets as last loaded from or saved to the API; inputs that still match
+  // them have no unsaved edits.
+  const savedObservers = useRef<Record<string, string>>({});
 
   const loadFromApi = () => {
     return Promise.all([fetchSymbols(), fetchObservers()]).then(
       ([symList, obs]) => {
         setSymbols(symList);
+        savedObservers.current = obs;
         setObserverValues(obs);
       }
     );
   };
 
+  // Another client saved: take its targets, but keep what the user is editing.
+  const mergeFromApi = () => {
+    return Promise.all([fetchSymbols(), fetchObservers()]).then(
+      ([symList, obs]) => {
+        const saved = savedObservers.current;
+        savedObservers.current = obs;
+        setSymbols(symList);
+        setObserverValues((prev) => {
+          const next = { ...obs };
+          for (const [k, v] of Object.entries(prev)) {
+            if ((v ?? "") !== (saved[k] ?? "")) next[k] = v;
+          }
+          return next;
+        });
+      }
+    );
+  };
+
   useEffect(() => {
     loadFromApi().then(() => setLoading(false));
   }, []);
@@ -59,12 +87,27 @@ function App() {
     );
   }, [filterObserverPriceChange]);
 
+  useEffect(() => {
+    return subscribeStream({
+      onQuotes: (quotes) => setLivePrices((prev) => ({ ...prev, ...quotes })),
+      onAlert: () =>
+        fetchObserverPriceChange(filterObserverPriceChange || undefined).then(
+          setObserverPriceChange
+        ),
+      onObservers: () => {
+        mergeFromApi();
+        fetchHistory(filterSymbol || undefined).then(setHistory);
+      },
+    });
+  }, [filterSymbol, filterObserverPriceChange]);
+
   const handleSave = async () => {
     const trimmed: Record<string, string> = {};
     for (const [k, v] of Object.entries(observerValues)) {
       if (k && v?.trim()) trimmed[k] = v.trim();
     }
     await saveObservers(trimmed);
+    savedObservers.current = trimmed;
     setObserverValues((prev) => ({ ...prev, ...trimmed }));
     fetchHistory(filterSymbol || undefined).then(setHistory);
     setToast(true);
@@ -164,18 +207,25 @@ function App() {
           <>
             <p className="sub">
               Set a target price per symbol. When live price falls inside the
-              band (within 0.1% of target), you get a Telegram alert and a row
-              is added to Observer Price Change. Check runs every 30 seconds.
+              band around a target, you get a Telegram alert and a row is added
+              to Observer Price Change. Separate several levels with ";" and
+              give one its own band with "@", e.g. "38600; 40000@0.5%";
+              otherwise the server's default band (PRICE_BAND_PCT) applies. Check runs every 30 seconds.
             </p>
             <section className="card">
               <h2>
-                Observer prices (alert when price is within 0.1% of target)
+                Observer prices (alert when price is within each level's band)
               </h2>
               <p className="sub">Data from database only.</p>
               <div className="symbol-grid">
                 {symbols.map((sym) => (
                   <div key={sym} className="symbol-row">
                     <label>{sym}</label>
+                    <span className="live-price" title="Live price">
+                      {livePrices[sym]
+                        ? livePrices[sym].price.toLocaleString()
+                        : "–"}
+                    </span>
                     <input
                       type="text"
                       placeholder="e.g. 95500"
@@ -202,8 +252,8 @@ function App() {
             <section className="card" id="observer-price-change">
               <h2>Observer Price Change</h2>
               <p className="sub">
-                Rows added when live price falls inside the band (within 0.1% of
-                target). One row per (symbol, target) the first time price
+                Rows added when live price falls inside a level's band (its own
+                "@" band, or the configured default). One row per (symbol, target) the first time price
                 enters the band; Telegram alert is sent at the same time.
               </p>
               <div className="filter-row">
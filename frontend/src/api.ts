@@ -9,7 +9,10 @@ export type HistoryItem = {
   price: number;
   at: string;
 };
-export type HistoryResponse = { history: HistoryItem[] };
+export type HistoryResponse = {
+  history: HistoryItem[];
+  next_cursor?: string | null;
+};
 
 export type ObserverPriceChangeItem = {
   symbol: string;
@@ -19,6 +22,7 @@ export type ObserverPriceChangeItem = {
 };
 export type ObserverPriceChangeResponse = {
   observer_price_change: ObserverPriceChangeItem[];
+  next_cursor?: string | null;
 };
 
 export async function fetchSymbols(): Promise<string[]> {
@@ -63,7 +67,13 @@ export async function fetchObserverPriceChange(
   return data.observer_price_change ?? [];
 }
 
-export type PriceResponse = { symbol: string; price: number };
+export type PriceResponse = {
+  symbol: string;
+  price: number;
+  source?: string;
+  at?: string | null;
+  is_index?: boolean;
+};
 export type PriceErrorResponse = { error: string };
 
 export async function fetchCurrentPrice(
@@ -79,3 +89,38 @@ export async function fetchCurrentPrice(
     };
   return data as PriceResponse;
 }
+
+export type StreamAlert = {
+  symbol: string;
+  target: number;
+  price: number;
+  key: string;
+  text: string;
+};
+
+export type StreamHandlers = {
+  onQuotes?: (quotes: Record<string, PriceResponse>) => void;
+  onAlert?: (alert: StreamAlert) => void;
+  onObservers?: (observers: ObserversResponse) => void;
+};
+
+/** Subscribe to /api/stream; returns a function that closes the connection. */
+export function subscribeStream(
+  handlers: StreamHandlers,
+  symbols?: string[]
+): () => void {
+  const query = symbols?.length
+    ? `?symbols=${encodeURIComponent(symbols.join(","))}`
+    : "";
+  const source = new EventSource(`${API}/stream${query}`);
+  source.addEventListener("quotes", (e) =>
+    handlers.onQuotes?.(JSON.parse((e as MessageEvent).data))
+  );
+  source.addEventListener("alert", (e) =>
+    handlers.onAlert?.(JSON.parse((e as MessageEvent).data))
+  );
+  source.addEventListener("observers", (e) =>
+    handlers.onObservers?.(JSON.parse((e as MessageEvent).data))
+  );
+  return () => source.close();
+}